@@ -22,38 +22,82 @@ from homeassistant.core import HomeAssistant, Event, callback
 from homeassistant.exceptions import ConfigEntryNotReady, ConfigEntryAuthFailed
 from homeassistant.helpers.update_coordinator import UpdateFailed
 from homeassistant.helpers.typing import ConfigType
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 try:
     # Import các const đã cập nhật
     from .const import (
         DOMAIN, _LOGGER, CONF_DEVICE_SN, CONF_DEVICE_ID,
-        MQTT_BROKER, DEFAULT_POLLING_INTERVAL, CONF_HTTP_TOKEN, DEFAULT_STATS_INTERVAL
+        MQTT_BROKER, DEFAULT_POLLING_INTERVAL, CONF_HTTP_TOKEN, CONF_HTTP_TOKEN_ISSUED, DEFAULT_STATS_INTERVAL,
+        SIGNAL_UPDATE_FORMAT, CONF_ENABLE_METRICS, CONF_RECORD_FRAMES, CONF_POLL_CELLS, FRAME_LOG_DIR, FRAME_LOG_FILE_FORMAT,
+        CONF_TRANSPORT, CONF_LAN_HOST, CONF_LAN_PORT, TRANSPORT_CLOUD, LAN_DEFAULT_PORT, CONF_MQTT_ENDPOINTS,
+        CONF_SYSTEM_GROUP, CONF_BATTERY_CAPACITY, SHARED_DATA_KEYS
     )
     from .mqtt import LumentreeMqttClient
+    from .endpoints import parse_endpoints
+    from .write_queue import LumentreeWriteQueue
+    from .polling import LumentreeGroupPoller
+    from .system import get_system
+    from .events import LumentreeEventDetector
+    from .timeseries import LumentreeTimeSeries
+    from .lan import LumentreeLanClient
     from .api import LumentreeHttpApiClient, AuthException, ApiException
     from .coordinator_stats import LumentreeStatsCoordinator
+    from .cache import LumentreeWarmCache, LumentreeDayStatsCache
+    from .integrator import LumentreeEnergyIntegrator
+    from .metrics import LumentreePipelineMetrics
+    from .frame_log import LumentreeFrameRecorder
+    from .services import async_setup_services
 except ImportError as import_err:
     # --- Fallback Definitions (Formatted Correctly AGAIN) ---
     _LOGGER = logging.getLogger(__name__)
     _LOGGER.error(f"ImportError during component setup: {import_err}. Using fallback definitions.")
     DOMAIN = "lumentree"; CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_ID = "device_id";
-    MQTT_BROKER = "lesvr.suntcn.com"; DEFAULT_POLLING_INTERVAL = 5; CONF_HTTP_TOKEN = "http_token"; DEFAULT_STATS_INTERVAL = 600
+    MQTT_BROKER = "lesvr.suntcn.com"; DEFAULT_POLLING_INTERVAL = 5; CONF_HTTP_TOKEN = "http_token"; CONF_HTTP_TOKEN_ISSUED = "http_token_issued"; DEFAULT_STATS_INTERVAL = 600
+    SIGNAL_UPDATE_FORMAT = f"{DOMAIN}_mqtt_update_{{device_sn}}"; CONF_ENABLE_METRICS = "enable_metrics"
+    CONF_RECORD_FRAMES = "record_frames"; CONF_POLL_CELLS = "poll_cells"; FRAME_LOG_DIR = "lumentree_frames"; FRAME_LOG_FILE_FORMAT = "frames_{device_sn}.bin"
+    CONF_TRANSPORT = "transport"; CONF_LAN_HOST = "lan_host"; CONF_LAN_PORT = "lan_port"; TRANSPORT_CLOUD = "cloud"; LAN_DEFAULT_PORT = 502
+    CONF_MQTT_ENDPOINTS = "mqtt_endpoints"; CONF_SYSTEM_GROUP = "system_group"; CONF_BATTERY_CAPACITY = "battery_capacity"
+    SHARED_DATA_KEYS = ("schedulers", "inventory", "systems")
+    def get_system(hass, name): return None
+    def parse_endpoints(value): return []
+    class LumentreeWriteQueue:
+        def __init__(self, hass, client, device_sn): pass
+        async def async_stop(self): await asyncio.sleep(0)
+    class LumentreeGroupPoller:
+        def __init__(self, hass, client, device_sn, poll_cells=False): self._client = client
+        def start(self): return lambda: None
+        async def async_tick(self): await self._client.async_request_data()
+    class LumentreeEventDetector:
+        def __init__(self, hass, device_sn): pass
+    class LumentreeTimeSeries:
+        def __init__(self, hass, device_sn): pass
+        def start(self): return lambda: None
 
     # Fallback Class MQTT
     class LumentreeMqttClient:
-        def __init__(self, hass, entry, device_sn, device_id): pass
+        def __init__(self, hass, entry, device_sn, device_id, broker=None, port=None, endpoints=None): pass
         async def connect(self): _LOGGER.warning("Using fallback MQTT connect"); await asyncio.sleep(0)
         async def disconnect(self): _LOGGER.warning("Using fallback MQTT disconnect"); await asyncio.sleep(0)
         async def async_request_data(self): _LOGGER.warning("Using fallback MQTT request_data"); await asyncio.sleep(0)
+        def set_metrics(self, metrics): pass
+        def set_frame_recorder(self, recorder): pass
+        def set_event_detector(self, detector): pass
         # async def async_request_battery_cells(self): _LOGGER.warning("Using fallback MQTT request_cells"); await asyncio.sleep(0) # Keep commented if needed
         @property
         def is_connected(self) -> bool: return False
+    class LumentreeLanClient(LumentreeMqttClient):
+        def __init__(self, hass, entry, device_sn, device_id, host, port, framing): pass
 
     # Fallback Class API
     class LumentreeHttpApiClient:
-        def __init__(self, session): pass
-        def set_token(self, token): pass
+        def __init__(self, hass, session): pass
+        def set_token(self, token, issued_at=None): pass
+        def set_device_id(self, device_id): pass
+        def set_token_listener(self, listener): pass
+        def set_day_cache(self, day_cache): pass
         async def authenticate_device(self, dev_id): _LOGGER.warning("Using fallback API authenticate"); return "fallback_token"
         async def get_device_info(self, dev_id): _LOGGER.warning("Using fallback API get_info"); return {"deviceId": dev_id, "deviceType": "Fallback Model"}
         async def get_daily_stats(self, sn, date): _LOGGER.warning("Using fallback API get_stats"); return {}
@@ -67,6 +111,35 @@ except ImportError as import_err:
         def data(self): return {}
         last_update_success = False
 
+    # Fallback Class Cache
+    class LumentreeWarmCache:
+        def __init__(self, hass, device_sn): pass
+        async def async_load(self): await asyncio.sleep(0)
+        def get_device_info(self, allow_stale=False): return None
+        def async_set_device_info(self, device_info): pass
+        @property
+        def values(self): return {}
+        def async_update_values(self, data): pass
+        async def async_flush(self): await asyncio.sleep(0)
+    class LumentreeDayStatsCache(LumentreeWarmCache):
+        pass
+    class LumentreePipelineMetrics:
+        def __init__(self, device_sn): pass
+    class LumentreeFrameRecorder:
+        def __init__(self, path): pass
+        def start(self): pass
+        def stop(self): pass
+    class LumentreeEnergyIntegrator:
+        def __init__(self, hass, device_sn): pass
+        async def async_load(self): await asyncio.sleep(0)
+        @property
+        def totals(self): return {}
+        def async_handle_update(self, data): pass
+        def async_apply_anchor(self, stats, stats_date): pass
+        async def async_flush(self): await asyncio.sleep(0)
+
+    def async_setup_services(hass): _LOGGER.warning("Using fallback services setup")
+
     # Fallback Exceptions (Tách class ra dòng riêng)
     class AuthException(Exception):
         pass
@@ -85,7 +158,13 @@ except ImportError as import_err:
     # --- Hết phần Fallback ---
 
 
-PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR]
+PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR, Platform.EVENT]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register services once for all config entries."""
+    async_setup_services(hass)
+    return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     _LOGGER.info(f"Setting up Lumentree: {entry.title} ({entry.entry_id})")
@@ -103,36 +182,115 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if device_id != entry.data.get(CONF_DEVICE_ID): _LOGGER.warning(f"Using SN {device_sn} as Device ID.")
 
         session = async_get_clientsession(hass)
-        api_client = LumentreeHttpApiClient(session)
-        api_client.set_token(http_token)
+        api_client = LumentreeHttpApiClient(hass, session)
+        api_client.set_token(http_token, entry.data.get(CONF_HTTP_TOKEN_ISSUED))
+        api_client.set_device_id(device_id) # Enables automatic re-auth on expired tokens
+
+        @callback
+        def _persist_token(token: str, issued_at: float) -> None:
+            """Store a refreshed token so restarts start with it."""
+            _LOGGER.info(f"HTTP token refreshed for {device_sn}, saving to config entry.")
+            hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_HTTP_TOKEN: token, CONF_HTTP_TOKEN_ISSUED: issued_at})
+
+        api_client.set_token_listener(_persist_token)
         hass.data[DOMAIN][entry.entry_id]["api_client"] = api_client
 
-        _LOGGER.info(f"Fetching device info via HTTP for {device_id}...")
-        try:
-            device_api_info = await api_client.get_device_info(device_id)
-            if "_error" in device_api_info:
-                 _LOGGER.warning(f"Could not fetch device info setup: {device_api_info['_error']}. Using fallback.")
-                 hass.data[DOMAIN][entry.entry_id]['device_api_info'] = {"deviceId": device_sn, "alias": entry.title}
-            else:
-                 hass.data[DOMAIN][entry.entry_id]['device_api_info'] = device_api_info
-                 _LOGGER.info(f"Stored API info: Model={device_api_info.get('deviceType')}, ID={device_api_info.get('deviceId')}")
-        except (ApiException, AuthException) as api_err:
-             _LOGGER.error(f"Failed initial device info fetch {device_id}: {api_err}.")
-             raise ConfigEntryNotReady(f"Failed device info: {api_err}") from api_err
-
-        mqtt_client = LumentreeMqttClient(hass, entry, device_sn, device_id)
-        hass.data[DOMAIN][entry.entry_id]["mqtt_client"] = mqtt_client
-        await mqtt_client.connect()
+        day_cache = LumentreeDayStatsCache(hass, device_sn)
+        await day_cache.async_load()
+        api_client.set_day_cache(day_cache)
+        hass.data[DOMAIN][entry.entry_id]["day_cache"] = day_cache
 
-        coordinator_stats = LumentreeStatsCoordinator(hass, api_client, device_sn)
+        transport = entry.options.get(CONF_TRANSPORT, TRANSPORT_CLOUD)
+        if transport != TRANSPORT_CLOUD and entry.options.get(CONF_LAN_HOST):
+            lan_host, lan_port = entry.options[CONF_LAN_HOST], entry.options.get(CONF_LAN_PORT, LAN_DEFAULT_PORT)
+            mqtt_client = LumentreeLanClient(hass, entry, device_sn, device_id, lan_host, lan_port, transport)
+            _LOGGER.info(f"Using LAN transport {transport} {lan_host}:{lan_port} for {device_sn}")
+        else:
+            mqtt_client = LumentreeMqttClient(hass, entry, device_sn, device_id, endpoints=parse_endpoints(entry.options.get(CONF_MQTT_ENDPOINTS, "")))
+        hass.data[DOMAIN][entry.entry_id]["mqtt_client"] = mqtt_client
+        hass.data[DOMAIN][entry.entry_id]["write_queue"] = LumentreeWriteQueue(hass, mqtt_client, device_sn)
+        group_poller = LumentreeGroupPoller(hass, mqtt_client, device_sn, poll_cells=entry.options.get(CONF_POLL_CELLS, False))
+        hass.data[DOMAIN][entry.entry_id]["group_poller"] = group_poller
+        entry.async_on_unload(group_poller.start())
+        event_detector = LumentreeEventDetector(hass, device_sn)
+        mqtt_client.set_event_detector(event_detector)
+        hass.data[DOMAIN][entry.entry_id]["event_detector"] = event_detector
+        timeseries = LumentreeTimeSeries(hass, device_sn)
+        hass.data[DOMAIN][entry.entry_id]["timeseries"] = timeseries
+        entry.async_on_unload(timeseries.start())
+        system_group = (entry.options.get(CONF_SYSTEM_GROUP) or "").strip()
+        system = get_system(hass, system_group) if system_group else None
+        if system is not None:
+            entry.async_on_unload(system.add_member(device_sn, entry.options.get(CONF_BATTERY_CAPACITY, 0.0)))
+            hass.data[DOMAIN][entry.entry_id]["system"] = system
+        if entry.options.get(CONF_ENABLE_METRICS, False):
+            metrics = LumentreePipelineMetrics(device_sn)
+            mqtt_client.set_metrics(metrics)
+            hass.data[DOMAIN][entry.entry_id]["metrics"] = metrics
+            _LOGGER.info(f"Pipeline metrics enabled for {device_sn}")
+        if entry.options.get(CONF_RECORD_FRAMES, False):
+            frame_recorder = LumentreeFrameRecorder(hass.config.path(FRAME_LOG_DIR, FRAME_LOG_FILE_FORMAT.format(device_sn=device_sn)))
+            frame_recorder.start()
+            mqtt_client.set_frame_recorder(frame_recorder)
+            hass.data[DOMAIN][entry.entry_id]["frame_recorder"] = frame_recorder
+            _LOGGER.info(f"Recording raw MQTT frames for {device_sn} to {frame_recorder.path}")
+        coordinator_stats = LumentreeStatsCoordinator(hass, api_client, device_sn, entry)
         hass.data[DOMAIN][entry.entry_id]["coordinator_stats"] = coordinator_stats
-        try:
-             await coordinator_stats.async_config_entry_first_refresh()
-             _LOGGER.debug(f"Initial stats fetch {device_sn}: Success={coordinator_stats.last_update_success}")
-             if not coordinator_stats.last_update_success: _LOGGER.warning(f"Initial stats fetch failed {device_sn}.")
-        except ConfigEntryAuthFailed: _LOGGER.error(f"HTTP Auth failed for stats {device_sn}."); pass
-        except UpdateFailed: _LOGGER.warning(f"Initial stats fetch failed {device_sn}.")
-        except Exception: _LOGGER.exception(f"Unexpected initial stats error {device_sn}")
+
+        # Live energy: integrate MQTT power between HTTP polls, re-anchored by each stats refresh
+        integrator = LumentreeEnergyIntegrator(hass, device_sn)
+        await integrator.async_load()
+        hass.data[DOMAIN][entry.entry_id]["integrator"] = integrator
+        entry.async_on_unload(async_dispatcher_connect(hass, SIGNAL_UPDATE_FORMAT.format(device_sn=device_sn), integrator.async_handle_update))
+        entry.async_on_unload(coordinator_stats.async_add_listener(
+            lambda: integrator.async_apply_anchor(coordinator_stats.data, getattr(coordinator_stats, "data_date", None))
+        ))
+
+        # MQTT connect (up to CONNECT_TIMEOUT) and the first stats refresh don't block setup:
+        # they run in the background while the device info fetch runs and platforms are forwarded.
+        # Entities stay unavailable until their first data arrives.
+        async def _async_connect_mqtt() -> None:
+            try:
+                await mqtt_client.connect()
+            except ConnectionRefusedError as conn_err:
+                _LOGGER.warning(f"Background MQTT connect failed {device_sn}: {conn_err}")
+
+        async def _async_first_stats_refresh() -> None:
+            await coordinator_stats.async_refresh()
+            _LOGGER.debug(f"Initial stats fetch {device_sn}: Success={coordinator_stats.last_update_success}")
+            if not coordinator_stats.last_update_success: _LOGGER.warning(f"Initial stats fetch failed {device_sn}.")
+
+        entry.async_create_background_task(hass, _async_connect_mqtt(), f"{DOMAIN}_mqtt_connect_{device_sn}")
+        entry.async_create_background_task(hass, _async_first_stats_refresh(), f"{DOMAIN}_stats_first_refresh_{device_sn}")
+
+        # Warm-start cache: restored before platforms so entities start with last-known values
+        cache = LumentreeWarmCache(hass, device_sn)
+        await cache.async_load()
+        hass.data[DOMAIN][entry.entry_id]["cache"] = cache
+        entry.async_on_unload(async_dispatcher_connect(hass, SIGNAL_UPDATE_FORMAT.format(device_sn=device_sn), cache.async_update_values))
+
+        cached_api_info = cache.get_device_info()
+        if cached_api_info:
+            _LOGGER.info(f"Using cached device info for {device_id}: Model={cached_api_info.get('deviceType')}")
+            hass.data[DOMAIN][entry.entry_id]['device_api_info'] = cached_api_info
+        else:
+            _LOGGER.info(f"Fetching device info via HTTP for {device_id}...")
+            try:
+                device_api_info = await api_client.get_device_info(device_id)
+                if "_error" in device_api_info:
+                     _LOGGER.warning(f"Could not fetch device info setup: {device_api_info['_error']}. Using fallback.")
+                     hass.data[DOMAIN][entry.entry_id]['device_api_info'] = cache.get_device_info(allow_stale=True) or {"deviceId": device_sn, "alias": entry.title}
+                else:
+                     hass.data[DOMAIN][entry.entry_id]['device_api_info'] = device_api_info
+                     cache.async_set_device_info(device_api_info)
+                     _LOGGER.info(f"Stored API info: Model={device_api_info.get('deviceType')}, ID={device_api_info.get('deviceId')}")
+            except (ApiException, AuthException) as api_err:
+                 stale_api_info = cache.get_device_info(allow_stale=True)
+                 if not stale_api_info:
+                     _LOGGER.error(f"Failed initial device info fetch {device_id}: {api_err}.")
+                     raise ConfigEntryNotReady(f"Failed device info: {api_err}") from api_err
+                 _LOGGER.warning(f"Device info fetch failed {device_id}: {api_err}. Using stale cached info.")
+                 hass.data[DOMAIN][entry.entry_id]['device_api_info'] = stale_api_info
 
         polling_interval = datetime.timedelta(seconds=DEFAULT_POLLING_INTERVAL)
 
@@ -153,12 +311,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             active_mqtt_client = entry_data.get("mqtt_client")
             if not isinstance(active_mqtt_client, LumentreeMqttClient) or not active_mqtt_client.is_connected: _LOGGER.warning(f"MQTT {device_sn} not ready."); return
             try:
-                _LOGGER.debug(f"Req MQTT (main data) {device_sn}...")
-                await active_mqtt_client.async_request_data()
-                # --- DISABLED BATTERY CELL REQUEST ---
-                # await active_mqtt_client.async_request_battery_cells()
-                # --- END DISABLED ---
-                _LOGGER.debug(f"MQTT req sent {device_sn}.")
+                _LOGGER.debug("Req MQTT (register group) %s...", device_sn)
+                await group_poller.async_tick() # One request per tick: power, with identity/cells interleaved
+                _LOGGER.debug("MQTT req sent %s.", device_sn)
             except Exception as poll_err: _LOGGER.error(f"MQTT poll error {device_sn}: {poll_err}")
 
         remove_interval = async_track_time_interval(hass, _async_poll_data, polling_interval)
@@ -187,6 +342,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 await client_to_stop.disconnect()
 
         entry.async_on_unload(_cancel_timer_on_unload)
+        hass.data[DOMAIN][entry.entry_id]["options"] = dict(entry.options) # Snapshot: data-only updates (token refresh) must not reload
+        entry.async_on_unload(entry.add_update_listener(_async_options_updated))
         entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop_mqtt))
 
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -196,21 +353,50 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     except ConfigEntryNotReady as e:
         _LOGGER.warning(f"Setup failed {entry.title}: {e}. Cleanup...")
         if isinstance(mqtt_client, LumentreeMqttClient): await mqtt_client.disconnect()
+        frame_recorder = hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("frame_recorder")
+        if isinstance(frame_recorder, LumentreeFrameRecorder): await hass.async_add_executor_job(frame_recorder.stop)
         if entry.entry_id in hass.data.get(DOMAIN, {}):
              hass.data[DOMAIN].pop(entry.entry_id, None)
+        _release_shared_data(hass)
         raise
     except Exception as final_exception:
         _LOGGER.exception(f"Unexpected setup error {entry.title}")
         if isinstance(mqtt_client, LumentreeMqttClient): await mqtt_client.disconnect()
+        frame_recorder = hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("frame_recorder")
+        if isinstance(frame_recorder, LumentreeFrameRecorder): await hass.async_add_executor_job(frame_recorder.stop)
         if entry.entry_id in hass.data.get(DOMAIN, {}):
             hass.data[DOMAIN].pop(entry.entry_id, None)
+        _release_shared_data(hass)
         return False # Indicate setup failure
 
+@callback
+def _release_shared_data(hass: HomeAssistant) -> None:
+    """Drop the state shared by all entries (SHARED_DATA_KEYS in hass.data[DOMAIN]) once none is left."""
+    domain_data = hass.data.get(DOMAIN, {})
+    if any(key not in SHARED_DATA_KEYS for key in domain_data): return
+    for key in SHARED_DATA_KEYS: domain_data.pop(key, None)
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry so changed options take effect (the listener also fires for data-only updates)."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    if entry_data.get("options") == dict(entry.options): return
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     _LOGGER.info(f"Unloading Lumentree: {entry.title} (SN/ID: {entry.data.get(CONF_DEVICE_SN)})")
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     entry_data = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
     if entry_data:
+        for cache_key in ("cache", "day_cache", "integrator"):
+            cache = entry_data.get(cache_key)
+            if isinstance(cache, (LumentreeWarmCache, LumentreeDayStatsCache, LumentreeEnergyIntegrator)):
+                await cache.async_flush()
+        write_queue = entry_data.get("write_queue")
+        if isinstance(write_queue, LumentreeWriteQueue):
+            await write_queue.async_stop()
+        frame_recorder = entry_data.get("frame_recorder")
+        if isinstance(frame_recorder, LumentreeFrameRecorder):
+            await hass.async_add_executor_job(frame_recorder.stop)
         mqtt_client = entry_data.get("mqtt_client")
         if isinstance(mqtt_client, LumentreeMqttClient):
              _LOGGER.debug(f"Disconnecting MQTT {entry.data.get(CONF_DEVICE_SN)}.");
@@ -218,5 +404,6 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
              hass.async_create_task(mqtt_client.disconnect())
         _LOGGER.debug(f"Removed entry data {entry.entry_id}.")
     else: _LOGGER.warning(f"No entry data {entry.entry_id} to clean.")
+    _release_shared_data(hass)
     _LOGGER.info(f"Unload {entry.title}: {'OK' if unload_ok else 'Failed'}.")
     return unload_ok
@@ -3,41 +3,160 @@
 
 import asyncio
 import json
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import logging
 import time
 
 import aiohttp
 from aiohttp.client import ClientTimeout
 
+from homeassistant.core import HomeAssistant
+
 try:
+    # Faster JSON decoder when available (ships with Home Assistant)
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from .scheduler import CircuitOpenError, LumentreeRequestScheduler, get_host_scheduler
     from .const import (
-        BASE_URL, DEFAULT_HEADERS, _LOGGER,
+        DOMAIN, BASE_URL, DEFAULT_HEADERS, _LOGGER, INVENTORY_CACHE_TTL, INVENTORY_MAX_PAGES, DATA_INVENTORY,
         URL_GET_SERVER_TIME, URL_SHARE_DEVICES, URL_DEVICE_MANAGE,
         URL_GET_OTHER_DAY_DATA, URL_GET_PV_DAY_DATA, URL_GET_BAT_DAY_DATA
     )
 except ImportError:
-    _LOGGER = logging.getLogger(__name__); BASE_URL = "http://lesvr.suntcn.com"
+    _LOGGER = logging.getLogger(__name__); BASE_URL = "http://lesvr.suntcn.com"; INVENTORY_CACHE_TTL = 300; INVENTORY_MAX_PAGES = 20
+    DOMAIN = "lumentree"; DATA_INVENTORY = "inventory"
     URL_GET_SERVER_TIME = "/lesvr/getServerTime"; URL_SHARE_DEVICES = "/lesvr/shareDevices"
     URL_DEVICE_MANAGE = "/lesvr/deviceManage";
     URL_GET_OTHER_DAY_DATA = "/lesvr/getOtherDayData"; URL_GET_PV_DAY_DATA = "/lesvr/getPVDayData"; URL_GET_BAT_DAY_DATA = "/lesvr/getBatDayData"
     DEFAULT_HEADERS = {"versionCode": "1.6.3", "platform": "2", "wifiStatus": "1", "User-Agent": "Mozilla/5.0", "Accept": "application/json, text/plain, */*", "Accept-Language": "en-US,en;q=0.9"}
+    class CircuitOpenError(Exception): pass
+    class LumentreeRequestScheduler: # Pass-through: no rate limit, coalescing or circuit breaker
+        async def async_call(self, key, factory): return await factory()
+    def get_host_scheduler(hass, host, failure_types): return LumentreeRequestScheduler()
 
 DEFAULT_TIMEOUT = ClientTimeout(total=30)
 AUTH_RETRY_DELAY = 0.5
 AUTH_MAX_RETRIES = 3
+TOKEN_REFRESH_INTERVAL = 6 * 3600 # Refresh proactively; the server doesn't report token lifetime
+TOKEN_REFRESH_RETRY_DELAY = 300
+
+# Day-data endpoints used by get_daily_stats
+DAY_DATA_ENDPOINTS: Tuple[Dict[str, Any], ...] = (
+    {"url": URL_GET_PV_DAY_DATA, "data_key": "pv", "result_key": "pv_today"},
+    {"url": URL_GET_BAT_DAY_DATA, "data_key": "bats", "result_key": ["charge_today", "discharge_today"]},
+    {"url": URL_GET_OTHER_DAY_DATA, "data_key": ["grid", "homeload"], "result_key": ["grid_in_today", "load_today"]},
+)
+
+class _DeviceInventory:
+    """deviceManage results shared by every client and token (hass.data[DOMAIN][DATA_INVENTORY]).
+
+    Tokens are issued per device and may only see their own device, so a device missing from a fresh
+    listing is queried directly instead of listing again per entry.
+    """
+
+    def __init__(self) -> None:
+        self.devices: Dict[str, Tuple[float, Dict[str, Any]]] = {} # Device id (lower) -> (fetched, device)
+        self.listed: Optional[float] = None # Last paginated listing (monotonic)
+        self.fetch: "Optional[asyncio.Future[List[Dict[str, Any]]]]" = None # Listing in flight
+
+    def store(self, devices: List[Dict[str, Any]]) -> None:
+        now = time.monotonic()
+        for device in devices:
+            if device.get("deviceId"): self.devices[str(device["deviceId"]).lower()] = (now, device)
+
+    def find(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Device entry if it is cached and fresh."""
+        cached = self.devices.get(device_id.lower())
+        if cached and time.monotonic() - cached[0] <= INVENTORY_CACHE_TTL: return cached[1]
+        return None
+
+    @property
+    def has_fresh_listing(self) -> bool:
+        return self.listed is not None and time.monotonic() - self.listed <= INVENTORY_CACHE_TTL
+
+def _inventory(hass: HomeAssistant) -> _DeviceInventory:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    inventory = domain_data.get(DATA_INVENTORY)
+    if inventory is None: inventory = domain_data[DATA_INVENTORY] = _DeviceInventory()
+    return inventory
+
+def _parse_curve(raw: Any) -> List[Optional[float]]:
+    """Intraday series (tableValueInfo) as a compact list of floats, None for gaps."""
+    if not isinstance(raw, list): return []
+    curve: List[Optional[float]] = []
+    for point in raw:
+        try: curve.append(round(float(point), 1))
+        except (TypeError, ValueError): curve.append(None)
+    return curve
 
 class ApiException(Exception): pass
 class AuthException(ApiException): pass
+class TransportException(ApiException):
+    """Network-level failure (timeout, connection error, HTTP 5xx); counted by the host circuit breaker."""
 
 class LumentreeHttpApiClient:
     """Handles HTTP Login, Device Info, and Daily Stats API calls."""
-    def __init__(self, session: aiohttp.ClientSession) -> None: self._session = session; self._token: Optional[str] = None
-    def set_token(self, token: Optional[str]): self._token = token; _LOGGER.debug(f"API token {'set' if token else 'cleared'}.")
+    def __init__(self, hass: HomeAssistant, session: aiohttp.ClientSession) -> None:
+        self.hass = hass; self._session = session; self._token: Optional[str] = None; self._endpoint_latency_ms: Dict[str, float] = {}
+        self._response_stats: Dict[str, float] = {"responses": 0, "bytes_total": 0, "last_bytes": 0, "decode_ms_total": 0.0, "last_decode_ms": 0.0}
+        self._device_id: Optional[str] = None; self._token_issued_at: Optional[float] = None
+        self._token_lock = asyncio.Lock(); self._token_listener: Optional[Callable[[str, float], None]] = None
+        self._day_cache: Optional[Any] = None
+        self._scheduler: LumentreeRequestScheduler = get_host_scheduler(hass, BASE_URL, (TransportException,))
+    def set_token(self, token: Optional[str], issued_at: Optional[float] = None):
+        self._token = token; self._token_issued_at = issued_at; _LOGGER.debug(f"API token {'set' if token else 'cleared'}.")
+    def set_device_id(self, device_id: Optional[str]) -> None:
+        """Enable automatic re-authentication for this device ID."""
+        self._device_id = device_id
+    def set_token_listener(self, listener: Optional[Callable[[str, float], None]]) -> None:
+        """Register a callback (token, issued_at) called after each automatic token refresh."""
+        self._token_listener = listener
+
+    def set_day_cache(self, day_cache: Optional[Any]) -> None:
+        """Attach a day-stats cache (get/put by device, endpoint, date) used by get_daily_stats."""
+        self._day_cache = day_cache
+
+    def _token_needs_refresh(self) -> bool:
+        return self._token_issued_at is None or time.time() - self._token_issued_at > TOKEN_REFRESH_INTERVAL
+
+    async def _async_refresh_token(self, stale_token: Optional[str]) -> None:
+        """Single-flight re-auth: concurrent callers wait for one refresh instead of each re-authenticating."""
+        async with self._token_lock:
+            if self._token and self._token != stale_token:
+                _LOGGER.debug("Token already refreshed by another request.")
+                return
+            token = await self.authenticate_device(self._device_id)
+            if self._token_listener:
+                try: self._token_listener(token, self._token_issued_at or time.time())
+                except Exception: _LOGGER.exception("Token listener failed")
 
     async def _request(
         self, method: str, endpoint: str, params: Optional[Dict[str, Any]] = None, data: Optional[Dict[str, Any]] = None,
         extra_headers: Optional[Dict[str, str]] = None, requires_auth: bool = True
+    ) -> Dict[str, Any]:
+        """Send a request; on auth failure refresh the token once and retry (when a device ID is set)."""
+        if not requires_auth or not self._device_id:
+            return await self._send_request(method, endpoint, params, data, extra_headers, requires_auth)
+        if self._token_needs_refresh():
+            try: await self._async_refresh_token(self._token)
+            except (ApiException, AuthException) as exc:
+                _LOGGER.warning(f"Proactive token refresh failed, using current token: {exc}")
+                self._token_issued_at = time.time() - TOKEN_REFRESH_INTERVAL + TOKEN_REFRESH_RETRY_DELAY # Don't retry on every request
+        token_used = self._token
+        try:
+            return await self._send_request(method, endpoint, params, data, extra_headers, requires_auth)
+        except AuthException as exc:
+            _LOGGER.warning(f"Auth failed for {endpoint} ({exc}), refreshing token and retrying.")
+            await self._async_refresh_token(token_used)
+            return await self._send_request(method, endpoint, params, data, extra_headers, requires_auth)
+
+    async def _send_request(
+        self, method: str, endpoint: str, params: Optional[Dict[str, Any]], data: Optional[Dict[str, Any]],
+        extra_headers: Optional[Dict[str, str]], requires_auth: bool
     ) -> Dict[str, Any]:
         url = f"{BASE_URL}{endpoint}"; headers = DEFAULT_HEADERS.copy();
         if extra_headers: headers.update(extra_headers)
@@ -45,13 +164,33 @@ class LumentreeHttpApiClient:
             if self._token: headers["Authorization"] = self._token
             else: _LOGGER.error(f"Token needed for {endpoint}"); raise AuthException("Token required")
         if data and method.upper() == "POST": headers["Content-Type"] = headers.get("Content-Type", "application/x-www-form-urlencoded")
-        _LOGGER.debug(f"HTTP Req: {method} {url}, H: {headers}, P: {params}, D: {data}")
+        # Identical GETs in flight (same endpoint, params and token) share one response
+        key = (endpoint, tuple(sorted(params.items())) if params else (), headers.get("Authorization")) if method.upper() == "GET" else None
+        try:
+            return await self._scheduler.async_call(key, lambda: self._http_call(method, url, endpoint, headers, params, data))
+        except CircuitOpenError as exc:
+            _LOGGER.debug("Skipping %s: %s", url, exc); raise ApiException(str(exc)) from exc
+
+    async def _http_call(
+        self, method: str, url: str, endpoint: str, headers: Dict[str, str], params: Optional[Dict[str, Any]], data: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        _LOGGER.debug("HTTP Req: %s %s, P: %s, D: %s", method, url, params, data)
         try:
             async with self._session.request(method, url, headers=headers, params=params, data=data, timeout=DEFAULT_TIMEOUT) as response:
-                _LOGGER.debug(f"HTTP Resp Status: {response.status} from {url}"); resp_text = await response.text(); resp_text_short = resp_text[:300]
-                try: resp_json = await response.json(content_type=None); _LOGGER.debug(f"HTTP Resp JSON: {resp_json}")
-                except (json.JSONDecodeError, aiohttp.ContentTypeError) as json_err: _LOGGER.error(f"Invalid JSON {url}: {resp_text_short}"); raise ApiException(f"Invalid JSON: {resp_text_short}") from json_err
+                # Read the body once and decode it once
+                body = await response.read()
+                # Status first: outage pages (HTML or JSON 5xx bodies) must reach the circuit breaker as transport failures
+                if response.status >= 500: _LOGGER.error(f"HTTP error {url}: {response.status}"); raise TransportException(f"HTTP error: {response.status}")
+                if response.status in (401, 403): raise AuthException(f"Auth error ({response.status}): {body[:100].decode('utf-8', 'replace')}")
+                decode_started = time.perf_counter()
+                try: resp_json = _json_loads(body) if body.strip() else None
+                except ValueError as json_err:
+                    resp_text_short = body[:300].decode("utf-8", "replace"); _LOGGER.error(f"Invalid JSON {url}: {resp_text_short}")
+                    raise ApiException(f"Invalid JSON: {resp_text_short}") from json_err
+                self._record_response(len(body), time.perf_counter() - decode_started)
+                _LOGGER.debug("HTTP Resp %s from %s (%d bytes): %s", response.status, url, len(body), resp_json)
                 if not response.ok and not resp_json: response.raise_for_status()
+                if not isinstance(resp_json, dict): _LOGGER.error(f"Unexpected response {url}: {type(resp_json).__name__}"); raise ApiException("Unexpected response format")
                 return_value = resp_json.get("returnValue")
                 if endpoint == URL_GET_SERVER_TIME and "data" in resp_json and "serverTime" in resp_json["data"]: return resp_json
                 if return_value != 1:
@@ -59,15 +198,32 @@ class LumentreeHttpApiClient:
                     if return_value == 203 or response.status in [401, 403]: raise AuthException(f"Auth failed (RC={return_value}, HTTP={response.status}): {msg}")
                     raise ApiException(f"API error {msg} (RC={return_value})")
                 return resp_json
-        except asyncio.TimeoutError as exc: _LOGGER.error(f"Timeout {url}"); raise ApiException("Timeout") from exc
+        except asyncio.TimeoutError as exc: _LOGGER.error(f"Timeout {url}"); raise TransportException("Timeout") from exc
         except aiohttp.ClientResponseError as exc:
             if exc.status in [401, 403]: raise AuthException(f"Auth error ({exc.status}): {exc.message}") from exc
-            _LOGGER.error(f"HTTP error {url}: {exc.status}"); raise ApiException(f"HTTP error: {exc.status}") from exc
-        except aiohttp.ClientError as exc: _LOGGER.error(f"Client error {url}: {exc}"); raise ApiException(f"Client error: {exc}") from exc
+            _LOGGER.error(f"HTTP error {url}: {exc.status}")
+            if exc.status >= 500: raise TransportException(f"HTTP error: {exc.status}") from exc
+            raise ApiException(f"HTTP error: {exc.status}") from exc
+        except aiohttp.ClientError as exc: _LOGGER.error(f"Client error {url}: {exc}"); raise TransportException(f"Client error: {exc}") from exc
         except AuthException: raise
         except ApiException: raise
         except Exception as exc: _LOGGER.exception(f"Unexpected HTTP error {url}"); raise ApiException(f"Unexpected: {exc}") from exc
 
+    def _record_response(self, size: int, decode_seconds: float) -> None:
+        stats = self._response_stats; decode_ms = decode_seconds * 1000
+        stats["responses"] += 1; stats["bytes_total"] += size; stats["last_bytes"] = size
+        stats["decode_ms_total"] += decode_ms; stats["last_decode_ms"] = round(decode_ms, 3)
+
+    @property
+    def scheduler(self) -> LumentreeRequestScheduler:
+        """Shared per-host scheduler (rate limit and circuit breaker state)."""
+        return self._scheduler
+
+    @property
+    def response_stats(self) -> Dict[str, float]:
+        """Response count, body sizes (bytes) and JSON decode time (ms)."""
+        return dict(self._response_stats)
+
     async def _get_server_time(self) -> Optional[int]:
         _LOGGER.debug("Fetching server time...")
         try:
@@ -98,7 +254,7 @@ class LumentreeHttpApiClient:
                 if not server_time: raise ApiException("Failed to get server time for token request.")
                 token = await self._get_token(device_id, server_time)
                 if not token: raise AuthException(f"Failed get token (attempt {attempt+1})")
-                _LOGGER.info(f"Auth success {device_id}"); self.set_token(token); return token
+                _LOGGER.info(f"Auth success {device_id}"); self.set_token(token, time.time()); return token
             except (ApiException, AuthException) as exc: _LOGGER.warning(f"Auth attempt {attempt+1} fail: {exc}"); last_exc = exc
             except Exception as exc: _LOGGER.exception(f"Unexpected auth err {attempt+1}"); last_exc = AuthException(f"Unexpected: {exc}")
             # Sleep only if not the last attempt
@@ -108,9 +264,52 @@ class LumentreeHttpApiClient:
         if last_exc: raise last_exc
         else: raise AuthException("Auth failed (Unknown reason)")
 
+    async def _fetch_inventory_pages(self) -> List[Dict[str, Any]]:
+        devices: List[Dict[str, Any]] = []; seen: set = set(); page_size = 0
+        for page in range(1, INVENTORY_MAX_PAGES + 1):
+            response_json = await self._request("POST", URL_DEVICE_MANAGE, params={"page": str(page)}, requires_auth=True)
+            response_data = response_json.get("data", {})
+            page_devices = response_data.get("devices") if isinstance(response_data, dict) else None
+            if not isinstance(page_devices, list): break
+            new = [d for d in page_devices if isinstance(d, dict) and d.get("deviceId") not in seen]
+            seen.update(d.get("deviceId") for d in new); devices.extend(new)
+            page_size = max(page_size, len(page_devices))
+            # Last page: short or empty, or the server ignored the page number and repeated itself
+            if not new or len(page_devices) < page_size: break
+        else: _LOGGER.warning(f"Device inventory truncated at {INVENTORY_MAX_PAGES} pages ({len(devices)} devices).")
+        _LOGGER.debug(f"Device inventory: {len(devices)} devices in {page} page(s)")
+        return devices
+
+    async def get_device_inventory(self) -> List[Dict[str, Any]]:
+        """Every device visible to the current token (paginated), single-flight across clients and tokens."""
+        inventory = _inventory(self.hass)
+        if inventory.fetch is not None: return await asyncio.shield(inventory.fetch)
+        future: "asyncio.Future[List[Dict[str, Any]]]" = asyncio.get_running_loop().create_future()
+        inventory.fetch = future
+        try:
+            devices = await self._fetch_inventory_pages()
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError): future.cancel()
+            else: future.set_exception(exc); future.exception() # Mark retrieved so an unawaited future doesn't log
+            raise
+        else:
+            inventory.store(devices); inventory.listed = time.monotonic(); future.set_result(devices)
+            return devices
+        finally:
+            if inventory.fetch is future: inventory.fetch = None
+
     async def get_device_info(self, device_id: str) -> Dict[str, Any]:
         _LOGGER.debug(f"Fetching HTTP device info for ID: {device_id} using {URL_DEVICE_MANAGE}")
         if not device_id: _LOGGER.warning("Device ID missing."); return {"_error": "Device ID missing"}
+        inventory = _inventory(self.hass); device_info_dict = inventory.find(device_id)
+        # One listing per TTL; a device it didn't show (token scoped to another device) is queried directly
+        if device_info_dict is None and (inventory.fetch is not None or not inventory.has_fresh_listing):
+            try:
+                await self.get_device_inventory(); device_info_dict = inventory.find(device_id)
+            except (ApiException, AuthException) as exc: _LOGGER.debug(f"Device inventory unavailable ({exc}), querying {device_id} directly.")
+        if device_info_dict is not None:
+            _LOGGER.debug(f"Device info from inventory: {device_info_dict}")
+            return device_info_dict
         try:
             params = {"page": "1", "snName": device_id}
             response_json = await self._request("POST", URL_DEVICE_MANAGE, params=params, requires_auth=True)
@@ -119,6 +318,7 @@ class LumentreeHttpApiClient:
             if isinstance(devices_list, list) and len(devices_list) > 0:
                 device_info_dict = devices_list[0]
                 if isinstance(device_info_dict, dict):
+                    inventory.store([device_info_dict])
                     _LOGGER.debug(f"Device info via HTTP ({URL_DEVICE_MANAGE}): {device_info_dict}")
                     _LOGGER.info(f"API Info: ID={device_info_dict.get('deviceId')}, Type={device_info_dict.get('deviceType')}, Ctrl={device_info_dict.get('controllerVersion')}, Lcd={device_info_dict.get('liquidCrystalVersion')}")
                     return device_info_dict
@@ -127,8 +327,49 @@ class LumentreeHttpApiClient:
         except (ApiException, AuthException) as exc: _LOGGER.error(f"Failed get info {device_id}: {exc}"); raise
         except Exception as exc: _LOGGER.exception(f"Unexpected get info {device_id}"); return {"_error": f"Unexpected: {exc}"}
 
-    # --- SỬA HÀM NÀY ---
-    async def get_daily_stats(self, device_identifier: str, query_date: str) -> Dict[str, Optional[float]]:
+    @property
+    def endpoint_latencies(self) -> Dict[str, float]:
+        """Last observed latency (ms) per endpoint."""
+        return dict(self._endpoint_latency_ms)
+
+    async def _fetch_day_endpoint(self, config: Dict[str, Any], base_params: Dict[str, str], with_curves: bool = False) -> Dict[str, Any]:
+        """Fetch one day-data endpoint: {"values": tableValue(s) by result key, "curves": intraday series by name}."""
+        url = config["url"]
+        data_key = config["data_key"]
+        result_key = config["result_key"]
+        if self._day_cache is not None:
+            cached = self._day_cache.get(base_params["deviceId"], url, base_params["queryDate"], with_curves)
+            if cached is not None: _LOGGER.debug("Day stats cache hit %s %s", url, base_params["queryDate"]); return cached
+        started = time.monotonic()
+        try:
+            resp = await self._request("GET", url, params=base_params, requires_auth=True)
+        finally:
+            self._endpoint_latency_ms[url] = round((time.monotonic() - started) * 1000, 1)
+        data = resp.get("data", {})
+
+        # Pair each data item with its result key based on data_key type
+        if isinstance(data_key, list): # Multiple keys (Other data)
+            items = [(data.get(dk, {}), result_key[i]) for i, dk in enumerate(data_key)]
+        elif data_key == "bats": # Battery list: [charge, discharge]
+            bats_data = data.get(data_key, [])
+            items = [(bats_data[i], rk) for i, rk in enumerate(result_key) if isinstance(bats_data, list) and i < len(bats_data)]
+        else: # Single key (PV data)
+            items = [(data.get(data_key, {}), result_key)]
+
+        values: Dict[str, float] = {}
+        curves: Dict[str, List[Optional[float]]] = {}
+        for item_data, rk in items:
+            if not isinstance(item_data, dict): continue
+            val = item_data.get("tableValue")
+            if val is not None: values[rk] = float(val) / 10.0
+            curve = _parse_curve(item_data.get("tableValueInfo"))
+            if curve: curves[rk.replace("_today", "")] = curve
+        payload = {"values": values, "curves": curves}
+        if self._day_cache is not None: self._day_cache.put(base_params["deviceId"], url, base_params["queryDate"], payload)
+        return payload
+
+    async def get_daily_stats(self, device_identifier: str, query_date: str, strict: bool = False) -> Dict[str, Optional[float]]:
+        """Fetch the three day-data endpoints concurrently; failed endpoints are left out of the result (or raise if strict)."""
         _LOGGER.debug(f"Fetching daily stats {device_identifier} @ {query_date}")
         results: Dict[str, Optional[float]] = {
             "pv_today": None, "charge_today": None, "discharge_today": None,
@@ -136,63 +377,28 @@ class LumentreeHttpApiClient:
         }
         base_params = {"deviceId": device_identifier, "queryDate": query_date}
 
-        # Define API calls configuration
-        api_calls_config = [
-            {"url": URL_GET_PV_DAY_DATA, "data_key": "pv", "result_key": "pv_today"},
-            {"url": URL_GET_BAT_DAY_DATA, "data_key": "bats", "result_key": ["charge_today", "discharge_today"]},
-            {"url": URL_GET_OTHER_DAY_DATA, "data_key": ["grid", "homeload"], "result_key": ["grid_in_today", "load_today"]},
-        ]
-
-        # Loop through each API call configuration
-        for config in api_calls_config:
-            url = config["url"]
-            data_key = config["data_key"]
+        outcomes = await asyncio.gather(
+            *(self._fetch_day_endpoint(config, base_params) for config in DAY_DATA_ENDPOINTS), return_exceptions=True
+        )
+        for config, outcome in zip(DAY_DATA_ENDPOINTS, outcomes):
             result_key = config["result_key"]
+            if strict and isinstance(outcome, BaseException):
+                raise outcome if isinstance(outcome, ApiException) else ApiException(f"Unexpected {result_key} stats error: {outcome!r}")
+            if isinstance(outcome, (ApiException, AuthException)):
+                # Don't raise here so the other endpoints still provide partial results
+                _LOGGER.warning(f"Failed {result_key} stats ({type(outcome).__name__}): {outcome}")
+            elif isinstance(outcome, BaseException):
+                _LOGGER.error(f"Unexpected {result_key} stats error: {outcome!r}")
+            else:
+                results.update(outcome["values"])
 
-            try: # <<< Khối try bao quanh mỗi lệnh gọi API >>>
-                resp = await self._request("GET", url, params=base_params, requires_auth=True)
-                data = resp.get("data", {})
-
-                # Process based on data_key type
-                if isinstance(data_key, list): # Handle multiple keys (Other data)
-                    for i, dk in enumerate(data_key):
-                        item_data = data.get(dk, {})
-                        val = item_data.get("tableValue")
-                        rk = result_key[i]
-                        if val is not None:
-                             # Check if rk is a valid key before assigning
-                            if rk in results:
-                                results[rk] = float(val) / 10.0
-                            else:
-                                 _LOGGER.warning(f"Result key '{rk}' not defined in results dict.")
-                elif data_key == "bats": # Handle battery list
-                    bats_data = data.get(data_key, [])
-                    if isinstance(bats_data, list):
-                        rk_charge, rk_discharge = result_key[0], result_key[1]
-                        if len(bats_data) > 0 and "tableValue" in bats_data[0]:
-                             if rk_charge in results: results[rk_charge] = float(bats_data[0]["tableValue"]) / 10.0
-                        if len(bats_data) > 1 and "tableValue" in bats_data[1]:
-                             if rk_discharge in results: results[rk_discharge] = float(bats_data[1]["tableValue"]) / 10.0
-                else: # Handle single key (PV data)
-                    item_data = data.get(data_key, {})
-                    val = item_data.get("tableValue")
-                    # Ensure result_key is a string and exists in results
-                    if isinstance(result_key, str) and result_key in results:
-                         if val is not None: results[result_key] = float(val) / 10.0
-                    else:
-                         _LOGGER.warning(f"Result key '{result_key}' not valid or not defined.")
-
-            # <<< Khối except tương ứng với try ở trên >>>
-            except (ApiException, AuthException) as e:
-                _LOGGER.warning(f"Failed {result_key} stats ({type(e).__name__}): {e}")
-                # Don't raise here to allow other stats calls to proceed,
-                # but if it's an Auth error, the coordinator should eventually fail.
-                if isinstance(e, AuthException):
-                     # Optionally raise immediately if auth failure should stop all stats
-                     # raise
-                     pass # Continue for now
-            except Exception:
-                _LOGGER.exception(f"Unexpected {result_key} stats error")
-
-        _LOGGER.debug(f"Processed daily stats: {results}")
-        return {k: v for k, v in results.items() if v is not None}
\ No newline at end of file
+        _LOGGER.debug(f"Processed daily stats: {results} (latency ms: {self._endpoint_latency_ms})")
+        return {k: v for k, v in results.items() if v is not None}
+
+    async def get_daily_curves(self, device_identifier: str, query_date: str) -> Dict[str, List[Optional[float]]]:
+        """Intraday series (pv, charge, discharge, grid_in, load) from the day-data endpoints; raises on failure."""
+        base_params = {"deviceId": device_identifier, "queryDate": query_date}
+        outcomes = await asyncio.gather(*(self._fetch_day_endpoint(config, base_params, True) for config in DAY_DATA_ENDPOINTS))
+        curves: Dict[str, List[Optional[float]]] = {}
+        for outcome in outcomes: curves.update(outcome["curves"])
+        return curves
@@ -0,0 +1,179 @@
+# /config/custom_components/lumentree/backfill.py
+# Historical energy backfill: daily totals from the HTTP API -> recorder long-term statistics
+
+import asyncio
+import datetime
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        DOMAIN, _LOGGER, BACKFILL_DAY_CONCURRENCY, BACKFILL_MIN_INTERVAL,
+        BACKFILL_BATCH_DAYS, BACKFILL_STATISTICS
+    )
+    from .api import LumentreeHttpApiClient
+    from .intraday import async_import_intraday
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    DOMAIN = "lumentree"; BACKFILL_DAY_CONCURRENCY = 3; BACKFILL_MIN_INTERVAL = 0.25; BACKFILL_BATCH_DAYS = 31
+    BACKFILL_STATISTICS = {"pv_today": ("pv_energy", "PV Generation")}
+    LumentreeHttpApiClient = Any
+    async def async_import_intraday(hass, device_sn, day_curves): return 0
+
+
+def statistic_id_for(device_sn: str, suffix: str) -> str:
+    """External statistic ID for a device metric (lumentree:<sn>_<suffix>)."""
+    return f"{DOMAIN}:{device_sn.lower()}_{suffix}"
+
+
+def energy_metadata(device_sn: str, suffix: str, name: str, has_mean: bool = False, unit: str = UnitOfEnergy.KILO_WATT_HOUR) -> Dict[str, Any]:
+    """Build recorder StatisticMetaData for an external Lumentree statistic."""
+    from homeassistant.components.recorder.models import StatisticMetaData
+
+    metadata = StatisticMetaData(
+        has_mean=has_mean, has_sum=not has_mean, name=f"Lumentree {device_sn} {name}",
+        source=DOMAIN, statistic_id=statistic_id_for(device_sn, suffix), unit_of_measurement=unit,
+    )
+    try:
+        from homeassistant.components.recorder.models import StatisticMeanType
+        metadata["mean_type"] = StatisticMeanType.ARITHMETIC if has_mean else StatisticMeanType.NONE
+    except ImportError:
+        pass
+    metadata["unit_class"] = "energy" if unit == UnitOfEnergy.KILO_WATT_HOUR else "power"
+    return metadata
+
+
+_EPOCH = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+async def _async_statistic_rows(
+    hass: HomeAssistant, statistic_id: str, start: datetime.datetime, end: Optional[datetime.datetime], period: str
+) -> List[Dict[str, Any]]:
+    from homeassistant.components.recorder import get_instance
+    from homeassistant.components.recorder.statistics import statistics_during_period
+
+    rows = await get_instance(hass).async_add_executor_job(
+        statistics_during_period, hass, start, end, {statistic_id}, period, None, {"state", "sum"}
+    )
+    return rows.get(statistic_id) or []
+
+
+def _row_start(row: Dict[str, Any]) -> datetime.datetime:
+    start = row["start"]
+    return dt_util.utc_from_timestamp(start) if isinstance(start, (int, float)) else start
+
+
+async def _async_sum_before(hass: HomeAssistant, statistic_id: str, start: datetime.datetime) -> float:
+    """Cumulative sum of the last row before `start`, however far back (0 if nothing imported yet)."""
+    series = await _async_statistic_rows(hass, statistic_id, _EPOCH, start, "month") # A month row carries its last hour's sum
+    return float(series[-1].get("sum") or 0.0) if series else 0.0
+
+
+def _rebased_rows(
+    rows: List[Dict[str, Any]], boundary: datetime.datetime, baseline: float, new_sum: float
+) -> List[Dict[str, Any]]:
+    """Rows stored after `boundary`, shifted so they continue from `new_sum` instead of the old sum at the boundary."""
+    old_sum = baseline
+    later = []
+    for row in rows:
+        if _row_start(row) <= boundary: old_sum = float(row.get("sum") or 0.0)
+        else: later.append(row)
+    delta = new_sum - old_sum
+    if not later or abs(delta) < 1e-6: return []
+    return [{"start": _row_start(row), "state": row.get("state"), "sum": float(row.get("sum") or 0.0) + delta} for row in later]
+
+
+async def async_backfill_energy(
+    hass: HomeAssistant, api_client: LumentreeHttpApiClient, device_sn: str,
+    start_date: datetime.date, end_date: datetime.date, include_intraday: bool = False
+) -> Dict[str, Any]:
+    """Fetch daily totals for [start_date, end_date] and import them as hourly statistics at local midnight.
+
+    Days are fetched with bounded concurrency and paced starts. Fetched days land in the
+    day stats cache (the resume checkpoint), so re-running only downloads missing days.
+    Statistics are imported once per batch per metric and stop at the first day whose
+    fetch failed, keeping cumulative sums consistent; rerun to resume. Rows already stored
+    after the imported days (an earlier backfill of later dates) are re-based onto the new
+    sums. With `include_intraday` the hourly power curves of each batch are imported as well.
+    """
+    from homeassistant.components.recorder.models import StatisticData
+    from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+    days: List[datetime.date] = [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    _LOGGER.info(f"Energy backfill {device_sn}: {start_date} -> {end_date} ({len(days)} days)")
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(BACKFILL_DAY_CONCURRENCY)
+    pace_lock = asyncio.Lock()
+    next_start = 0.0
+
+    async def _fetch_day(day: datetime.date) -> Dict[str, Any]:
+        nonlocal next_start
+        async with semaphore:
+            async with pace_lock:
+                delay = next_start - time.monotonic()
+                if delay > 0: await asyncio.sleep(delay)
+                next_start = time.monotonic() + BACKFILL_MIN_INTERVAL
+            return await api_client.get_daily_stats(device_sn, day.isoformat(), strict=True)
+
+    first_start = dt_util.start_of_local_day(start_date)
+    sums: Dict[str, float] = {}
+    baselines: Dict[str, float] = {}
+    existing: Dict[str, List[Dict[str, Any]]] = {} # Rows stored from start_date on, before this import
+    for key, (suffix, _name) in BACKFILL_STATISTICS.items():
+        statistic_id = statistic_id_for(device_sn, suffix)
+        sums[key] = baselines[key] = await _async_sum_before(hass, statistic_id, first_start)
+        existing[key] = await _async_statistic_rows(hass, statistic_id, first_start, None, "hour")
+
+    imported_days = 0
+    intraday_points = 0
+    resume_from: Optional[str] = None
+    for batch_start in range(0, len(days), BACKFILL_BATCH_DAYS):
+        batch = days[batch_start:batch_start + BACKFILL_BATCH_DAYS]
+        results = await asyncio.gather(*(_fetch_day(day) for day in batch), return_exceptions=True)
+        points: Dict[str, List[StatisticData]] = {key: [] for key in BACKFILL_STATISTICS}
+        for day, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                resume_from = day.isoformat()
+                _LOGGER.warning(f"Energy backfill {device_sn}: fetch failed for {day} ({result}); stopping, rerun to resume.")
+                break
+            day_start = dt_util.start_of_local_day(day)
+            for key in BACKFILL_STATISTICS:
+                value = float(result.get(key) or 0.0)
+                sums[key] += value
+                points[key].append(StatisticData(start=day_start, state=value, sum=sums[key]))
+            imported_days += 1
+        for key, (suffix, name) in BACKFILL_STATISTICS.items():
+            if points[key]:
+                async_add_external_statistics(hass, energy_metadata(device_sn, suffix, name), points[key])
+        if include_intraday:
+            # Payloads were just cached by get_daily_stats, so this costs no extra requests
+            day_curves = {}
+            for day in batch[:len(points["pv_today"])]:
+                try: day_curves[day] = await api_client.get_daily_curves(device_sn, day.isoformat())
+                except Exception as err: _LOGGER.warning(f"Intraday curves unavailable {device_sn} {day}: {err}")
+            intraday_points += await async_import_intraday(hass, device_sn, day_curves)
+        if resume_from:
+            break
+        _LOGGER.debug("Energy backfill %s: %d/%d days imported", device_sn, imported_days, len(days))
+
+    rebased_rows = 0
+    if imported_days:
+        boundary = dt_util.start_of_local_day(days[imported_days - 1])
+        for key, (suffix, name) in BACKFILL_STATISTICS.items():
+            rows = _rebased_rows(existing[key], boundary, baselines[key], sums[key])
+            if not rows: continue
+            async_add_external_statistics(hass, energy_metadata(device_sn, suffix, name), [StatisticData(**row) for row in rows])
+            rebased_rows += len(rows)
+        if rebased_rows: _LOGGER.info(f"Energy backfill {device_sn}: re-based {rebased_rows} later statistic rows onto the new sums")
+
+    elapsed = round(time.monotonic() - started, 1)
+    _LOGGER.info(f"Energy backfill {device_sn}: imported {imported_days}/{len(days)} days in {elapsed}s")
+    return {
+        "device_sn": device_sn, "days_requested": len(days), "days_imported": imported_days,
+        "intraday_points": intraday_points, "rebased_rows": rebased_rows, "resume_from": resume_from, "elapsed_seconds": elapsed,
+    }
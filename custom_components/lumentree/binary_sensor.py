@@ -44,6 +44,8 @@ async def async_setup_entry(
         device_sn = entry.data[CONF_DEVICE_SN]
         device_name = entry.data[CONF_DEVICE_NAME]
         device_api_info = entry_data.get('device_api_info', {})
+        cache = entry_data.get("cache")
+        initial_data: Dict[str, Any] = dict(cache.values) if cache is not None else {}
     except KeyError as e: _LOGGER.error(f"Missing key {e} for binary sensors."); return
 
     device_info = DeviceInfo(
@@ -54,16 +56,20 @@ async def async_setup_entry(
     )
     _LOGGER.debug(f"Creating DeviceInfo for BinarySensors {device_sn}: {device_info}")
 
-    entities = [ LumentreeBinarySensor(hass, entry, device_info, description) for description in BINARY_SENSOR_DESCRIPTIONS ]
+    entities = [ LumentreeBinarySensor(hass, entry, device_info, description, initial_data) for description in BINARY_SENSOR_DESCRIPTIONS ]
     if entities: async_add_entities(entities); _LOGGER.info(f"Added {len(entities)} binary sensors for {device_sn}")
 
 class LumentreeBinarySensor(BinarySensorEntity):
     _attr_should_poll = False; _attr_has_entity_name = True
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_info: DeviceInfo, description: BinarySensorEntityDescription) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_info: DeviceInfo, description: BinarySensorEntityDescription, initial_data: Optional[Dict[str, Any]] = None) -> None:
         self.hass = hass; self.entity_description = description; self._device_sn = entry.data[CONF_DEVICE_SN]
         self._attr_unique_id = f"{self._device_sn}_{description.key}"; object_id = f"device_{self._device_sn}_{slugify(description.key)}"; self._attr_object_id = object_id
         self.entity_id = generate_entity_id("binary_sensor.{}", self._attr_object_id, hass=hass)
         self._attr_device_info = device_info; self._attr_is_on = None; self._remove_dispatcher: Optional[Callable] = None # <<< Bắt đầu là None (Unknown)
+        # Online status is always available (Unknown -> On/Off); other sensors wait for their first value
+        self._attr_available = description.key == KEY_ONLINE_STATUS
+        initial_state = (initial_data or {}).get(description.key)
+        if isinstance(initial_state, bool) and description.key != KEY_ONLINE_STATUS: self._attr_is_on = initial_state; self._attr_available = True
         _LOGGER.debug(f"Init binary sensor: uid={self.unique_id}, eid={self.entity_id}, name={self.name}")
 
     @callback
@@ -73,9 +79,10 @@ class LumentreeBinarySensor(BinarySensorEntity):
             new_state = data[self.entity_description.key]
             # Xử lý cả True và False
             if isinstance(new_state, bool):
-                if self._attr_is_on != new_state:
+                if self._attr_is_on != new_state or not self._attr_available:
                     _LOGGER.info(f"Binary sensor {self.entity_id} state changing to: {new_state}")
                     self._attr_is_on = new_state
+                    self._attr_available = True
                     self.async_write_ha_state()
             else:
                 _LOGGER.warning(f"Received non-boolean value for {self.unique_id}: {new_state}")
@@ -0,0 +1,202 @@
+# /config/custom_components/lumentree/cache.py
+# Warm-start cache: device info (with TTL) and snapshot of last decoded values
+
+import time
+import datetime
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from homeassistant.const import SUN_EVENT_SUNSET
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.sun import get_astral_event_date
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        _LOGGER, CACHE_STORAGE_VERSION, CACHE_STORAGE_KEY_FORMAT,
+        DEVICE_INFO_CACHE_TTL, VALUES_SAVE_DELAY,
+        DAY_STATS_STORAGE_KEY_FORMAT, DAY_STATS_TODAY_TTL, DAY_STATS_CLOSE_GRACE,
+        DAY_STATS_PV_SETTLE, DAY_STATS_SAVE_DELAY, DAY_STATS_MAX_DAYS, DAY_STATS_MEMORY_CURVES, URL_GET_PV_DAY_DATA,
+        KEY_ONLINE_STATUS, KEY_LAST_RAW_MQTT
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    CACHE_STORAGE_VERSION = 1; CACHE_STORAGE_KEY_FORMAT = "lumentree.cache_{device_sn}"
+    DEVICE_INFO_CACHE_TTL = 86400; VALUES_SAVE_DELAY = 60
+    DAY_STATS_STORAGE_KEY_FORMAT = "lumentree.day_stats_{device_sn}"; DAY_STATS_TODAY_TTL = 300; DAY_STATS_CLOSE_GRACE = 3600
+    DAY_STATS_PV_SETTLE = 1800; DAY_STATS_SAVE_DELAY = 30; DAY_STATS_MAX_DAYS = 62; DAY_STATS_MEMORY_CURVES = 100; URL_GET_PV_DAY_DATA = "/lesvr/getPVDayData"
+    KEY_ONLINE_STATUS = "online_status"; KEY_LAST_RAW_MQTT = "last_raw_mqtt_hex"
+
+# Keys that describe the live connection, not the device - never restored
+_VOLATILE_KEYS = {KEY_ONLINE_STATUS, KEY_LAST_RAW_MQTT, "error"}
+
+
+class LumentreeWarmCache:
+    """Persists device info and last known values so setup needs no HTTP round-trip."""
+
+    def __init__(self, hass: HomeAssistant, device_sn: str) -> None:
+        """Initialize the cache."""
+        self._device_sn = device_sn
+        self._store: Store = Store(hass, CACHE_STORAGE_VERSION, CACHE_STORAGE_KEY_FORMAT.format(device_sn=device_sn))
+        self._device_info: Optional[Dict[str, Any]] = None
+        self._device_info_ts: float = 0.0
+        self._values: Dict[str, Any] = {}
+
+    async def async_load(self) -> None:
+        """Load the cache from disk (once, at setup)."""
+        try:
+            stored = await self._store.async_load()
+        except Exception as err:
+            _LOGGER.warning(f"Could not load warm-start cache {self._device_sn}: {err}")
+            return
+        if not isinstance(stored, dict):
+            return
+        device_info = stored.get("device_info")
+        if isinstance(device_info, dict):
+            self._device_info = device_info
+            self._device_info_ts = float(stored.get("device_info_ts") or 0.0)
+        values = stored.get("values")
+        if isinstance(values, dict):
+            self._values = values
+        _LOGGER.debug(f"Warm-start cache loaded {self._device_sn}: info={'yes' if self._device_info else 'no'}, {len(self._values)} values")
+
+    def get_device_info(self, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Return cached device info, or None if missing or older than the TTL."""
+        if self._device_info is None:
+            return None
+        if not allow_stale and time.time() - self._device_info_ts > DEVICE_INFO_CACHE_TTL:
+            return None
+        return self._device_info
+
+    @callback
+    def async_set_device_info(self, device_info: Dict[str, Any]) -> None:
+        """Store a fresh device info response."""
+        self._device_info = device_info
+        self._device_info_ts = time.time()
+        self._store.async_delay_save(self._data_to_save, 0)
+
+    @property
+    def values(self) -> Dict[str, Any]:
+        """Last known decoded values."""
+        return self._values
+
+    @callback
+    def async_update_values(self, data: Dict[str, Any]) -> None:
+        """Merge decoded values into the snapshot (dispatcher callback, debounced save)."""
+        changed = False
+        for key, value in data.items():
+            if key in _VOLATILE_KEYS or value is None:
+                continue
+            if self._values.get(key) != value:
+                self._values[key] = value
+                changed = True
+        if changed:
+            self._store.async_delay_save(self._data_to_save, VALUES_SAVE_DELAY)
+
+    async def async_flush(self) -> None:
+        """Write the cache immediately (unload)."""
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {"device_info": self._device_info, "device_info_ts": self._device_info_ts, "values": self._values}
+
+
+class LumentreeDayStatsCache:
+    """Per-endpoint daily stats keyed by (device, endpoint, date).
+
+    Only the day totals are persisted, for the last DAY_STATS_MAX_DAYS days; closed days with data never
+    change and are served without a request. Intraday curves are large and only needed right after a fetch
+    (intraday import, backfill batches), so they stay in a bounded in-memory LRU. Today's entries use a
+    short TTL, and PV is not refetched once it has settled after sunset.
+    """
+
+    def __init__(self, hass: HomeAssistant, device_sn: str) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self._device_sn = device_sn
+        self._store: Store = Store(hass, CACHE_STORAGE_VERSION, DAY_STATS_STORAGE_KEY_FORMAT.format(device_sn=device_sn))
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._curves: "OrderedDict[str, Dict[str, Any]]" = OrderedDict() # Key -> curves, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(device: str, endpoint: str, query_date: str) -> str:
+        return f"{device}|{endpoint}|{query_date}"
+
+    async def async_load(self) -> None:
+        """Load cached days from disk."""
+        try:
+            stored = await self._store.async_load()
+        except Exception as err:
+            _LOGGER.warning(f"Could not load day stats cache {self._device_sn}: {err}")
+            return
+        if isinstance(stored, dict) and isinstance(stored.get("entries"), dict):
+            self._entries = stored["entries"]
+            self._prune()
+        _LOGGER.debug(f"Day stats cache loaded {self._device_sn}: {len(self._entries)} entries")
+
+    def _prune(self) -> None:
+        """Drop stored days older than DAY_STATS_MAX_DAYS (the key ends with the ISO date, so it compares as text)."""
+        oldest = (dt_util.now().date() - datetime.timedelta(days=DAY_STATS_MAX_DAYS)).isoformat()
+        for key in [key for key in self._entries if key.rsplit("|", 1)[-1] < oldest]: del self._entries[key]
+
+    def _is_final(self, query_date: str, fetched: float) -> bool:
+        """True if the day had closed (plus grace for cloud upload lag) when it was fetched."""
+        try:
+            day = datetime.date.fromisoformat(query_date)
+        except ValueError:
+            return False
+        next_midnight = dt_util.start_of_local_day(day + datetime.timedelta(days=1))
+        return fetched >= next_midnight.timestamp() + DAY_STATS_CLOSE_GRACE
+
+    def _pv_settled(self, fetched: float) -> bool:
+        """True if today's PV value was fetched after sunset (+ settle time), so it can't move any more."""
+        sunset = get_astral_event_date(self.hass, SUN_EVENT_SUNSET, dt_util.now().date())
+        if sunset is None:
+            return False
+        return fetched >= sunset.timestamp() + DAY_STATS_PV_SETTLE
+
+    def get(self, device: str, endpoint: str, query_date: str, with_curves: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the cached endpoint payload if it can't have changed upstream, else None.
+
+        With `with_curves` a day whose curves are no longer in memory is a miss.
+        """
+        key = self._key(device, endpoint, query_date)
+        entry = self._entries.get(key)
+        if entry is None or "values" not in entry or (with_curves and key not in self._curves):
+            self.misses += 1
+            return None
+        fetched = float(entry.get("fetched", 0.0))
+        fresh = entry.get("final", False)
+        if not fresh and query_date == dt_util.now().date().isoformat():
+            fresh = time.time() - fetched < DAY_STATS_TODAY_TTL or (endpoint == URL_GET_PV_DAY_DATA and self._pv_settled(fetched))
+        if not fresh:
+            self.misses += 1
+            return None
+        self.hits += 1
+        curves = self._curves.get(key)
+        if curves is not None: self._curves.move_to_end(key)
+        return {"values": entry["values"], "curves": curves or {}}
+
+    def put(self, device: str, endpoint: str, query_date: str, payload: Dict[str, Any]) -> None:
+        """Store a freshly fetched endpoint payload (values persisted, intraday curves in memory) for one day."""
+        key = self._key(device, endpoint, query_date); fetched = time.time()
+        values = payload.get("values") or {}
+        # An empty or all-zero day is more likely a late cloud upload than a real one: never freeze it
+        self._entries[key] = {"values": values, "fetched": fetched, "final": any(values.values()) and self._is_final(query_date, fetched)}
+        self._curves[key] = payload.get("curves") or {}; self._curves.move_to_end(key)
+        while len(self._curves) > DAY_STATS_MEMORY_CURVES: self._curves.popitem(last=False)
+        self._prune()
+        self._store.async_delay_save(self._data_to_save, DAY_STATS_SAVE_DELAY)
+
+    async def async_flush(self) -> None:
+        """Write the cache immediately (unload)."""
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {"entries": self._entries}
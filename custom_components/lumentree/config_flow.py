@@ -14,15 +14,21 @@ from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 try:
     from .const import (
-        DOMAIN, CONF_DEVICE_ID, CONF_DEVICE_SN, CONF_DEVICE_NAME, CONF_HTTP_TOKEN, _LOGGER
+        DOMAIN, CONF_DEVICE_ID, CONF_DEVICE_SN, CONF_DEVICE_NAME, CONF_HTTP_TOKEN, CONF_HTTP_TOKEN_ISSUED, CONF_ENABLE_METRICS, CONF_RECORD_FRAMES, CONF_POLL_CELLS,
+        CONF_TRANSPORT, CONF_LAN_HOST, CONF_LAN_PORT, TRANSPORT_CLOUD, TRANSPORTS, LAN_DEFAULT_PORT, CONF_MQTT_ENDPOINTS, _LOGGER,
+        CONF_SYSTEM_GROUP, CONF_BATTERY_CAPACITY
     )
+    from .endpoints import parse_endpoints
     from .api import LumentreeHttpApiClient, AuthException, ApiException
 except ImportError:
     _LOGGER = logging.getLogger(__name__)
     _LOGGER.warning("ImportError config_flow.py: Using fallback definitions.")
-    DOMAIN = "lumentree"; CONF_DEVICE_ID = "device_id"; CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_NAME = "device_name"; CONF_HTTP_TOKEN = "http_token"
+    DOMAIN = "lumentree"; CONF_DEVICE_ID = "device_id"; CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_NAME = "device_name"; CONF_HTTP_TOKEN = "http_token"; CONF_HTTP_TOKEN_ISSUED = "http_token_issued"; CONF_ENABLE_METRICS = "enable_metrics"; CONF_RECORD_FRAMES = "record_frames"; CONF_POLL_CELLS = "poll_cells"
+    CONF_TRANSPORT = "transport"; CONF_LAN_HOST = "lan_host"; CONF_LAN_PORT = "lan_port"; TRANSPORT_CLOUD = "cloud"; TRANSPORTS = ("cloud", "lan_rtu", "lan_tcp"); LAN_DEFAULT_PORT = 502; CONF_MQTT_ENDPOINTS = "mqtt_endpoints"
+    CONF_SYSTEM_GROUP = "system_group"; CONF_BATTERY_CAPACITY = "battery_capacity"
+    def parse_endpoints(value): return []
     class LumentreeHttpApiClient:
-        def __init__(self, session): pass
+        def __init__(self, hass, session): pass
         async def authenticate_device(self, device_id): return "fallback_token"
         async def get_device_info(self, dev_id): return {"deviceId": dev_id, "deviceType": "Fallback Model"}
         def set_token(self, token): pass
@@ -32,6 +38,11 @@ except ImportError:
 class LumentreeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow for Lumentree (Device ID based auth)."""
     VERSION = 1; CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> "LumentreeOptionsFlow":
+        return LumentreeOptionsFlow(config_entry)
+
     def __init__(self) -> None: self._device_id_input: Optional[str] = None; self._http_token: Optional[str] = None; self._device_sn_from_api: Optional[str] = None; self._device_name: Optional[str] = None; self._api_client: Optional[LumentreeHttpApiClient] = None; self._reauth_entry: Optional[config_entries.ConfigEntry] = None
 
     # --- SỬA HÀM NÀY ---
@@ -48,7 +59,7 @@ class LumentreeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
                 # Tạo instance trong try/except riêng
                 try:
-                    self._api_client = LumentreeHttpApiClient(session)
+                    self._api_client = LumentreeHttpApiClient(self.hass, session)
                     _LOGGER.debug(f"Created new API client instance: {type(self._api_client)}")
                 except Exception as create_exc:
                      _LOGGER.exception("Error creating LumentreeHttpApiClient instance!")
@@ -126,7 +137,7 @@ class LumentreeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 _LOGGER.info(f"Device Info: ID/SN='{self._device_sn_from_api}', Name='{self._device_name}', Type='{device_info_api.get('deviceType')}'")
 
                 await self.async_set_unique_id(self._device_sn_from_api)
-                updates = {CONF_DEVICE_NAME: self._device_name, CONF_DEVICE_ID: self._device_id_input, CONF_HTTP_TOKEN: self._http_token}
+                updates = {CONF_DEVICE_NAME: self._device_name, CONF_DEVICE_ID: self._device_id_input, CONF_HTTP_TOKEN: self._http_token, CONF_HTTP_TOKEN_ISSUED: time.time()}
                 if self._reauth_entry: pass
                 else: self._abort_if_unique_id_configured(updates=updates)
 
@@ -136,7 +147,7 @@ class LumentreeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             except Exception: _LOGGER.exception(f"Unexpected confirm error {self._device_id_input}"); errors["base"] = "unknown"
             return self.async_show_form(step_id="confirm_device", description_placeholders={"device_name":"Err", "device_sn":"Err"}, errors=errors)
 
-        config_data = {CONF_DEVICE_ID: self._device_id_input, CONF_DEVICE_SN: self._device_sn_from_api, CONF_DEVICE_NAME: self._device_name, CONF_HTTP_TOKEN: self._http_token}
+        config_data = {CONF_DEVICE_ID: self._device_id_input, CONF_DEVICE_SN: self._device_sn_from_api, CONF_DEVICE_NAME: self._device_name, CONF_HTTP_TOKEN: self._http_token, CONF_HTTP_TOKEN_ISSUED: time.time()}
         if self._reauth_entry:
             _LOGGER.info(f"Updating entry {self._reauth_entry.entry_id} for {self._device_sn_from_api} reauth."); self.hass.config_entries.async_update_entry(self._reauth_entry, data=config_data)
             await self.hass.config_entries.async_reload(self._reauth_entry.entry_id); return self.async_abort(reason="reauth_successful")
@@ -147,4 +158,34 @@ class LumentreeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if not self._reauth_entry: return self.async_abort(reason="unknown_entry")
         self._device_id_input = self._reauth_entry.data.get(CONF_DEVICE_ID)
         if not self._device_id_input: _LOGGER.error(f"Cannot reauth {self._reauth_entry.entry_id}: Device ID missing."); return self.async_abort(reason="missing_device_id")
-        self._http_token = None; self._api_client = None; return await self.async_step_user(user_input={CONF_DEVICE_ID: self._device_id_input})
\ No newline at end of file
+        self._http_token = None; self._api_client = None; return await self.async_step_user(user_input={CONF_DEVICE_ID: self._device_id_input})
+
+
+class LumentreeOptionsFlow(config_entries.OptionsFlow):
+    """Options for an existing Lumentree entry (changes reload the entry)."""
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None: self._entry = config_entry
+
+    async def async_step_init(self, user_input: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        errors: Dict[str, str] = {}
+        if user_input is not None:
+            if user_input.get(CONF_TRANSPORT, TRANSPORT_CLOUD) != TRANSPORT_CLOUD and not user_input.get(CONF_LAN_HOST, "").strip():
+                errors[CONF_LAN_HOST] = "lan_host_required"
+            elif user_input.get(CONF_MQTT_ENDPOINTS, "").strip() and not parse_endpoints(user_input[CONF_MQTT_ENDPOINTS]):
+                errors[CONF_MQTT_ENDPOINTS] = "invalid_endpoints"
+            else:
+                user_input[CONF_LAN_HOST] = user_input.get(CONF_LAN_HOST, "").strip()
+                user_input[CONF_SYSTEM_GROUP] = user_input.get(CONF_SYSTEM_GROUP, "").strip()
+                return self.async_create_entry(title="", data={**self._entry.options, **user_input})
+        options = {**self._entry.options, **(user_input or {})}
+        schema = vol.Schema({
+            vol.Optional(CONF_ENABLE_METRICS, default=options.get(CONF_ENABLE_METRICS, False)): bool,
+            vol.Optional(CONF_RECORD_FRAMES, default=options.get(CONF_RECORD_FRAMES, False)): bool,
+            vol.Optional(CONF_POLL_CELLS, default=options.get(CONF_POLL_CELLS, False)): bool,
+            vol.Optional(CONF_TRANSPORT, default=options.get(CONF_TRANSPORT, TRANSPORT_CLOUD)): vol.In(TRANSPORTS),
+            vol.Optional(CONF_LAN_HOST, default=options.get(CONF_LAN_HOST, "")): str,
+            vol.Optional(CONF_LAN_PORT, default=options.get(CONF_LAN_PORT, LAN_DEFAULT_PORT)): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+            vol.Optional(CONF_MQTT_ENDPOINTS, default=options.get(CONF_MQTT_ENDPOINTS, "")): str,
+            vol.Optional(CONF_SYSTEM_GROUP, default=options.get(CONF_SYSTEM_GROUP, "")): str,
+            vol.Optional(CONF_BATTERY_CAPACITY, default=options.get(CONF_BATTERY_CAPACITY, 0.0)): vol.All(vol.Coerce(float), vol.Range(min=0, max=1000)),
+        })
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
@@ -25,6 +25,23 @@ DEFAULT_HEADERS: Final = {
     "Accept-Language": "en-US,en;q=0.9"
 }
 
+# --- HTTP Scheduler (shared per host by every config entry) ---
+SCHEDULER_RATE = 2.0 # Sustained requests per second
+SCHEDULER_BURST = 6 # Token bucket size
+SCHEDULER_MAX_CONCURRENT = 4 # In-flight requests per host
+CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive transport failures before the circuit opens
+CIRCUIT_RESET_TIMEOUT = 120 # Seconds open before a single probe request is let through
+CIRCUIT_STATE_CLOSED: Final = "closed"
+CIRCUIT_STATE_OPEN: Final = "open"
+CIRCUIT_STATE_HALF_OPEN: Final = "half_open"
+INVENTORY_CACHE_TTL = 300 # Paginated deviceManage listing shared by all entries and the config flow
+INVENTORY_MAX_PAGES = 20
+# Shared state in hass.data[DOMAIN], next to the per-entry dicts; dropped when the last entry unloads
+DATA_SCHEDULERS: Final = "schedulers"
+DATA_INVENTORY: Final = "inventory"
+DATA_SYSTEMS: Final = "systems"
+SHARED_DATA_KEYS: Final = (DATA_SCHEDULERS, DATA_INVENTORY, DATA_SYSTEMS)
+
 # --- MQTT Constants ---
 MQTT_BROKER: Final = "lesvr.suntcn.com"
 MQTT_PORT: Final = 1886
@@ -34,20 +51,160 @@ MQTT_KEEPALIVE: Final = 20
 MQTT_SUB_TOPIC_FORMAT: Final = "reportApp/{device_sn}"
 MQTT_PUB_TOPIC_FORMAT: Final = "listenApp/{device_sn}"
 MQTT_CLIENT_ID_FORMAT: Final = "android-{device_id}-{timestamp}"
+# Failover: CONF_MQTT_ENDPOINTS adds candidates after MQTT_BROKER:MQTT_PORT, ranked by health score
+ENDPOINT_LATENCY_ALPHA = 0.3 # EWMA weight of the newest connect latency
+ENDPOINT_FAILURE_PENALTY = 10.0 # Score seconds added per consecutive failure...
+ENDPOINT_FAILURE_DECAY = 300 # ...fading out linearly over this many seconds
+MQTT_BACKOFF_BASE = 1.0 # Seconds; full-jitter exponential backoff, retried forever
+MQTT_BACKOFF_MAX = 60
+MQTT_RECOVERY_HISTORY = 20 # Recovery durations kept for diagnostics
 
 # --- Configuration Keys ---
 CONF_DEVICE_ID: Final = "device_id"
 CONF_DEVICE_SN: Final = "device_sn"
 CONF_DEVICE_NAME: Final = "device_name"
 CONF_HTTP_TOKEN: Final = "http_token"
+CONF_HTTP_TOKEN_ISSUED: Final = "http_token_issued"
+CONF_ENABLE_METRICS: Final = "enable_metrics" # Option
+CONF_RECORD_FRAMES: Final = "record_frames" # Option
+CONF_POLL_CELLS: Final = "poll_cells" # Option: request the battery cell block (not every BMS answers it)
+CONF_TRANSPORT: Final = "transport" # Option: TRANSPORT_*
+CONF_MQTT_ENDPOINTS: Final = "mqtt_endpoints" # Option: extra brokers "host[:port], ..."
+CONF_LAN_HOST: Final = "lan_host" # Option
+CONF_LAN_PORT: Final = "lan_port" # Option
+CONF_SYSTEM_GROUP: Final = "system_group" # Option: parallel system name shared by the stack's entries
+CONF_BATTERY_CAPACITY: Final = "battery_capacity" # Option: kWh, SOC weight in the system total (0 = equal weight)
 
 # --- Polling and Timeout ---
 DEFAULT_POLLING_INTERVAL = 5
 DEFAULT_STATS_INTERVAL = 600 # 10 minutes
 
+# --- Warm-start Cache ---
+CACHE_STORAGE_VERSION: Final = 1
+CACHE_STORAGE_KEY_FORMAT: Final = f"{DOMAIN}.cache_{{device_sn}}"
+DEVICE_INFO_CACHE_TTL = 86400 # 24 hours
+VALUES_SAVE_DELAY = 60 # Debounce for last-values snapshot (seconds)
+DAY_STATS_STORAGE_KEY_FORMAT: Final = f"{DOMAIN}.day_stats_{{device_sn}}"
+DAY_STATS_TODAY_TTL = 300 # Today's values can still move
+DAY_STATS_CLOSE_GRACE = 3600 # A day is final once fetched this long after its midnight (cloud upload lag)
+DAY_STATS_PV_SETTLE = 1800 # PV is final once fetched this long after sunset
+DAY_STATS_SAVE_DELAY = 30
+DAY_STATS_MAX_DAYS = 62 # Stored days older than this are dropped (backfill imports them once)
+DAY_STATS_MEMORY_CURVES = 100 # Endpoint-days of intraday curves kept in memory: a backfill batch (31 days x 3 endpoints) + today
+
+# --- Services ---
+SERVICE_BACKFILL_ENERGY: Final = "backfill_energy"
+ATTR_CONFIG_ENTRY_ID: Final = "config_entry_id"
+ATTR_START_DATE: Final = "start_date"
+ATTR_END_DATE: Final = "end_date"
+SERVICE_PROFILE: Final = "profile"
+ATTR_DURATION: Final = "duration"
+ATTR_TOP: Final = "top"
+SERVICE_WRITE_REGISTER: Final = "write_register"
+ATTR_REGISTER: Final = "register"
+ATTR_VALUE: Final = "value"
+ATTR_VALUES: Final = "values"
+SERVICE_SCAN_REGISTERS: Final = "scan_registers"
+ATTR_START: Final = "start"
+ATTR_END: Final = "end"
+ATTR_SAMPLES: Final = "samples"
+ATTR_INTERVAL: Final = "interval"
+SERVICE_QUERY_TIMESERIES: Final = "query_timeseries"
+ATTR_FIELDS: Final = "fields"
+ATTR_BUCKETS: Final = "buckets"
+PROFILE_MAX_DURATION = 600 # Seconds
+PROFILE_DEFAULT_DURATION = 30
+PROFILE_DEFAULT_TOP = 30
+
+# --- Energy Backfill (recorder long-term statistics) ---
+BACKFILL_DAY_CONCURRENCY = 3 # Days fetched in parallel (each day = 3 requests, also bounded per host)
+BACKFILL_MIN_INTERVAL = 0.25 # Seconds between day fetch starts (rate limit)
+BACKFILL_BATCH_DAYS = 31 # Days per statistics import call
+BACKFILL_MAX_DAYS = 3 * 366
+# Daily stats key -> (statistic object id suffix, name)
+BACKFILL_STATISTICS: Final = {
+    "pv_today": ("pv_energy", "PV Generation"),
+    "charge_today": ("battery_charge_energy", "Battery Charge"),
+    "discharge_today": ("battery_discharge_energy", "Battery Discharge"),
+    "grid_in_today": ("grid_import_energy", "Grid Input"),
+    "load_today": ("load_energy", "Load Consumption"),
+}
+
+# --- Intraday Curves (day-data tableValueInfo -> hourly power statistics) ---
+ATTR_INCLUDE_INTRADAY: Final = "include_intraday"
+# Curve name -> (statistic object id suffix, name)
+INTRADAY_STATISTICS: Final = {
+    "pv": ("pv_power", "PV Power"),
+    "charge": ("battery_charge_power", "Battery Charge Power"),
+    "discharge": ("battery_discharge_power", "Battery Discharge Power"),
+    "grid_in": ("grid_import_power", "Grid Input Power"),
+    "load": ("load_power", "Load Power"),
+}
+
+# --- Local Energy Integrator (MQTT power -> today's kWh between HTTP polls) ---
+ENERGY_STORAGE_KEY_FORMAT: Final = f"{DOMAIN}.energy_{{device_sn}}"
+INTEGRATOR_MAX_GAP = 60 # Don't integrate across gaps longer than this (seconds)
+INTEGRATOR_ANCHOR_TOLERANCE = 0.1 # kWh; HTTP totals have 0.1 kWh resolution
+INTEGRATOR_SAVE_DELAY = 60
+
+# --- Pipeline Metrics (opt-in, CONF_ENABLE_METRICS) ---
+METRICS_STAGES: Final = ("publish", "round_trip", "receive", "decode", "dispatch", "state_write")
+METRICS_WINDOW = 512 # Samples kept per stage
+METRICS_RATE_WINDOW = 60 # Seconds used for frames/s
+
+# --- Diagnostics ---
+RAW_FRAME_BUFFER_SIZE = 20 # Last raw MQTT frames kept per device
+CONNECTION_HISTORY_SIZE = 20 # Last connect/disconnect events kept per device
+
+# --- Frame Recorder (opt-in, CONF_RECORD_FRAMES) ---
+FRAME_LOG_DIR: Final = "lumentree_frames" # Under the HA config directory
+FRAME_LOG_FILE_FORMAT: Final = "frames_{device_sn}.bin"
+FRAME_LOG_MAX_BYTES = 5 * 1024 * 1024 # Rotate at this size
+FRAME_LOG_BACKUPS = 3 # Rotated files kept (.1 .. .N)
+FRAME_LOG_QUEUE_SIZE = 10000 # Pending records; newer frames are dropped when the writer falls behind
+
+# --- Transport (cloud MQTT or direct LAN, CONF_TRANSPORT) ---
+TRANSPORT_CLOUD: Final = "cloud" # listenApp/reportApp via MQTT_BROKER
+TRANSPORT_LAN_RTU: Final = "lan_rtu" # Raw RTU frames (with CRC) over TCP: Wi-Fi dongle / transparent RS485 gateway
+TRANSPORT_LAN_TCP: Final = "lan_tcp" # Modbus-TCP (MBAP header, no CRC): Modbus gateway
+TRANSPORTS: Final = (TRANSPORT_CLOUD, TRANSPORT_LAN_RTU, TRANSPORT_LAN_TCP)
+LAN_DEFAULT_PORT: Final = 502
+LAN_CONNECT_TIMEOUT = 5 # Seconds
+LAN_RESPONSE_TIMEOUT = 3 # Seconds per request before the connection is reset
+LAN_MAX_IN_FLIGHT = 4 # Pipelined requests per connection
+LAN_RECONNECT_MAX_DELAY = 60 # Seconds
+
+# --- Register Writes (function 6/16 via a per-device queue) ---
+WRITE_BATCH_WINDOW = 0.2 # Seconds to collect writes before flushing (coalesces bursts from automations)
+WRITE_MIN_INTERVAL = 1.0 # Seconds between frames sent for writes/read-backs (dongle tolerance)
+WRITE_MAX_REGISTERS = 16 # Registers per function-16 frame (keeps read-backs distinct from 50/95-register polls)
+WRITE_TIMEOUT = 5 # Seconds to wait for a write echo or read-back
+WRITE_RETRIES = 1 # Extra attempts for an unconfirmed run
+
+# --- Register Scanner (scan_registers service) ---
+SCAN_MAX_SPAN = 32 # Registers per read; halved on rejection/timeout (stays clear of the 50/95-register poll sizes)
+SCAN_MIN_INTERVAL = 2.0 # Seconds between scan reads (leaves the dongle to normal polling)
+SCAN_TIMEOUT = 5 # Seconds to wait for one span
+SCAN_RECONNECT_WAIT = 60 # Seconds to wait for a dropped link before aborting the scan
+SCAN_MAX_REGISTERS = 2000 # Largest address range per scan
+SCAN_MAX_SAMPLES = 120
+SCAN_DEFAULT_SAMPLES = 3
+SCAN_DEFAULT_INTERVAL = 60 # Seconds between sweeps
+EVENT_SCAN_FINISHED: Final = f"{DOMAIN}_scan_finished" # Fired with the scan summary when a background scan ends
+
+# --- Time Series (in-memory ring per device, query_timeseries service) ---
+TIMESERIES_CAPACITY = 17280 # Slots per device: 24 h at the 5 s poll
+TIMESERIES_MIN_SPACING = 4.0 # Seconds; closer frames are skipped so the ring keeps its span
+TIMESERIES_DEFAULT_DURATION = 3600 # Seconds queried when no duration is given
+TIMESERIES_DEFAULT_BUCKETS = 60
+TIMESERIES_MAX_BUCKETS = 1440
+
 # --- Dispatcher Signal ---
 SIGNAL_UPDATE_FORMAT: Final = f"{DOMAIN}_mqtt_update_{{device_sn}}"
 SIGNAL_STATS_UPDATE_FORMAT: Final = f"{DOMAIN}_stats_update_{{device_sn}}"
+SIGNAL_ENERGY_UPDATE_FORMAT: Final = f"{DOMAIN}_energy_update_{{device_sn}}"
+SIGNAL_SYSTEM_UPDATE_FORMAT: Final = f"{DOMAIN}_system_update_{{group}}"
+SIGNAL_EVENT_FORMAT: Final = f"{DOMAIN}_event_{{device_sn}}"
 
 # --- Register Addresses (MQTT Real-time - Only registers within 0-94 range) ---
 REG_ADDR = {
@@ -76,6 +233,37 @@ REG_ADDR = {
 }
 REG_ADDR_CELL_START: Final = 250
 REG_ADDR_CELL_COUNT: Final = 50
+WRITE_READ_ONLY_RANGES: Final = ( # [start, end) rejected by write_register: measurements, not settings
+    (0, 95), # Identity and live block (model string, battery type, power values, status)
+    (REG_ADDR_CELL_START, REG_ADDR_CELL_START + REG_ADDR_CELL_COUNT), # Battery cell voltages
+)
+
+# --- Register Groups (multi-rate polling: one request per poll tick, interleaved) ---
+REG_GROUP_POWER: Final = "power"
+REG_GROUP_IDENTITY: Final = "identity"
+REG_GROUP_CELLS: Final = "cells"
+POWER_GROUP_START: Final = 11
+POWER_GROUP_COUNT: Final = 64 # Registers 11-74: every live value, no model string
+REGISTER_GROUPS: Final = { # name: (start register, count, refresh seconds, stale after seconds or None)
+    REG_GROUP_POWER: (POWER_GROUP_START, POWER_GROUP_COUNT, DEFAULT_POLLING_INTERVAL, None), # Staleness: the online timer
+    REG_GROUP_IDENTITY: (0, 95, 3600, None), # Full block: model string, battery type, master/slave (+ power values)
+    REG_GROUP_CELLS: (REG_ADDR_CELL_START, REG_ADDR_CELL_COUNT, 60, 300), # Only with CONF_POLL_CELLS
+}
+GROUP_RETRY_INTERVAL = 30 # Seconds before an unanswered slow group is requested again (doubled per consecutive miss)
+GROUP_MAX_MISSES = 5 # Consecutive unanswered requests before a slow group is dropped until reload
+
+# --- Events (edge-triggered transitions: bus event + event entities) ---
+EVENT_LUMENTREE: Final = f"{DOMAIN}_event"
+EVENT_CATEGORY_GRID: Final = "grid"
+EVENT_CATEGORY_UPS: Final = "ups"
+EVENT_CATEGORY_GRID_FLOW: Final = "grid_flow"
+EVENT_CATEGORY_BATTERY: Final = "battery"
+GRID_LOSS_VOLTAGE = 150 # V: grid lost below, restored above GRID_RESTORE_VOLTAGE (hysteresis band between)
+GRID_RESTORE_VOLTAGE = 180
+GRID_FLOW_HYSTERESIS = 30 # W: importing above +, exporting below -, unchanged in between
+BATTERY_ACTIVE_POWER = 50 # W: charging/discharging at or above
+BATTERY_IDLE_POWER = 20 # W: idle at or below
+EVENT_HISTORY_SIZE = 20 # Recent events kept for diagnostics
 
 # --- Entity Keys --- (Removed unavailable mode keys)
 KEY_ONLINE_STATUS: Final = "online_status"
@@ -85,6 +273,7 @@ KEY_BATTERY_POWER: Final = "battery_power"
 KEY_BATTERY_SOC: Final = "battery_soc"
 KEY_GRID_POWER: Final = "grid_power"
 KEY_LOAD_POWER: Final = "load_power"
+KEY_SYSTEM_MEMBERS_ONLINE: Final = "members_online"
 KEY_BATTERY_VOLTAGE: Final = "battery_voltage"
 KEY_BATTERY_CURRENT: Final = "battery_current"
 KEY_AC_OUT_VOLTAGE: Final = "ac_output_voltage"
@@ -112,6 +301,13 @@ KEY_DAILY_DISCHARGE_KWH: Final = "discharge_today"
 KEY_DAILY_GRID_IN_KWH: Final = "grid_in_today"
 KEY_DAILY_LOAD_KWH: Final = "load_today"
 KEY_LAST_RAW_MQTT: Final = "last_raw_mqtt_hex"
+KEY_LIVE_PV_KWH: Final = "pv_today_live"
+KEY_LIVE_CHARGE_KWH: Final = "charge_today_live"
+KEY_LIVE_DISCHARGE_KWH: Final = "discharge_today_live"
+KEY_LIVE_GRID_IN_KWH: Final = "grid_in_today_live"
+KEY_LIVE_LOAD_KWH: Final = "load_today_live"
+KEY_HTTP_CIRCUIT: Final = "http_circuit"
+KEY_MQTT_RECOVERY: Final = "mqtt_recovery_time" # Seconds from unexpected disconnect to the next CONNACK
 
 # --- Mappings for Modes ---
 
@@ -6,6 +6,7 @@ import datetime
 from typing import Any, Dict, Optional
 import logging
 
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 # Import UpdateFailed và DataUpdateCoordinator từ đúng module
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
@@ -18,6 +19,7 @@ try:
     # Import các thành phần cần thiết từ component
     from .api import LumentreeHttpApiClient, ApiException, AuthException
     from .const import DOMAIN, _LOGGER, DEFAULT_STATS_INTERVAL, CONF_DEVICE_SN
+    from .intraday import async_import_intraday
 except ImportError as import_err:
     # --- Fallback Definitions (Đã sửa lỗi cú pháp) ---
     _LOGGER = logging.getLogger(__name__)
@@ -25,6 +27,7 @@ except ImportError as import_err:
     DOMAIN = "lumentree"
     DEFAULT_STATS_INTERVAL = 1800
     CONF_DEVICE_SN = "device_sn"
+    async def async_import_intraday(hass, device_sn, day_curves): return 0
 
     # Fallback Class API (Đã sửa lỗi cú pháp)
     class LumentreeHttpApiClient:
@@ -59,10 +62,13 @@ except ImportError as import_err:
 class LumentreeStatsCoordinator(DataUpdateCoordinator[Dict[str, Optional[float]]]):
     """Coordinator to fetch daily statistics via HTTP API."""
 
-    def __init__(self, hass: HomeAssistant, api_client: LumentreeHttpApiClient, device_sn: str):
+    def __init__(self, hass: HomeAssistant, api_client: LumentreeHttpApiClient, device_sn: str, entry: ConfigEntry):
         """Initialize the coordinator."""
         self.api_client = api_client
+        self._entry = entry # Owns the intraday import tasks, so unloading the entry cancels them
         self.device_sn = device_sn
+        self._last_curve_day: Optional[datetime.date] = None
+        self.data_date: Optional[str] = None # Local date (YYYY-MM-DD) the current data belongs to
         update_interval = datetime.timedelta(seconds=DEFAULT_STATS_INTERVAL)
 
         # Gọi super().__init__
@@ -112,6 +118,11 @@ class LumentreeStatsCoordinator(DataUpdateCoordinator[Dict[str, Optional[float]]
                 raise UpdateFailed("Invalid data type received from API")
 
             _LOGGER.debug(f"Successfully fetched daily stats: {stats_data}")
+            self.data_date = today_str
+            if "recorder" in self.hass.config.components and hasattr(self.api_client, "get_daily_curves"):
+                self._entry.async_create_background_task(
+                    self.hass, self._async_import_curves(dt_util.now(timezone).date()), f"{DOMAIN}_intraday_{self.device_sn}"
+                )
             return stats_data
 
         # Xử lý lỗi
@@ -126,4 +137,22 @@ class LumentreeStatsCoordinator(DataUpdateCoordinator[Dict[str, Optional[float]]
             raise UpdateFailed("Timeout fetching statistics data") from err
         except Exception as err:
             _LOGGER.exception(f"Unexpected error fetching stats data")
-            raise UpdateFailed(f"Unexpected error: {err}") from err
\ No newline at end of file
+            raise UpdateFailed(f"Unexpected error: {err}") from err
+
+    async def _async_import_curves(self, today: datetime.date) -> None:
+        """Import completed hours of today's intraday curves (and the rest of the previous day after midnight)."""
+        days = [today]
+        if self._last_curve_day and self._last_curve_day < today:
+            days.insert(0, self._last_curve_day)
+        day_curves = {}
+        for day in days:
+            try:
+                day_curves[day] = await self.api_client.get_daily_curves(self.device_sn, day.isoformat())
+            except Exception as err:
+                _LOGGER.debug("Intraday curves unavailable %s %s: %s", self.device_sn, day, err)
+                return
+        try:
+            await async_import_intraday(self.hass, self.device_sn, day_curves)
+            self._last_curve_day = today
+        except Exception:
+            _LOGGER.exception(f"Intraday statistics import failed {self.device_sn}")
@@ -0,0 +1,79 @@
+# /config/custom_components/lumentree/diagnostics.py
+# Config entry diagnostics: connection state, counters, latencies, read plan and recent raw frames (redacted)
+
+import datetime
+from typing import Any, Dict, List
+import logging
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+try:
+    from .const import DOMAIN, _LOGGER, CONF_DEVICE_ID, CONF_DEVICE_SN, CONF_HTTP_TOKEN, REG_ADDR
+except ImportError:
+    DOMAIN = "lumentree"; _LOGGER = logging.getLogger(__name__)
+    CONF_DEVICE_ID = "device_id"; CONF_DEVICE_SN = "device_sn"; CONF_HTTP_TOKEN = "http_token"; REG_ADDR = {"DEVICE_MODEL_START": 3}
+
+TO_REDACT = {CONF_DEVICE_ID, CONF_DEVICE_SN, CONF_HTTP_TOKEN, "deviceId", "deviceSn", "snName", "remarkName", "userId", "mobile", "email"}
+REDACTED = "**REDACTED**"
+MODEL_STRING_REGISTERS = 5 # Device model/SN string at DEVICE_MODEL_START in the 95-register main block
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat()
+
+def _redact_frame(payload_hex: str, device_sn: str) -> str:
+    """Blank the model/SN string registers of a main-block response (payload may carry the 2b2b2b2b prefix)."""
+    start = payload_hex.find("2b2b2b2b")
+    start = start + 8 if start >= 0 else 0
+    if payload_hex[start:start + 4] not in ("0103", "0104") or len(payload_hex) < start + 6: return payload_hex
+    byte_count = int(payload_hex[start + 4:start + 6], 16)
+    if byte_count == 95 * 2:
+        offset = start + 6 + REG_ADDR.get("DEVICE_MODEL_START", 3) * 4
+        payload_hex = payload_hex[:offset] + "x" * (MODEL_STRING_REGISTERS * 4) + payload_hex[offset + MODEL_STRING_REGISTERS * 4:]
+    return payload_hex.replace(device_sn.encode().hex(), REDACTED) if device_sn else payload_hex
+
+def _raw_frames(mqtt_client: Any, device_sn: str) -> List[Dict[str, Any]]:
+    return [
+        {"time": _iso(ts), "topic": topic.replace(device_sn, REDACTED) if device_sn else topic, "length": len(payload_hex) // 2, "payload": _redact_frame(payload_hex, device_sn)}
+        for ts, topic, payload_hex in getattr(mqtt_client, "raw_frames", [])
+    ]
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    device_sn = entry.data.get(CONF_DEVICE_SN, "")
+    mqtt_client = entry_data.get("mqtt_client")
+    api_client = entry_data.get("api_client")
+    coordinator = entry_data.get("coordinator_stats")
+    day_cache = entry_data.get("day_cache")
+    metrics = entry_data.get("metrics")
+
+    mqtt_diagnostics = dict(getattr(mqtt_client, "diagnostics", {}) or {})
+    if mqtt_diagnostics.get("history"):
+        mqtt_diagnostics["history"] = [{**event, "time": _iso(event["time"])} for event in mqtt_diagnostics["history"]]
+    scheduler = getattr(api_client, "scheduler", None)
+
+    return {
+        "entry": {"title": REDACTED, "data": async_redact_data(dict(entry.data), TO_REDACT), "options": dict(entry.options)},
+        "device_info": async_redact_data(entry_data.get("device_api_info") or {}, TO_REDACT),
+        "mqtt": mqtt_diagnostics,
+        "read_plan": getattr(mqtt_client, "read_plan", None),
+        "poll_groups": getattr(entry_data.get("group_poller"), "diagnostics", None),
+        "system": getattr(entry_data.get("system"), "diagnostics", None),
+        "events": getattr(entry_data.get("event_detector"), "diagnostics", None),
+        "timeseries": getattr(entry_data.get("timeseries"), "diagnostics", None),
+        "http": {
+            "stats_last_update_success": getattr(coordinator, "last_update_success", None),
+            "stats_data_date": getattr(coordinator, "data_date", None),
+            "response_stats": getattr(api_client, "response_stats", None),
+            "endpoint_latency_ms": getattr(api_client, "endpoint_latencies", None),
+            "scheduler": getattr(scheduler, "diagnostics", None),
+            "day_cache": {"hits": day_cache.hits, "misses": day_cache.misses} if hasattr(day_cache, "hits") else None,
+        },
+        "write_queue": getattr(entry_data.get("write_queue"), "diagnostics", None),
+        "pipeline_metrics": metrics.as_dict() if metrics is not None else None,
+        "raw_frames": _raw_frames(mqtt_client, device_sn),
+    }
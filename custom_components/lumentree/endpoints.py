@@ -0,0 +1,93 @@
+# /config/custom_components/lumentree/endpoints.py
+# MQTT broker endpoint pool: health scoring from connect latency and recent failures, jittered backoff
+
+import random
+import time
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .const import (
+        _LOGGER, MQTT_BROKER, MQTT_PORT, ENDPOINT_LATENCY_ALPHA, ENDPOINT_FAILURE_PENALTY, ENDPOINT_FAILURE_DECAY,
+        MQTT_BACKOFF_BASE, MQTT_BACKOFF_MAX
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    MQTT_BROKER = "lesvr.suntcn.com"; MQTT_PORT = 1886; ENDPOINT_LATENCY_ALPHA = 0.3; ENDPOINT_FAILURE_PENALTY = 10.0; ENDPOINT_FAILURE_DECAY = 300; MQTT_BACKOFF_BASE = 1.0; MQTT_BACKOFF_MAX = 60
+
+
+def parse_endpoints(value: str) -> List[Tuple[str, int]]:
+    """'host[:port], host[:port]' -> [(host, port)], port defaulting to MQTT_PORT; invalid items are skipped."""
+    endpoints: List[Tuple[str, int]] = []
+    for item in (value or "").replace(";", ",").split(","):
+        host, _, port = item.strip().partition(":")
+        if not host: continue
+        try: endpoints.append((host, int(port) if port else MQTT_PORT))
+        except ValueError: _LOGGER.warning(f"Ignoring invalid MQTT endpoint '{item.strip()}'")
+    return endpoints
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(max, base * 2^attempt)), never below half a second."""
+    return max(0.5, random.uniform(0, min(MQTT_BACKOFF_MAX, MQTT_BACKOFF_BASE * (2 ** min(attempt, 16)))))
+
+
+class _Endpoint:
+    __slots__ = ("host", "port", "latency", "failures", "last_failure", "successes")
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host, self.port = host, port
+        self.latency: Optional[float] = None # EWMA of connect -> CONNACK seconds
+        self.failures = 0 # Consecutive
+        self.last_failure: Optional[float] = None
+        self.successes = 0
+
+    def score(self, now: float) -> float:
+        """Lower is better: latency plus a failure penalty that fades over ENDPOINT_FAILURE_DECAY seconds."""
+        penalty = 0.0
+        if self.failures and self.last_failure is not None:
+            penalty = ENDPOINT_FAILURE_PENALTY * self.failures * max(0.0, 1 - (now - self.last_failure) / ENDPOINT_FAILURE_DECAY)
+        return (self.latency if self.latency is not None else 1.0) + penalty
+
+
+class LumentreeEndpointPool:
+    """Ordered candidate brokers; the first (primary) wins ties, so failover is sticky only while it pays off."""
+
+    def __init__(self, endpoints: Sequence[Tuple[str, int]]) -> None:
+        unique = list(dict.fromkeys(endpoints)) or [(MQTT_BROKER, MQTT_PORT)]
+        self._endpoints = [_Endpoint(host, port) for host, port in unique]
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    def pick(self) -> Tuple[str, int]:
+        """Healthiest endpoint right now."""
+        now = time.monotonic()
+        best = min(self._endpoints, key=lambda endpoint: endpoint.score(now)) # min() is stable: list order breaks ties
+        return best.host, best.port
+
+    def _find(self, host: str, port: int) -> Optional[_Endpoint]:
+        for endpoint in self._endpoints:
+            if endpoint.host == host and endpoint.port == port: return endpoint
+        return None
+
+    def record_success(self, host: str, port: int, latency: Optional[float]) -> None:
+        endpoint = self._find(host, port)
+        if endpoint is None: return
+        endpoint.failures = 0; endpoint.successes += 1
+        if latency is not None:
+            endpoint.latency = latency if endpoint.latency is None else ENDPOINT_LATENCY_ALPHA * latency + (1 - ENDPOINT_LATENCY_ALPHA) * endpoint.latency
+
+    def record_failure(self, host: str, port: int) -> None:
+        endpoint = self._find(host, port)
+        if endpoint is None: return
+        endpoint.failures += 1; endpoint.last_failure = time.monotonic()
+
+    @property
+    def diagnostics(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [{
+            "endpoint": f"{endpoint.host}:{endpoint.port}", "score": round(endpoint.score(now), 3),
+            "connect_latency_s": round(endpoint.latency, 3) if endpoint.latency is not None else None,
+            "consecutive_failures": endpoint.failures, "successes": endpoint.successes,
+        } for endpoint in self._endpoints]
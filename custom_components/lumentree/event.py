@@ -0,0 +1,70 @@
+# /config/custom_components/lumentree/event.py
+# Event entities for grid, UPS, grid flow and battery transitions (fed by events.LumentreeEventDetector)
+
+import logging
+from typing import Any, Dict
+import re
+
+from homeassistant.components.event import EventEntity, EventEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo, generate_entity_id
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import slugify
+
+try:
+    from .const import (
+        DOMAIN, _LOGGER, CONF_DEVICE_SN, CONF_DEVICE_NAME, SIGNAL_EVENT_FORMAT,
+        EVENT_CATEGORY_GRID, EVENT_CATEGORY_UPS, EVENT_CATEGORY_GRID_FLOW, EVENT_CATEGORY_BATTERY
+    )
+    from .events import EVENT_TYPES
+except ImportError:
+    DOMAIN = "lumentree"; _LOGGER = logging.getLogger(__name__)
+    CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_NAME = "device_name"; SIGNAL_EVENT_FORMAT = "lumentree_event_{device_sn}"
+    EVENT_CATEGORY_GRID = "grid"; EVENT_CATEGORY_UPS = "ups"; EVENT_CATEGORY_GRID_FLOW = "grid_flow"; EVENT_CATEGORY_BATTERY = "battery"
+    EVENT_TYPES = {}
+    def slugify(text): return re.sub(r"[^a-z0-9_]+", "_", text.lower())
+
+
+EVENT_DESCRIPTIONS: tuple[EventEntityDescription, ...] = (
+    EventEntityDescription(key=EVENT_CATEGORY_GRID, name="Grid Event", icon="mdi:transmission-tower-off", event_types=EVENT_TYPES.get(EVENT_CATEGORY_GRID, [])),
+    EventEntityDescription(key=EVENT_CATEGORY_UPS, name="UPS Event", icon="mdi:power-plug-outline", event_types=EVENT_TYPES.get(EVENT_CATEGORY_UPS, [])),
+    EventEntityDescription(key=EVENT_CATEGORY_GRID_FLOW, name="Grid Flow Event", icon="mdi:swap-horizontal", event_types=EVENT_TYPES.get(EVENT_CATEGORY_GRID_FLOW, [])),
+    EventEntityDescription(key=EVENT_CATEGORY_BATTERY, name="Battery Event", icon="mdi:battery-sync", event_types=EVENT_TYPES.get(EVENT_CATEGORY_BATTERY, [])),
+)
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    _LOGGER.debug(f"Setting up event platform for {entry.title}")
+    try:
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        device_sn = entry.data[CONF_DEVICE_SN]
+        device_api_info = entry_data.get('device_api_info', {})
+    except KeyError as e: _LOGGER.error(f"Missing key {e} for event entities."); return
+
+    device_info = DeviceInfo(
+        identifiers={(DOMAIN, device_sn)}, name=entry.data[CONF_DEVICE_NAME], manufacturer="YS Tech (YiShen)",
+        model=device_api_info.get("deviceType"),
+    )
+    entities = [LumentreeEventEntity(hass, entry, device_info, description) for description in EVENT_DESCRIPTIONS]
+    async_add_entities(entities); _LOGGER.info(f"Added {len(entities)} event entities for {device_sn}")
+
+class LumentreeEventEntity(EventEntity):
+    _attr_should_poll = False; _attr_has_entity_name = True
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_info: DeviceInfo, description: EventEntityDescription) -> None:
+        self.hass = hass; self.entity_description = description; self._device_sn = entry.data[CONF_DEVICE_SN]
+        self._attr_unique_id = f"{self._device_sn}_event_{description.key}"; self._attr_object_id = f"device_{self._device_sn}_{slugify(description.key)}_event"
+        self.entity_id = generate_entity_id("event.{}", self._attr_object_id, hass=hass)
+        self._attr_device_info = device_info
+
+    @callback
+    def _handle_event(self, event: Dict[str, Any]) -> None:
+        if event["category"] != self.entity_description.key: return
+        self._trigger_event(event["type"], {"previous": event["previous"], "frame_time": event["frame_time"]})
+        self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(async_dispatcher_connect(self.hass, SIGNAL_EVENT_FORMAT.format(device_sn=self._device_sn), self._handle_event))
+        _LOGGER.debug(f"Event entity {self.unique_id} registered.")
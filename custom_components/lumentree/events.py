@@ -0,0 +1,109 @@
+# /config/custom_components/lumentree/events.py
+# Edge-triggered events: grid loss, UPS mode, grid flow direction and battery state transitions with hysteresis
+
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        _LOGGER, EVENT_LUMENTREE, SIGNAL_EVENT_FORMAT, KEY_GRID_VOLTAGE, KEY_GRID_POWER, KEY_IS_UPS_MODE,
+        KEY_BATTERY_POWER, KEY_BATTERY_STATUS, GRID_LOSS_VOLTAGE, GRID_RESTORE_VOLTAGE, GRID_FLOW_HYSTERESIS,
+        BATTERY_ACTIVE_POWER, BATTERY_IDLE_POWER, EVENT_HISTORY_SIZE,
+        EVENT_CATEGORY_GRID, EVENT_CATEGORY_UPS, EVENT_CATEGORY_GRID_FLOW, EVENT_CATEGORY_BATTERY
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    EVENT_LUMENTREE = "lumentree_event"; SIGNAL_EVENT_FORMAT = "lumentree_event_{device_sn}"
+    KEY_GRID_VOLTAGE = "grid_voltage"; KEY_GRID_POWER = "grid_power"; KEY_IS_UPS_MODE = "is_ups_mode"; KEY_BATTERY_POWER = "battery_power"; KEY_BATTERY_STATUS = "battery_status"
+    GRID_LOSS_VOLTAGE = 150; GRID_RESTORE_VOLTAGE = 180; GRID_FLOW_HYSTERESIS = 30; BATTERY_ACTIVE_POWER = 50; BATTERY_IDLE_POWER = 20; EVENT_HISTORY_SIZE = 20
+    EVENT_CATEGORY_GRID = "grid"; EVENT_CATEGORY_UPS = "ups"; EVENT_CATEGORY_GRID_FLOW = "grid_flow"; EVENT_CATEGORY_BATTERY = "battery"
+
+
+# Each rule maps (previous state, parsed frame) -> new state; returning previous means "inside the hysteresis band / not in frame"
+def _grid_rule(previous: Optional[str], data: Dict[str, Any]) -> Optional[str]:
+    voltage = data.get(KEY_GRID_VOLTAGE)
+    if voltage is None: return previous
+    if voltage < GRID_LOSS_VOLTAGE: return "lost"
+    if voltage > GRID_RESTORE_VOLTAGE: return "restored"
+    return previous
+
+def _ups_rule(previous: Optional[str], data: Dict[str, Any]) -> Optional[str]:
+    ups = data.get(KEY_IS_UPS_MODE)
+    return previous if ups is None else ("on" if ups else "off")
+
+def _grid_flow_rule(previous: Optional[str], data: Dict[str, Any]) -> Optional[str]:
+    power = data.get(KEY_GRID_POWER)
+    if power is None: return previous
+    if power > GRID_FLOW_HYSTERESIS: return "importing"
+    if power < -GRID_FLOW_HYSTERESIS: return "exporting"
+    return previous
+
+def _battery_rule(previous: Optional[str], data: Dict[str, Any]) -> Optional[str]:
+    power = data.get(KEY_BATTERY_POWER) # Magnitude; direction is in the status
+    if power is None: return previous
+    if power >= BATTERY_ACTIVE_POWER: return "charging" if data.get(KEY_BATTERY_STATUS) == "Charging" else "discharging"
+    if power <= BATTERY_IDLE_POWER: return "idle"
+    return previous
+
+RULES: Dict[str, Callable[[Optional[str], Dict[str, Any]], Optional[str]]] = {
+    EVENT_CATEGORY_GRID: _grid_rule,
+    EVENT_CATEGORY_UPS: _ups_rule,
+    EVENT_CATEGORY_GRID_FLOW: _grid_flow_rule,
+    EVENT_CATEGORY_BATTERY: _battery_rule,
+}
+
+EVENT_TYPES: Dict[str, List[str]] = {
+    EVENT_CATEGORY_GRID: ["grid_lost", "grid_restored"],
+    EVENT_CATEGORY_UPS: ["ups_on", "ups_off"],
+    EVENT_CATEGORY_GRID_FLOW: ["grid_flow_importing", "grid_flow_exporting"],
+    EVENT_CATEGORY_BATTERY: ["battery_charging", "battery_discharging", "battery_idle"],
+}
+
+
+class LumentreeEventDetector:
+    """Turns parsed frames into transitions.
+
+    `process` runs where the frame is decoded (paho thread, or the loop for LAN) with the frame's arrival
+    time, so an event fires on the first frame past a threshold and carries that frame's timestamp. The
+    first value per category only sets the baseline. Events go to the bus as `lumentree_event` and to the
+    event entities through SIGNAL_EVENT_FORMAT.
+    """
+
+    def __init__(self, hass: HomeAssistant, device_sn: str) -> None:
+        self.hass = hass
+        self._device_sn = device_sn
+        self._signal = SIGNAL_EVENT_FORMAT.format(device_sn=device_sn)
+        self._states: Dict[str, Optional[str]] = {category: None for category in RULES}
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=EVENT_HISTORY_SIZE)
+
+    def process(self, data: Dict[str, Any], arrived: float) -> None:
+        """Compare one parsed frame against the current states; hands any transitions to the loop."""
+        events: List[Dict[str, Any]] = []
+        for category, rule in RULES.items():
+            previous = self._states[category]
+            state = rule(previous, data)
+            if state == previous: continue
+            self._states[category] = state
+            if previous is None: continue # Baseline
+            events.append({
+                "device_sn": self._device_sn, "category": category, "type": f"{category}_{state}",
+                "previous": previous, "state": state, "frame_time": dt_util.utc_from_timestamp(arrived).isoformat(),
+            })
+        if events: self.hass.loop.call_soon_threadsafe(self._async_fire, events)
+
+    @callback
+    def _async_fire(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            _LOGGER.info(f"Lumentree event {self._device_sn}: {event['type']} (was {event['previous']})")
+            self._history.append(event)
+            self.hass.bus.async_fire(EVENT_LUMENTREE, event)
+            async_dispatcher_send(self.hass, self._signal, event)
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {"states": dict(self._states), "recent": list(self._history)}
@@ -0,0 +1,105 @@
+# /config/custom_components/lumentree/frame_log.py
+# Opt-in raw MQTT frame recorder (rotating binary log, background writer thread) and its reader
+
+import os
+import queue
+import struct
+import threading
+import time
+import logging
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+try:
+    from .const import _LOGGER, FRAME_LOG_MAX_BYTES, FRAME_LOG_BACKUPS, FRAME_LOG_QUEUE_SIZE
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    FRAME_LOG_MAX_BYTES = 5 * 1024 * 1024; FRAME_LOG_BACKUPS = 3; FRAME_LOG_QUEUE_SIZE = 10000
+
+# File: MAGIC
+# Record: RECORD_HEADER (wall-clock timestamp, topic length, payload length) + topic (utf-8) + payload (raw bytes)
+# Each record carries its own wall time, so files appended to across HA restarts stay on one time base.
+MAGIC = b"LTFRAME1"
+RECORD_HEADER = struct.Struct("<dHI")
+
+_STOP = object()
+
+
+class LumentreeFrameRecorder:
+    """Append raw frames from any thread; a daemon thread does all file I/O."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize the recorder (call start() to begin writing)."""
+        self.path = path
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=FRAME_LOG_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self.records = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        self._thread = threading.Thread(target=self._run, name=f"lumentree-frame-log-{os.path.basename(self.path)}", daemon=True)
+        self._thread.start()
+
+    def record(self, topic: str, payload: bytes) -> None:
+        """Queue one frame (non-blocking; dropped if the writer is behind)."""
+        try: self._queue.put_nowait((time.time(), topic, payload))
+        except queue.Full: self.dropped += 1
+
+    def stop(self) -> None:
+        """Flush pending records and stop the writer (blocking: call from an executor)."""
+        if self._thread is None: return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def _open(self) -> BinaryIO:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as existing:
+                if existing.read(len(MAGIC)) != MAGIC: os.replace(self.path, f"{self.path}.old") # Not a frame log: don't append to it
+        log_file = open(self.path, "ab")
+        if log_file.tell() == 0: log_file.write(MAGIC)
+        return log_file
+
+    def _rotate(self, log_file: BinaryIO) -> BinaryIO:
+        log_file.close()
+        for index in range(FRAME_LOG_BACKUPS - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older): os.replace(older, f"{self.path}.{index + 1}")
+        if FRAME_LOG_BACKUPS > 0: os.replace(self.path, f"{self.path}.1")
+        else: os.remove(self.path)
+        return self._open()
+
+    def _run(self) -> None:
+        try:
+            log_file = self._open()
+        except OSError as err:
+            _LOGGER.error(f"Frame recorder disabled, cannot open {self.path}: {err}")
+            return
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP: break
+                wall_ts, topic, payload = item
+                topic_bytes = topic.encode("utf-8")
+                log_file.write(RECORD_HEADER.pack(wall_ts, len(topic_bytes), len(payload)) + topic_bytes + payload)
+                self.records += 1
+                if self._queue.empty(): log_file.flush() # Batch writes while busy, flush when idle
+                if log_file.tell() >= FRAME_LOG_MAX_BYTES: log_file = self._rotate(log_file)
+        except OSError as err:
+            _LOGGER.error(f"Frame recorder write failed {self.path}: {err}")
+        finally:
+            log_file.close()
+
+
+def iter_frame_log(path: str) -> Iterator[Tuple[float, str, bytes]]:
+    """Yield (wall-clock timestamp, topic, payload) from a frame log; stops at a truncated tail."""
+    with open(path, "rb") as log_file:
+        if log_file.read(len(MAGIC)) != MAGIC: raise ValueError(f"{path} is not a Lumentree frame log")
+        while True:
+            header = log_file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size: return
+            ts, topic_len, payload_len = RECORD_HEADER.unpack(header)
+            body = log_file.read(topic_len + payload_len)
+            if len(body) < topic_len + payload_len: return
+            yield ts, body[:topic_len].decode("utf-8", "replace"), body[topic_len:]
@@ -0,0 +1,153 @@
+# /config/custom_components/lumentree/integrator.py
+# Local energy integrator: today's kWh from MQTT power samples, anchored to the HTTP daily stats
+
+import datetime
+import time
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        _LOGGER, CACHE_STORAGE_VERSION, ENERGY_STORAGE_KEY_FORMAT, SIGNAL_ENERGY_UPDATE_FORMAT,
+        INTEGRATOR_MAX_GAP, INTEGRATOR_ANCHOR_TOLERANCE, INTEGRATOR_SAVE_DELAY,
+        KEY_PV_POWER, KEY_BATTERY_POWER, KEY_BATTERY_STATUS, KEY_GRID_POWER, KEY_LOAD_POWER,
+        KEY_DAILY_PV_KWH, KEY_DAILY_CHARGE_KWH, KEY_DAILY_DISCHARGE_KWH, KEY_DAILY_GRID_IN_KWH, KEY_DAILY_LOAD_KWH,
+        KEY_LIVE_PV_KWH, KEY_LIVE_CHARGE_KWH, KEY_LIVE_DISCHARGE_KWH, KEY_LIVE_GRID_IN_KWH, KEY_LIVE_LOAD_KWH
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    CACHE_STORAGE_VERSION = 1; ENERGY_STORAGE_KEY_FORMAT = "lumentree.energy_{device_sn}"; SIGNAL_ENERGY_UPDATE_FORMAT = "lumentree_energy_update_{device_sn}"
+    INTEGRATOR_MAX_GAP = 60; INTEGRATOR_ANCHOR_TOLERANCE = 0.1; INTEGRATOR_SAVE_DELAY = 60
+    KEY_PV_POWER = "pv_power"; KEY_BATTERY_POWER = "battery_power"; KEY_BATTERY_STATUS = "battery_status"; KEY_GRID_POWER = "grid_power"; KEY_LOAD_POWER = "load_power"
+    KEY_DAILY_PV_KWH = "pv_today"; KEY_DAILY_CHARGE_KWH = "charge_today"; KEY_DAILY_DISCHARGE_KWH = "discharge_today"; KEY_DAILY_GRID_IN_KWH = "grid_in_today"; KEY_DAILY_LOAD_KWH = "load_today"
+    KEY_LIVE_PV_KWH = "pv_today_live"; KEY_LIVE_CHARGE_KWH = "charge_today_live"; KEY_LIVE_DISCHARGE_KWH = "discharge_today_live"; KEY_LIVE_GRID_IN_KWH = "grid_in_today_live"; KEY_LIVE_LOAD_KWH = "load_today_live"
+
+
+def _battery_power(data: Dict[str, Any], status: str) -> Optional[float]:
+    power = data.get(KEY_BATTERY_POWER)
+    if power is None or KEY_BATTERY_STATUS not in data: return None
+    return float(power) if data[KEY_BATTERY_STATUS] == status else 0.0
+
+def _grid_import_power(data: Dict[str, Any]) -> Optional[float]:
+    power = data.get(KEY_GRID_POWER)
+    return max(float(power), 0.0) if power is not None else None
+
+def _plain_power(key: str) -> Callable[[Dict[str, Any]], Optional[float]]:
+    def _get(data: Dict[str, Any]) -> Optional[float]:
+        power = data.get(key)
+        return float(power) if power is not None else None
+    return _get
+
+# Live key -> (power extractor from a decoded frame, HTTP daily stats anchor key)
+INTEGRATED_ENERGY: Dict[str, Any] = {
+    KEY_LIVE_PV_KWH: (_plain_power(KEY_PV_POWER), KEY_DAILY_PV_KWH),
+    KEY_LIVE_CHARGE_KWH: (lambda data: _battery_power(data, "Charging"), KEY_DAILY_CHARGE_KWH),
+    KEY_LIVE_DISCHARGE_KWH: (lambda data: _battery_power(data, "Discharging"), KEY_DAILY_DISCHARGE_KWH),
+    KEY_LIVE_GRID_IN_KWH: (_grid_import_power, KEY_DAILY_GRID_IN_KWH),
+    KEY_LIVE_LOAD_KWH: (_plain_power(KEY_LOAD_POWER), KEY_DAILY_LOAD_KWH),
+}
+
+
+class LumentreeEnergyIntegrator:
+    """Trapezoidal integration of MQTT power into today's kWh, persisted across restarts."""
+
+    def __init__(self, hass: HomeAssistant, device_sn: str) -> None:
+        """Initialize the integrator."""
+        self.hass = hass
+        self._device_sn = device_sn
+        self._signal = SIGNAL_ENERGY_UPDATE_FORMAT.format(device_sn=device_sn)
+        self._store: Store = Store(hass, CACHE_STORAGE_VERSION, ENERGY_STORAGE_KEY_FORMAT.format(device_sn=device_sn))
+        self._day: str = dt_util.now().date().isoformat()
+        self._totals: Dict[str, float] = {key: 0.0 for key in INTEGRATED_ENERGY}
+        self._last_ts: Dict[str, float] = {}
+        self._last_power: Dict[str, float] = {}
+
+    @property
+    def totals(self) -> Dict[str, float]:
+        """Today's integrated energy (kWh) by live key."""
+        return self._totals
+
+    @property
+    def last_reset(self) -> datetime.datetime:
+        """Start of the day the totals belong to."""
+        return dt_util.start_of_local_day(datetime.date.fromisoformat(self._day))
+
+    async def async_load(self) -> None:
+        """Restore today's totals (ignored if they belong to another day)."""
+        try:
+            stored = await self._store.async_load()
+        except Exception as err:
+            _LOGGER.warning(f"Could not load energy integrator state {self._device_sn}: {err}")
+            return
+        if isinstance(stored, dict) and stored.get("day") == self._day and isinstance(stored.get("totals"), dict):
+            for key, value in stored["totals"].items():
+                if key in self._totals and isinstance(value, (int, float)):
+                    self._totals[key] = float(value)
+            _LOGGER.debug(f"Energy integrator restored {self._device_sn}: {self._totals}")
+
+    def _roll_day(self, now: datetime.datetime) -> bool:
+        """Reset at local midnight; returns True if the day changed."""
+        today = now.date().isoformat()
+        if today == self._day:
+            return False
+        _LOGGER.debug(f"Energy integrator day rollover {self._device_sn}: {self._day} -> {today}")
+        self._day = today
+        self._totals = {key: 0.0 for key in INTEGRATED_ENERGY}
+        self._last_ts.clear()
+        self._last_power.clear()
+        return True
+
+    @callback
+    def async_handle_update(self, data: Dict[str, Any]) -> None:
+        """Integrate power from a decoded MQTT frame (dispatcher callback)."""
+        ts = time.time()
+        changed = self._roll_day(dt_util.now())
+        for key, (extract, _anchor_key) in INTEGRATED_ENERGY.items():
+            power = extract(data)
+            if power is None:
+                continue
+            last_ts = self._last_ts.get(key)
+            if last_ts is not None and 0 < ts - last_ts <= INTEGRATOR_MAX_GAP:
+                # Trapezoid: mean power over the interval, W*s -> kWh
+                self._totals[key] += (self._last_power[key] + power) / 2 * (ts - last_ts) / 3_600_000
+                changed = True
+            self._last_ts[key] = ts
+            self._last_power[key] = power
+        if changed:
+            async_dispatcher_send(self.hass, self._signal, self._totals)
+            self._store.async_delay_save(self._data_to_save, INTEGRATOR_SAVE_DELAY)
+
+    @callback
+    def async_apply_anchor(self, stats: Optional[Dict[str, Any]], stats_date: Optional[str]) -> None:
+        """Raise totals to the HTTP daily values (only for the same day, beyond their 0.1 kWh resolution).
+
+        The HTTP total lags the live integration, so an anchor below the integrated value is expected and
+        ignored: the live sensors are state_class total with last_reset at local midnight, so a drop within
+        the day would be recorded as negative energy. Missed frames are still made up when the server is ahead.
+        """
+        self._roll_day(dt_util.now())
+        if not stats or stats_date != self._day:
+            return
+        corrected = False
+        for key, (_extract, anchor_key) in INTEGRATED_ENERGY.items():
+            anchor = stats.get(anchor_key)
+            if isinstance(anchor, (int, float)) and anchor - self._totals[key] > INTEGRATOR_ANCHOR_TOLERANCE:
+                _LOGGER.debug("Energy anchor %s %s: %.3f -> %.3f kWh", self._device_sn, key, self._totals[key], anchor)
+                self._totals[key] = float(anchor)
+                corrected = True
+        if corrected:
+            async_dispatcher_send(self.hass, self._signal, self._totals)
+            self._store.async_delay_save(self._data_to_save, INTEGRATOR_SAVE_DELAY)
+
+    async def async_flush(self) -> None:
+        """Write state immediately (unload)."""
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {"day": self._day, "totals": self._totals}
@@ -0,0 +1,90 @@
+# /config/custom_components/lumentree/intraday.py
+# Intraday curves from the day-data endpoints -> hourly power statistics (mean/min/max)
+
+import datetime
+import math
+import logging
+from array import array
+from typing import Any, Dict, List, Optional
+
+from homeassistant.const import UnitOfPower
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import _LOGGER, INTRADAY_STATISTICS
+    from .backfill import statistic_id_for, energy_metadata
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    INTRADAY_STATISTICS = {"pv": ("pv_power", "PV Power")}
+    def statistic_id_for(device_sn, suffix): return f"lumentree:{device_sn.lower()}_{suffix}"
+    def energy_metadata(device_sn, suffix, name, has_mean=False, unit="kWh"): return {}
+
+
+def curve_to_array(curve: List[Optional[float]]) -> array:
+    """Pack a curve into a float32 array (NaN for gaps)."""
+    return array("f", (math.nan if point is None else point for point in curve))
+
+
+def hourly_points(day: datetime.date, curve: List[Optional[float]], now: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+    """Aggregate a day curve (evenly spaced, e.g. 288 x 5 min) into hourly mean/min/max StatisticData.
+
+    Only hours that have ended (relative to `now`) and contain at least one sample are returned.
+    """
+    if not curve or 1440 % len(curve):
+        return []
+    values = curve_to_array(curve)
+    per_hour = max(1, len(values) // 24)
+    minutes_per_point = 1440 // len(values)
+    day_start = dt_util.as_utc(dt_util.start_of_local_day(day))
+    day_end = dt_util.as_utc(dt_util.start_of_local_day(day + datetime.timedelta(days=1)))
+    now = now or dt_util.utcnow()
+    points = []
+    for hour_index in range(0, len(values), per_hour):
+        # Elapsed time from local midnight, added in UTC: aware local arithmetic is wall-clock and would give
+        # two rows the same start on spring-forward days. A 23-hour day leaves its last bucket past day_end.
+        hour_start = dt_util.as_local(day_start + datetime.timedelta(minutes=hour_index * minutes_per_point))
+        if hour_start >= day_end or hour_start + datetime.timedelta(hours=1) > now:
+            break
+        samples = [v for v in values[hour_index:hour_index + per_hour] if not math.isnan(v)]
+        if not samples:
+            continue
+        points.append({"start": hour_start, "mean": sum(samples) / len(samples), "min": min(samples), "max": max(samples)})
+    return points
+
+
+async def _async_existing_starts(hass: HomeAssistant, statistic_id: str, start: datetime.datetime, end: datetime.datetime) -> set:
+    """Start timestamps already stored for `statistic_id` in [start, end)."""
+    from homeassistant.components.recorder import get_instance
+    from homeassistant.components.recorder.statistics import statistics_during_period
+
+    rows = await get_instance(hass).async_add_executor_job(
+        statistics_during_period, hass, start, end, {statistic_id}, "hour", None, {"mean"}
+    )
+    return {row["start"] for row in rows.get(statistic_id, [])}
+
+
+async def async_import_intraday(hass: HomeAssistant, device_sn: str, day_curves: Dict[datetime.date, Dict[str, List[Optional[float]]]]) -> int:
+    """Import hourly power statistics for one or more days in one call per curve, skipping hours already stored."""
+    from homeassistant.components.recorder.models import StatisticData
+    from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+    if not day_curves:
+        return 0
+    first_day, last_day = min(day_curves), max(day_curves)
+    range_start = dt_util.start_of_local_day(first_day)
+    range_end = dt_util.start_of_local_day(last_day + datetime.timedelta(days=1))
+    imported = 0
+    for name, (suffix, label) in INTRADAY_STATISTICS.items():
+        points = []
+        for day, curves in sorted(day_curves.items()):
+            points.extend(hourly_points(day, curves.get(name) or []))
+        if not points:
+            continue
+        existing = await _async_existing_starts(hass, statistic_id_for(device_sn, suffix), range_start, range_end)
+        new_points = [StatisticData(**point) for point in points if point["start"].timestamp() not in existing]
+        if new_points:
+            async_add_external_statistics(hass, energy_metadata(device_sn, suffix, label, has_mean=True, unit=UnitOfPower.WATT), new_points)
+            imported += len(new_points)
+    _LOGGER.debug("Intraday import %s: %d new hourly points (%s -> %s)", device_sn, imported, first_day, last_day)
+    return imported
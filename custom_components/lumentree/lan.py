@@ -0,0 +1,257 @@
+# /config/custom_components/lumentree/lan.py
+# Direct LAN transport: the same Modbus read frames over a persistent TCP connection, no cloud broker
+
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+try:
+    from .const import (
+        _LOGGER, TRANSPORT_LAN_RTU, TRANSPORT_LAN_TCP, LAN_CONNECT_TIMEOUT, LAN_RESPONSE_TIMEOUT,
+        LAN_MAX_IN_FLIGHT, LAN_RECONNECT_MAX_DELAY
+    )
+    from .mqtt import LumentreeMqttClient
+    from .parser import calculate_crc16_modbus
+except ImportError:
+    _LOGGER = logging.getLogger(__name__); _LOGGER.warning("ImportError lan.py")
+    TRANSPORT_LAN_RTU = "lan_rtu"; TRANSPORT_LAN_TCP = "lan_tcp"; LAN_CONNECT_TIMEOUT = 5; LAN_RESPONSE_TIMEOUT = 3; LAN_MAX_IN_FLIGHT = 4; LAN_RECONNECT_MAX_DELAY = 60
+    class LumentreeMqttClient:
+        def __init__(self, *args, **kwargs): pass
+    def calculate_crc16_modbus(pb: bytes) -> Optional[int]: return None
+
+MBAP_PROTOCOL_ID = 0
+READ_FUNCTION_CODES = (3, 4)
+
+
+class LumentreeLanClient(LumentreeMqttClient):
+    """LumentreeMqttClient over a local TCP socket (RTU-over-TCP or Modbus-TCP).
+
+    Requests are pipelined (up to LAN_MAX_IN_FLIGHT) on one reused connection and matched in FIFO order
+    (RTU has no transaction id) or by MBAP transaction id. Responses are normalised to RTU frames and go
+    through the inherited _handle_frame -> parser -> dispatcher path, so entities, metrics, diagnostics
+    and the frame recorder behave exactly as with the cloud broker.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_sn: str, device_id: str, host: str, port: int, framing: str = TRANSPORT_LAN_RTU):
+        super().__init__(hass, entry, device_sn, device_id, broker=host, port=port)
+        self._framing = framing
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[Tuple[int, float, int, int, bool]] = deque() # (transaction id, sent monotonic, function code, register count; 0 for writes, probe)
+        self._in_flight = asyncio.Semaphore(LAN_MAX_IN_FLIGHT)
+        self._probe_lock = asyncio.Lock()
+        self._line_free = asyncio.Event(); self._line_free.set() # Cleared while a probe owns the connection
+        self._transaction_id = 0
+        self._generation = 0 # Bumped when a connection is dropped, so waiters from it can't reset its successor
+        self._timeout_handle: Optional[asyncio.TimerHandle] = None # One watchdog for the oldest pending request
+        self._counters.update({"timeouts": 0, "resyncs": 0})
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {**super().diagnostics, "transport": self._framing, "pending": len(self._pending)}
+
+    async def connect(self) -> None:
+        """Open (or reuse) the TCP connection; failures schedule a retry with capped backoff."""
+        async with self._connect_lock:
+            if self._is_connected: return
+            self._stopping = False
+            _LOGGER.info(f"LAN connect: {self._broker}:{self._port} ({self._framing}) for SN: {self._device_sn}")
+            try:
+                self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self._broker, self._port), timeout=LAN_CONNECT_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as e:
+                self._connection_history.append((time.time(), "refused", str(e) or type(e).__name__))
+                self._schedule_reconnect()
+                raise ConnectionRefusedError(f"LAN connect failed: {e}") from e
+            self._connection_history.append((time.time(), "connected", 0))
+            if self._metrics is not None and self._has_connected: self._metrics.count("reconnects")
+            self._has_connected = True
+            self._reconnect_attempts = 0
+            self._is_connected = True
+            self._pending.clear(); self._in_flight = asyncio.Semaphore(LAN_MAX_IN_FLIGHT)
+            self._reader_task = self.hass.async_create_background_task(self._async_read_loop(self._reader), f"lumentree_lan_reader_{self._device_sn}")
+            _LOGGER.info(f"LAN connected {self._broker}:{self._port} for {self._device_sn}.")
+
+    async def _async_close(self, reason: str) -> None:
+        """Drop the connection and every pending request (the stream can no longer be trusted)."""
+        writer, self._writer, self._reader = self._writer, None, None
+        was_connected, self._is_connected = self._is_connected, False
+        self._generation += 1
+        if self._timeout_handle is not None: self._timeout_handle.cancel(); self._timeout_handle = None
+        self._pending.clear(); self._in_flight = asyncio.Semaphore(LAN_MAX_IN_FLIGHT)
+        if was_connected:
+            self._connection_history.append((time.time(), "disconnected", reason))
+            self._cancel_offline_timer(); self._set_offline()
+            if not self._stopping:
+                if self._metrics is not None: self._metrics.count("disconnects")
+                self._schedule_reconnect()
+        task, self._reader_task = self._reader_task, None
+        if task is not None and task is not asyncio.current_task(): task.cancel()
+        if writer is not None:
+            writer.close()
+            try: await writer.wait_closed()
+            except (OSError, asyncio.CancelledError): pass
+
+    def _schedule_reconnect(self) -> None:
+        """Retry the connection with exponential backoff (capped, never gives up: the gateway is local)."""
+        if self._stopping or (self._reconnect_task is not None and not self._reconnect_task.done()): return
+        self._reconnect_attempts += 1
+        delay = min(2 ** self._reconnect_attempts, LAN_RECONNECT_MAX_DELAY)
+        _LOGGER.info(f"Schedule LAN reconn {self._reconnect_attempts} {self._device_sn} in {delay}s.")
+        self._reconnect_task = self.hass.async_create_background_task(self._async_reconnect(delay), f"lumentree_lan_reconnect_{self._device_sn}")
+
+    async def _async_reconnect(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._reconnect_task = None
+        if self._stopping or self._is_connected: return
+        try: await self.connect()
+        except ConnectionRefusedError as e: _LOGGER.debug("LAN reconn failed %s: %s", self._device_sn, e)
+
+    async def disconnect(self) -> None:
+        """Close the connection and cancel timers."""
+        _LOGGER.info(f"Disconnect LAN {self._broker}:{self._port} for {self._device_sn}.")
+        self._stopping = True
+        if self._reconnect_task is not None: self._reconnect_task.cancel(); self._reconnect_task = None
+        self._cancel_offline_timer()
+        self._set_offline()
+        async with self._connect_lock:
+            await self._async_close("stopped")
+
+    async def async_probe_frame(self, predicate: Callable[[bytes], bool], command_hex: str, timeout: float) -> Optional[bytes]:
+        """Send a request that may go unanswered (register scanner) without disturbing polling.
+
+        With RTU framing an unanswered request puts the response FIFO out of step, which normally resets the
+        connection. A probe is therefore sent alone on the line: regular requests wait until it has been
+        answered, or until it timed out and a grace period for a late answer (discarded as unsolicited) passed.
+        """
+        async with self._probe_lock:
+            self._line_free.clear()
+            try:
+                deadline = time.monotonic() + timeout
+                while self._pending: # Let regular requests in flight complete first
+                    if time.monotonic() > deadline: return None
+                    await asyncio.sleep(0.05)
+                future: asyncio.Future = self.hass.loop.create_future()
+                waiter = (predicate, future); self._frame_waiters.append(waiter)
+                try:
+                    if not await self._publish_command(command_hex, probe=True): return None
+                    return await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    if self._pending and self._pending[0][4]:
+                        self._pending.popleft(); self._in_flight.release()
+                        await asyncio.sleep(LAN_RESPONSE_TIMEOUT)
+                    return None
+                finally:
+                    if waiter in self._frame_waiters: self._frame_waiters.remove(waiter)
+            finally:
+                self._line_free.set()
+
+    async def _publish_command(self, command_hex: str, probe: bool = False) -> bool:
+        """Send one RTU read command without waiting for its response (up to LAN_MAX_IN_FLIGHT outstanding)."""
+        if not self._is_connected or self._writer is None:
+            _LOGGER.error(f"LAN not conn {self._device_sn}, cannot send.")
+            return False
+        try:
+            adu = bytes.fromhex(command_hex)
+        except ValueError as e:
+            _LOGGER.error(f"Invalid hex payload {self._device_sn}: {e}")
+            return False
+        generation, in_flight = self._generation, self._in_flight
+        while True:
+            if not probe: await self._line_free.wait()
+            try:
+                await asyncio.wait_for(in_flight.acquire(), timeout=LAN_RESPONSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                return await self._async_timeout("window full", generation)
+            if generation != self._generation: return False # The connection was replaced while waiting
+            if probe or self._line_free.is_set(): break
+            in_flight.release() # A probe took the line meanwhile: don't queue behind it
+        writer = self._writer
+        if writer is None: return False
+        function_code = adu[1]
+        count = int.from_bytes(adu[4:6], "big") if function_code in READ_FUNCTION_CODES else 0
+        if self._framing == TRANSPORT_LAN_TCP:
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            pdu = adu[1:-2] # Strip slave id and CRC; the unit id goes in the MBAP header
+            frame = self._transaction_id.to_bytes(2, "big") + MBAP_PROTOCOL_ID.to_bytes(2, "big") + (len(pdu) + 1).to_bytes(2, "big") + adu[:1] + pdu
+        else:
+            frame = adu
+        _LOGGER.debug("LAN send %s: %s", self._device_sn, frame.hex())
+        publish_started = time.monotonic()
+        self._pending.append((self._transaction_id, publish_started, function_code, count, probe))
+        try:
+            writer.write(frame)
+            await writer.drain()
+        except (OSError, ConnectionError) as e:
+            self._counters["publish_failures"] += 1
+            _LOGGER.warning(f"LAN send failed {self._device_sn}: {e}")
+            await self._async_close("send failed")
+            return False
+        self._counters["polls"] += 1
+        if self._timeout_handle is None: self._check_response_timeout() # Arms the watchdog
+        if self._metrics is not None:
+            self._publish_sent = time.monotonic(); self._metrics.record("publish", self._publish_sent - publish_started)
+        return True
+
+    def _check_response_timeout(self) -> None:
+        """Reset the connection when the oldest request went unanswered (with RTU the FIFO is out of step).
+
+        Runs as a single timer re-armed for whichever request is oldest; it stops when nothing is pending.
+        """
+        self._timeout_handle = None
+        if not self._pending: return
+        sent, probe = self._pending[0][1], self._pending[0][4]
+        if time.monotonic() - sent >= LAN_RESPONSE_TIMEOUT:
+            if not probe:
+                self.hass.async_create_background_task(self._async_timeout("response timeout", self._generation), f"lumentree_lan_timeout_{self._device_sn}")
+                return
+            sent = time.monotonic() # Probes clean up themselves: look again later
+        self._timeout_handle = self.hass.loop.call_later(sent + LAN_RESPONSE_TIMEOUT - time.monotonic(), self._check_response_timeout)
+
+    async def _async_timeout(self, reason: str, generation: int) -> bool:
+        if generation != self._generation: return False # That connection is already gone; don't reset its successor
+        self._counters["timeouts"] += 1
+        _LOGGER.warning(f"LAN {reason} {self._device_sn} ({len(self._pending)} pending), resetting connection.")
+        await self._async_close(reason)
+        return False
+
+    async def _async_read_frame(self, reader: asyncio.StreamReader) -> bytes:
+        """Read one response and return it as an RTU frame (slave, fc, byte count, data, CRC)."""
+        if self._framing == TRANSPORT_LAN_TCP:
+            header = await reader.readexactly(7)
+            transaction_id, length, unit_id = int.from_bytes(header[0:2], "big"), int.from_bytes(header[4:6], "big"), header[6]
+            pdu = await reader.readexactly(length - 1)
+            while self._pending and self._pending[0][0] != transaction_id: self._pending.popleft(); self._in_flight.release() # Lost responses
+            adu = bytes([unit_id]) + pdu
+            crc = calculate_crc16_modbus(adu)
+            return adu + (crc.to_bytes(2, "little") if crc is not None else b"\x00\x00")
+        header = await reader.readexactly(3)
+        if header[1] & 0x80: return header + await reader.readexactly(2) # Exception response: code + CRC
+        if header[1] not in READ_FUNCTION_CODES: return header + await reader.readexactly(5) # Write echo: address, value/count, CRC
+        return header + await reader.readexactly(header[2] + 2)
+
+    async def _async_read_loop(self, reader: asyncio.StreamReader) -> None:
+        """Match responses to pending requests and feed them to the shared parse/dispatch path."""
+        try:
+            while True:
+                frame = await self._async_read_frame(reader)
+                if not self._pending:
+                    self._counters["resyncs"] += 1
+                    _LOGGER.debug("LAN unsolicited frame %s: %s", self._device_sn, frame.hex())
+                    continue
+                _, _, function_code, count, _ = self._pending.popleft(); self._in_flight.release()
+                if self._framing == TRANSPORT_LAN_RTU and (frame[1] & 0x7F != function_code or (count and not frame[1] & 0x80 and frame[2] != count * 2)):
+                    self._counters["resyncs"] += 1 # Out of step: the FIFO can't be trusted any more
+                    await self._async_close("out of sync"); return
+                self._handle_frame(self._topic_sub, frame)
+        except (asyncio.IncompleteReadError, OSError, ConnectionError) as e:
+            if not self._stopping:
+                _LOGGER.warning(f"LAN connection lost {self._device_sn}: {e!r}")
+                await self._async_close("connection lost")
+        except asyncio.CancelledError:
+            pass
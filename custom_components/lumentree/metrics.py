@@ -0,0 +1,73 @@
+# /config/custom_components/lumentree/metrics.py
+# Opt-in per-device pipeline timing: publish -> broker round-trip -> receive -> decode -> dispatch -> state write
+
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+try:
+    from .const import _LOGGER, METRICS_STAGES, METRICS_WINDOW, METRICS_RATE_WINDOW
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    METRICS_STAGES = ("publish", "round_trip", "receive", "decode", "dispatch", "state_write"); METRICS_WINDOW = 512; METRICS_RATE_WINDOW = 60
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class LumentreePipelineMetrics:
+    """Bounded timing samples (monotonic clock) and counters for one device.
+
+    Only created when metrics are enabled; callers check for None, so disabled metrics cost a single comparison.
+    Samples are appended from the MQTT thread and the event loop; deque appends are atomic.
+    """
+
+    def __init__(self, device_sn: str) -> None:
+        """Initialize empty sample windows."""
+        self._device_sn = device_sn
+        self._samples: Dict[str, Deque[float]] = {stage: deque(maxlen=METRICS_WINDOW) for stage in METRICS_STAGES}
+        self._frame_times: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._counters: Dict[str, int] = {"frames": 0, "parse_failures": 0, "reconnects": 0, "disconnects": 0}
+        self._started = time.monotonic()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Add one duration sample for stage."""
+        self._samples[stage].append(seconds)
+
+    def count(self, counter: str) -> None:
+        """Increment a counter."""
+        self._counters[counter] = self._counters.get(counter, 0) + 1
+
+    def frame(self, received: float) -> None:
+        """Record a frame arrival (monotonic timestamp)."""
+        self._frame_times.append(received); self._counters["frames"] += 1
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        return dict(self._counters)
+
+    @property
+    def frames_per_second(self) -> float:
+        """Frame rate over the last METRICS_RATE_WINDOW seconds."""
+        now = time.monotonic(); recent = [t for t in self._frame_times if now - t <= METRICS_RATE_WINDOW]
+        window = min(METRICS_RATE_WINDOW, now - self._started)
+        return round(len(recent) / window, 3) if window > 0 else 0.0
+
+    def summary(self, stage: str) -> Dict[str, Optional[float]]:
+        """Sample count and p50/p95/p99/max in milliseconds."""
+        ordered = sorted(self._samples[stage])
+        if not ordered: return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+        return {
+            "count": len(ordered), "p50": round(_percentile(ordered, 0.50) * 1000, 3), "p95": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99": round(_percentile(ordered, 0.99) * 1000, 3), "max": round(ordered[-1] * 1000, 3),
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Snapshot for diagnostics."""
+        return {
+            "frames_per_second": self.frames_per_second, **self.counters,
+            "stages_ms": {stage: self.summary(stage) for stage in METRICS_STAGES},
+        }
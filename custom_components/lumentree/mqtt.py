@@ -3,10 +3,13 @@
 
 import asyncio
 import json
+import struct
 import ssl
 import time
+import zlib
 import logging
-from typing import Any, Dict, Optional, Callable
+from collections import deque
+from typing import Any, Dict, List, Optional, Callable, Sequence, Tuple
 from functools import partial
 
 import paho.mqtt.client as paho
@@ -25,33 +28,50 @@ try:
         CONF_DEVICE_SN, CONF_DEVICE_ID,
         MQTT_CLIENT_ID_FORMAT, MQTT_KEEPALIVE, KEY_ONLINE_STATUS,
         KEY_LAST_RAW_MQTT, DEFAULT_POLLING_INTERVAL,
-        REG_ADDR_CELL_START, REG_ADDR_CELL_COUNT
+        REG_ADDR_CELL_START, REG_ADDR_CELL_COUNT, POWER_GROUP_COUNT, REGISTER_GROUPS,
+        RAW_FRAME_BUFFER_SIZE, CONNECTION_HISTORY_SIZE, MQTT_RECOVERY_HISTORY, KEY_MQTT_RECOVERY
     )
-    from .parser import parse_mqtt_payload, generate_modbus_read_command
+    from .parser import parse_mqtt_payload, generate_modbus_read_command, extract_modbus_frame
+    from .profiler import PROFILER
+    from .endpoints import LumentreeEndpointPool, backoff_delay
 except ImportError:
     _LOGGER = logging.getLogger(__name__); _LOGGER.warning("ImportError mqtt.py")
-    DOMAIN = "lumentree"; MQTT_BROKER = "lesvr.suntcn.com"; MQTT_PORT = 1886; MQTT_USERNAME = "appuser"; MQTT_PASSWORD = "app666"; MQTT_KEEPALIVE = 20; MQTT_SUB_TOPIC_FORMAT = "reportApp/{device_sn}"; MQTT_PUB_TOPIC_FORMAT = "listenApp/{device_sn}"; SIGNAL_UPDATE_FORMAT = f"{DOMAIN}_mqtt_update_{{device_sn}}"; CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_ID = "device_id"; MQTT_CLIENT_ID_FORMAT = "android-{device_id}-{timestamp}"; KEY_ONLINE_STATUS="online_status"; KEY_LAST_RAW_MQTT = "last_raw_mqtt_hex"; DEFAULT_POLLING_INTERVAL=5; REG_ADDR_CELL_START=250; REG_ADDR_CELL_COUNT=50;
+    DOMAIN = "lumentree"; MQTT_BROKER = "lesvr.suntcn.com"; MQTT_PORT = 1886; MQTT_USERNAME = "appuser"; MQTT_PASSWORD = "app666"; MQTT_KEEPALIVE = 20; MQTT_SUB_TOPIC_FORMAT = "reportApp/{device_sn}"; MQTT_PUB_TOPIC_FORMAT = "listenApp/{device_sn}"; SIGNAL_UPDATE_FORMAT = f"{DOMAIN}_mqtt_update_{{device_sn}}"; CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_ID = "device_id"; MQTT_CLIENT_ID_FORMAT = "android-{device_id}-{timestamp}"; KEY_ONLINE_STATUS="online_status"; KEY_LAST_RAW_MQTT = "last_raw_mqtt_hex"; DEFAULT_POLLING_INTERVAL=5; REG_ADDR_CELL_START=250; REG_ADDR_CELL_COUNT=50; POWER_GROUP_COUNT=64; REGISTER_GROUPS={}; RAW_FRAME_BUFFER_SIZE=20; CONNECTION_HISTORY_SIZE=20; MQTT_RECOVERY_HISTORY=20; KEY_MQTT_RECOVERY="mqtt_recovery_time"
     def parse_mqtt_payload(ph:str)->Optional[Dict[str,Any]]: return None
     def generate_modbus_read_command(sid:int,fc:int,addr:int,num:int)->Optional[str]: return None
+    def extract_modbus_frame(ph:str)->Optional[bytes]: return None
     def async_call_later(hass, delay, target): pass
+    class _NoProfiler: session = None
+    PROFILER = _NoProfiler()
+    class LumentreeEndpointPool:
+        def __init__(self, endpoints): self._endpoints = list(endpoints)
+        def pick(self): return self._endpoints[0]
+        def record_success(self, host, port, latency): pass
+        def record_failure(self, host, port): pass
+        diagnostics = []
+    def backoff_delay(attempt: int) -> float: return min(60, 2 ** attempt)
 
-RECONNECT_DELAY_SECONDS = 5
-MAX_RECONNECT_ATTEMPTS = 10
 CONNECT_TIMEOUT = 20
 OFFLINE_TIMEOUT_SECONDS = DEFAULT_POLLING_INTERVAL * 2.5
 NUM_MAIN_REGISTERS_TO_READ = 95 # Read registers 0-94
+POLL_RESPONSE_BYTES = (NUM_MAIN_REGISTERS_TO_READ * 2, POWER_GROUP_COUNT * 2, REG_ADDR_CELL_COUNT * 2) # Frames the parser decodes; anything else may belong to a waiter
 
 class LumentreeMqttClient:
     """Manages MQTT connection, messages, and online status."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_sn: str, device_id: str):
-        """Initialize the MQTT client."""
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_sn: str, device_id: str, broker: str = MQTT_BROKER, port: int = MQTT_PORT,
+                 endpoints: Optional[Sequence[Tuple[str, int]]] = None):
+        """Initialize the MQTT client (broker/port are overridable for the local simulator, endpoints are failover candidates)."""
         self.hass = hass
         self.entry = entry
+        self._pool = LumentreeEndpointPool([(broker, port), *(endpoints or [])])
+        self._broker = broker # Current endpoint
+        self._port = port
         self._device_sn = device_sn
         self._device_id = device_id
         self._mqttc: Optional[paho.Client] = None
-        timestamp = int(time.time())
+        # Stable per entry (not wall-clock) so the broker can resume the persistent session after a reconnect or restart
+        timestamp = zlib.crc32(str(getattr(entry, "entry_id", device_sn)).encode("utf-8"))
         try:
             self._client_id = MQTT_CLIENT_ID_FORMAT.format(device_id=self._device_id, timestamp=timestamp)
         except KeyError:
@@ -63,20 +83,72 @@ class LumentreeMqttClient:
         self._topic_pub = MQTT_PUB_TOPIC_FORMAT.format(device_sn=self._device_sn)
         self._connect_lock = asyncio.Lock()
         self._reconnect_attempts = 0
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._attempt_started: Optional[float] = None # Monotonic start of the current connect attempt
+        self._disconnected_at: Optional[float] = None # Monotonic time of the last unexpected disconnect
+        self._recoveries: deque = deque(maxlen=MQTT_RECOVERY_HISTORY) # Seconds per recovery
+        self._session_present = False
         self._is_connected = False
         self._stopping = False
         self._connected_event = asyncio.Event()
         self._online: bool = False
         self._offline_timer_unsub: Optional[Callable] = None
+        self._metrics: Optional[Any] = None # LumentreePipelineMetrics when enabled
+        self._frame_recorder: Optional[Any] = None # LumentreeFrameRecorder when enabled
+        self._event_detector: Optional[Any] = None # LumentreeEventDetector
+        self._publish_sent: Optional[float] = None
+        self._has_connected = False
+        # Always-on diagnostics (bounded, no logging needed)
+        self._raw_frames: deque = deque(maxlen=RAW_FRAME_BUFFER_SIZE) # (time, topic, payload hex)
+        self._connection_history: deque = deque(maxlen=CONNECTION_HISTORY_SIZE) # (time, event, rc)
+        self._counters: Dict[str, int] = {"polls": 0, "publish_failures": 0, "frames": 0, "parsed": 0, "unparsed": 0}
+        self._frame_waiters: List[Tuple[Callable[[bytes], bool], asyncio.Future]] = [] # Loop-only; see async_wait_frame
+
+    def set_metrics(self, metrics: Optional[Any]) -> None:
+        """Attach pipeline metrics (None disables timing)."""
+        self._metrics = metrics
+
+    def set_event_detector(self, detector: Optional[Any]) -> None:
+        """Attach an edge-triggered event detector (None disables detection)."""
+        self._event_detector = detector
+
+    def set_frame_recorder(self, recorder: Optional[Any]) -> None:
+        """Attach a raw frame recorder (None disables recording)."""
+        self._frame_recorder = recorder
 
     @property
     def is_connected(self) -> bool:
         return self._is_connected
 
+    @property
+    def read_plan(self) -> list:
+        """Modbus reads issued for this client (register groups, interleaved one per poll tick)."""
+        return [
+            {"name": name, "start": start, "count": count, "interval_s": interval, "stale_after_s": stale_after}
+            for name, (start, count, interval, stale_after) in REGISTER_GROUPS.items()
+        ]
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        """Connection state, reconnect history and counters."""
+        return {
+            "connected": self._is_connected, "online": self._online, "broker": f"{self._broker}:{self._port}",
+            "reconnect_attempts": self._reconnect_attempts, "session_present": self._session_present,
+            "endpoints": self._pool.diagnostics,
+            "last_recovery_s": self._recoveries[-1] if self._recoveries else None, "recoveries_s": list(self._recoveries),
+            "history": [{"time": ts, "event": event, "rc": rc} for ts, event, rc in list(self._connection_history)],
+            "counters": dict(self._counters),
+        }
+
+    @property
+    def raw_frames(self) -> list:
+        """Last raw frames, oldest first: (unix time, topic, payload hex)."""
+        return list(self._raw_frames)
+
     def _cancel_offline_timer(self):
         """Cancel the offline timer if it's active."""
         if self._offline_timer_unsub:
-            _LOGGER.debug(f"Cancelling offline timer {self._client_id}")
+            _LOGGER.debug("Cancelling offline timer %s", self._client_id)
             try:
                 self._offline_timer_unsub()
             except Exception as e:
@@ -95,7 +167,7 @@ class LumentreeMqttClient:
     def _start_offline_timer(self):
         """Start or restart the offline timer."""
         self._cancel_offline_timer()
-        _LOGGER.debug(f"Start offline timer ({OFFLINE_TIMEOUT_SECONDS}s) {self._client_id}")
+        _LOGGER.debug("Start offline timer (%ss) %s", OFFLINE_TIMEOUT_SECONDS, self._client_id)
         self._offline_timer_unsub = async_call_later(
             self.hass, OFFLINE_TIMEOUT_SECONDS, self._set_offline
         )
@@ -108,14 +180,16 @@ class LumentreeMqttClient:
                 return
             self._stopping = False
             self._connected_event.clear()
-            self._mqttc = paho.Client(client_id=self._client_id, protocol=paho.MQTTv311, callback_api_version=paho.CallbackAPIVersion.VERSION1)
+            self._broker, self._port = self._pool.pick()
+            self._mqttc = paho.Client(client_id=self._client_id, clean_session=False, protocol=paho.MQTTv311, callback_api_version=paho.CallbackAPIVersion.VERSION1)
             self._mqttc.username_pw_set(username=MQTT_USERNAME, password=MQTT_PASSWORD)
             self._mqttc.on_connect=self._on_connect
             self._mqttc.on_disconnect=self._on_disconnect
             self._mqttc.on_message=self._on_message
-            _LOGGER.info(f"MQTT connect: {MQTT_BROKER}:{MQTT_PORT} (Client: {self._client_id}) for SN: {self._device_sn}")
+            _LOGGER.info(f"MQTT connect: {self._broker}:{self._port} (Client: {self._client_id}) for SN: {self._device_sn}")
             try:
-                await self.hass.async_add_executor_job(self._mqttc.connect, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE)
+                self._attempt_started = time.monotonic()
+                await self.hass.async_add_executor_job(self._mqttc.connect, self._broker, self._port, MQTT_KEEPALIVE)
                 self._mqttc.loop_start()
                 _LOGGER.info(f"MQTT loop started {self._client_id}. Wait CONNACK {CONNECT_TIMEOUT}s.")
                 try:
@@ -125,32 +199,47 @@ class LumentreeMqttClient:
                     _LOGGER.info(f"MQTT connected {self._client_id}.")
                 except asyncio.TimeoutError:
                     _LOGGER.error(f"MQTT timeout {self._client_id}.")
-                    await self.disconnect()
                     raise ConnectionRefusedError("MQTT timeout.")
             except Exception as e:
-                _LOGGER.error(f"Failed MQTT connect {self._client_id}: {e}")
+                _LOGGER.error(f"Failed MQTT connect {self._client_id} ({self._broker}:{self._port}): {e}")
+                self._pool.record_failure(self._broker, self._port)
                 if self._mqttc:
                     try:
                         self._mqttc.loop_stop()
+                        self._mqttc.disconnect()
                         _LOGGER.debug(f"MQTT loop stopped after failure {self._client_id}.")
                     except Exception as se:
                         _LOGGER.warning(f"Loop stop err: {se}")
                 self._mqttc = None
                 self._is_connected = False
                 self._connected_event.set()
+                if not self._stopping: self._schedule_reconnect() # Keep trying (next endpoint by health) until unloaded
                 if isinstance(e, ConnectionRefusedError):
                     raise
                 raise ConnectionRefusedError(f"MQTT setup error: {e}") from e
 
     def _on_connect(self, client, userdata, flags, rc, properties=None):
         """Callback when connection is established."""
+        self._connection_history.append((time.time(), "connected" if rc == paho.CONNACK_ACCEPTED else "refused", rc))
         if rc == paho.CONNACK_ACCEPTED:
-            _LOGGER.info(f"MQTT connected (rc={rc}) {self._client_id}. Sub: {self._topic_sub}")
+            now = time.monotonic()
+            self._session_present = bool((flags or {}).get("session present"))
+            _LOGGER.info(f"MQTT connected (rc={rc}) {self._client_id} to {self._broker}:{self._port}. Session present: {self._session_present}")
+            self._pool.record_success(self._broker, self._port, now - self._attempt_started if self._attempt_started is not None else None)
+            self._attempt_started = None
             self._reconnect_attempts = 0
             self._is_connected = True
+            if self._metrics is not None and self._has_connected: self._metrics.count("reconnects")
+            self._has_connected = True
+            if self._disconnected_at is not None:
+                recovery = round(now - self._disconnected_at, 3); self._disconnected_at = None
+                self._recoveries.append(recovery)
+                _LOGGER.info(f"MQTT recovered {self._client_id} in {recovery}s.")
+                self.hass.loop.call_soon_threadsafe(async_dispatcher_send, self.hass, self._signal_update, {KEY_MQTT_RECOVERY: recovery})
             try:
-                result, mid = client.subscribe(self._topic_sub, 0)
-                _LOGGER.debug(f"Sub {'OK' if result==0 else 'Fail'} {self._topic_sub} (mid={mid})")
+                if not self._session_present: # The broker kept our subscription otherwise: no SUBSCRIBE round-trip
+                    result, mid = client.subscribe(self._topic_sub, 0)
+                    _LOGGER.debug(f"Sub {'OK' if result==0 else 'Fail'} {self._topic_sub} (mid={mid})")
             except Exception as e:
                 _LOGGER.error(f"MQTT sub fail: {e}")
             finally:
@@ -159,6 +248,7 @@ class LumentreeMqttClient:
             err_map={1:"Proto",2:"ID Rej",3:"Srv Unavail",4:"Bad User/Pass",5:"No Auth"}
             err=err_map.get(rc,'Unk')
             _LOGGER.error(f"MQTT refused {self._client_id} (rc={rc}): {err}.")
+            self._pool.record_failure(self._broker, self._port); self._attempt_started = None
             self._is_connected = False
             self.hass.loop.call_soon_threadsafe(self._connected_event.set)
             self.hass.loop.call_soon_threadsafe(self._set_offline)
@@ -168,49 +258,98 @@ class LumentreeMqttClient:
     def _on_disconnect(self, client, userdata, rc, properties=None):
         """Callback when disconnected."""
         was_online = self._online
+        self._connection_history.append((time.time(), "disconnected", rc))
         self._is_connected = False
-        self._cancel_offline_timer()
-        self._set_offline()
+        self.hass.loop.call_soon_threadsafe(self._set_offline) # Paho thread: timer and dispatcher belong to the loop
         if rc == 0:
             _LOGGER.info(f"MQTT disconnect OK {self._client_id}.")
         else:
+            if self._metrics is not None: self._metrics.count("disconnects")
+            if self._disconnected_at is None: self._disconnected_at = time.monotonic()
             _LOGGER.warning(f"MQTT unexpected disconnect {self._client_id} (rc={rc}).")
         if not self._stopping:
             self._schedule_reconnect()
 
     def _schedule_reconnect(self):
-        """Schedules an asynchronous reconnection attempt with exponential backoff."""
-        if self._reconnect_attempts < MAX_RECONNECT_ATTEMPTS:
-            self._reconnect_attempts += 1
-            delay = min(RECONNECT_DELAY_SECONDS * (2 ** (self._reconnect_attempts - 1)), 60)
-            _LOGGER.info(f"Schedule MQTT reconn {self._reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS} {self._client_id} in {delay}s.")
-            self.hass.async_create_task(self._async_reconnect(delay))
-        else:
-            _LOGGER.error(f"MQTT reconn failed {self._client_id}.")
-            self.hass.loop.call_soon_threadsafe(async_dispatcher_send, self.hass, self._signal_update, {"error": "MQTT_reconnect_failed"})
+        """Schedules a reconnection attempt (thread-safe: also called from paho's thread)."""
+        self.hass.loop.call_soon_threadsafe(self._async_schedule_reconnect)
+
+    @callback
+    def _async_schedule_reconnect(self) -> None:
+        """One pending attempt at a time, full-jitter exponential backoff, never gives up while loaded."""
+        if self._stopping or (self._reconnect_task is not None and not self._reconnect_task.done()): return
+        delay = backoff_delay(self._reconnect_attempts)
+        self._reconnect_attempts += 1
+        _LOGGER.info(f"Schedule MQTT reconn {self._reconnect_attempts} {self._client_id} in {delay:.1f}s.")
+        self._reconnect_task = self.hass.async_create_background_task(self._async_reconnect(delay), f"lumentree_mqtt_reconnect_{self._device_sn}")
 
     async def _async_reconnect(self, delay: float):
-        """Waits for the delay and attempts reconnection."""
-        await asyncio.sleep(delay)
-        if not self.is_connected and not self._stopping and self._mqttc:
-             _LOGGER.debug(f"Try MQTT reconn job {self._client_id}...")
-             try:
-                 await self.hass.async_add_executor_job(self._mqttc.reconnect)
-             except Exception as e:
-                 _LOGGER.warning(f"MQTT reconn job fail {self._client_id}: {e}")
+        """Waits for the delay and reconnects to the healthiest endpoint, with paho's loop stopped so only this task drives the socket."""
+        try:
+            await asyncio.sleep(delay)
+            if self.is_connected or self._stopping: return
+            if self._mqttc is None: # Initial connect failed: full setup again
+                try: await self.connect()
+                except ConnectionRefusedError as e: _LOGGER.debug("MQTT reconn failed %s: %s", self._client_id, e)
+                return
+            mqttc = self._mqttc
+            await self.hass.async_add_executor_job(mqttc.loop_stop) # Paho's own reconnect would keep retrying the old endpoint
+            if self.is_connected or self._stopping: # Paho got back in before its loop stopped
+                if not self._stopping: mqttc.loop_start()
+                return
+            self._broker, self._port = self._pool.pick()
+            _LOGGER.debug(f"Try MQTT reconn job {self._client_id} -> {self._broker}:{self._port}...")
+            self._connected_event.clear()
+            try:
+                self._attempt_started = time.monotonic()
+                await self.hass.async_add_executor_job(mqttc.connect, self._broker, self._port, MQTT_KEEPALIVE) # connect() = set endpoint + reconnect
+                mqttc.loop_start()
+                await asyncio.wait_for(self._connected_event.wait(), timeout=CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                _LOGGER.warning(f"MQTT reconn timeout {self._client_id} ({self._broker}:{self._port}): no CONNACK in {CONNECT_TIMEOUT}s.")
+                self._pool.record_failure(self._broker, self._port); self._attempt_started = None
+                self._schedule_reconnect()
+            except Exception as e:
+                _LOGGER.warning(f"MQTT reconn job fail {self._client_id} ({self._broker}:{self._port}): {e}")
+                self._pool.record_failure(self._broker, self._port); self._attempt_started = None
+                self._schedule_reconnect()
+            else:
+                if not self._is_connected and not self._stopping: self._schedule_reconnect() # Refused: _on_connect recorded the failure
+        finally:
+            self._reconnect_task = None
 
     def _on_message(self, client, userdata, msg: MQTTMessage):
         """Callback when a message is received."""
-        topic = msg.topic
+        self._handle_frame(msg.topic, msg.payload)
+
+    def _handle_frame(self, topic: str, payload_bytes: bytes) -> None:
+        """Record, parse and dispatch one response frame (paho thread, or the loop for the LAN transport)."""
+        metrics = self._metrics
+        if metrics is not None:
+            received = time.monotonic(); metrics.frame(received)
+            if self._publish_sent is not None: metrics.record("round_trip", received - self._publish_sent); self._publish_sent = None
         try:
-            payload_bytes = msg.payload
-            payload_hex = ''.join(f'{b:02x}' for b in payload_bytes) if payload_bytes else ""
-            _LOGGER.debug(f"MQTT msg recv {self._client_id}: T='{topic}', P='{payload_hex[:60]}...' (Len: {len(payload_bytes)})")
+            if self._frame_recorder is not None: self._frame_recorder.record(topic, payload_bytes)
+            payload_hex = payload_bytes.hex() if payload_bytes else ""
+            arrived = time.time()
+            self._counters["frames"] += 1; self._raw_frames.append((arrived, topic, payload_hex))
+            _LOGGER.debug("MQTT msg recv %s: T='%s', P='%s...' (Len: %d)", self._client_id, topic, payload_hex[:60], len(payload_bytes))
 
             if topic == self._topic_sub:
-                parsed_data = parse_mqtt_payload(payload_hex)
+                if self._frame_waiters:
+                    frame = extract_modbus_frame(payload_hex)
+                    if frame is not None and not (frame[1] in (3, 4) and frame[2] in POLL_RESPONSE_BYTES):
+                        self.hass.loop.call_soon_threadsafe(self._async_resolve_waiters, frame); return
+                if metrics is not None: decode_started = time.perf_counter()
+                profile_session = PROFILER.session
+                if profile_session is not None: parsed_data = profile_session.runcall(parse_mqtt_payload, payload_hex)
+                else: parsed_data = parse_mqtt_payload(payload_hex)
+                if metrics is not None:
+                    metrics.record("decode", time.perf_counter() - decode_started)
+                    if not parsed_data: metrics.count("parse_failures")
+                self._counters["parsed" if parsed_data else "unparsed"] += 1
                 if parsed_data:
-                    _LOGGER.debug(f"Parsed data {topic} ({self._client_id}): {parsed_data}")
+                    _LOGGER.debug("Parsed data %s (%s): %s", topic, self._client_id, parsed_data)
 
                     # Update online status and reset timer
                     send_online_true = False
@@ -219,6 +358,7 @@ class LumentreeMqttClient:
                         parsed_data[KEY_ONLINE_STATUS] = True # Send True on first successful parse
                         send_online_true = True
                     self._start_offline_timer()
+                    if self._event_detector is not None: self._event_detector.process(parsed_data, arrived)
 
                     # Add raw hex data if needed
                     try:
@@ -227,29 +367,78 @@ class LumentreeMqttClient:
                         pass
 
                     # Dispatch the parsed data (only regular updates now)
-                    self.hass.loop.call_soon_threadsafe(async_dispatcher_send, self.hass, self._signal_update, parsed_data)
+                    if metrics is not None or profile_session is not None: self.hass.loop.call_soon_threadsafe(self._async_dispatch_instrumented, parsed_data, time.monotonic())
+                    else: self.hass.loop.call_soon_threadsafe(async_dispatcher_send, self.hass, self._signal_update, parsed_data)
 
             else:
                 _LOGGER.warning(f"Unexpected topic {self._client_id}: {topic}")
         except Exception as e:
             _LOGGER.exception(f"Error proc MQTT msg {topic} {self._client_id}")
 
+    @callback
+    def _async_dispatch_instrumented(self, parsed_data: Dict[str, Any], handed_off: float) -> None:
+        """Dispatch with timing (receive = thread -> loop hand-off, dispatch = listener fan-out) and/or profiling."""
+        metrics = self._metrics; profile_session = PROFILER.session
+        started = time.monotonic()
+        if metrics is not None: metrics.record("receive", started - handed_off)
+        if profile_session is not None: profile_session.runcall(async_dispatcher_send, self.hass, self._signal_update, parsed_data)
+        else: async_dispatcher_send(self.hass, self._signal_update, parsed_data)
+        if metrics is not None: metrics.record("dispatch", time.monotonic() - started)
+
+    @callback
+    def _async_resolve_waiters(self, frame: bytes) -> None:
+        for waiter in list(self._frame_waiters):
+            predicate, future = waiter
+            if not future.done() and predicate(frame):
+                future.set_result(frame); self._frame_waiters.remove(waiter)
+                return
+        _LOGGER.debug("Unclaimed frame %s: %s", self._client_id, frame.hex())
+
+    async def async_wait_frame(self, predicate: Callable[[bytes], bool], send: Optional[str] = None, timeout: float = CONNECT_TIMEOUT) -> Optional[bytes]:
+        """Optionally send command hex, then wait for the first non-poll response frame matching predicate (None on timeout)."""
+        future: asyncio.Future = self.hass.loop.create_future()
+        waiter = (predicate, future); self._frame_waiters.append(waiter)
+        try:
+            if send is not None and not await self._publish_command(send): return None
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if waiter in self._frame_waiters: self._frame_waiters.remove(waiter)
+
+    async def async_probe_frame(self, predicate: Callable[[bytes], bool], command_hex: str, timeout: float) -> Optional[bytes]:
+        """Send a request that may go unanswered (register scanner); over MQTT a missing response disturbs nothing."""
+        return await self.async_wait_frame(predicate, command_hex, timeout)
+
+    async def async_read_registers(self, start: int, count: int, timeout: float = CONNECT_TIMEOUT) -> Optional[List[int]]:
+        """Read count holding registers from start (not for 50/95-register spans, which go to the parser)."""
+        command_hex = generate_modbus_read_command(1, 3, start, count)
+        if not command_hex: return None
+        frame = await self.async_wait_frame(lambda f: f[1] == 3 and f[2] == count * 2, command_hex, timeout)
+        if frame is None: return None
+        return list(struct.unpack(f">{count}H", frame[3:3 + count * 2]))
+
     async def _publish_command(self, command_hex: str) -> bool:
         """Internal helper to publish a hex command."""
         if not self.is_connected or not self._mqttc:
             _LOGGER.error(f"MQTT not conn {self._client_id}, cannot pub.")
             return False
-        _LOGGER.debug(f"Pub to {self._topic_pub} ({self._client_id}): {command_hex}")
+        _LOGGER.debug("Pub to %s (%s): %s", self._topic_pub, self._client_id, command_hex)
         try:
             payload_bytes = bytes.fromhex(command_hex)
             publish_task = partial(self._mqttc.publish, self._topic_pub, payload=payload_bytes, qos=0)
+            publish_started = time.monotonic()
             msg_info = await self.hass.async_add_executor_job(publish_task)
+            if self._metrics is not None:
+                self._publish_sent = time.monotonic(); self._metrics.record("publish", self._publish_sent - publish_started)
 
             if msg_info is None or msg_info.rc != paho.MQTT_ERR_SUCCESS:
+                 self._counters["publish_failures"] += 1
                  _LOGGER.error(f"MQTT pub fail {self._client_id} RC: {msg_info.rc if msg_info else 'Executor Error'}")
                  return False
             else:
-                 _LOGGER.debug(f"Pub OK (mid={msg_info.mid}) {self._client_id}")
+                 self._counters["polls"] += 1
+                 _LOGGER.debug("Pub OK (mid=%s) %s", msg_info.mid, self._client_id)
                  return True
         except ValueError as e:
             _LOGGER.error(f"Invalid hex payload {self._client_id}: {e}")
@@ -270,6 +459,14 @@ class LumentreeMqttClient:
         else:
             _LOGGER.error(f"Failed gen Modbus read (0-{num_registers-1}) {self._client_id}.")
 
+    async def async_request_block(self, start: int, count: int) -> bool:
+        """Requests one register group; the response goes through the parser (see POLL_RESPONSE_BYTES)."""
+        command_hex = generate_modbus_read_command(1, 3, start, count)
+        if not command_hex:
+            _LOGGER.error(f"Failed gen Modbus read ({start}-{start+count-1}) {self._client_id}.")
+            return False
+        return await self._publish_command(command_hex)
+
     # <<< REMOVED async_request_extended_data >>>
 
     async def async_request_battery_cells(self):
@@ -285,7 +482,7 @@ class LumentreeMqttClient:
         """Disconnects the MQTT client and cleans up timers."""
         _LOGGER.info(f"Disconnect MQTT req {self._client_id}.")
         self._stopping = True
-        self._reconnect_attempts = MAX_RECONNECT_ATTEMPTS
+        if self._reconnect_task is not None: self._reconnect_task.cancel(); self._reconnect_task = None
         self._connected_event.set()
         self._cancel_offline_timer()
         self._set_offline()
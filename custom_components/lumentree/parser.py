@@ -23,12 +23,12 @@ try:
         KEY_MASTER_SLAVE_STATUS,
         KEY_MQTT_DEVICE_SN,
         KEY_BATTERY_CELL_INFO, REG_ADDR_CELL_START, REG_ADDR_CELL_COUNT,
-        MAP_BATTERY_TYPE
+        MAP_BATTERY_TYPE, POWER_GROUP_START, POWER_GROUP_COUNT
     )
 except ImportError:
     _LOGGER = logging.getLogger(__name__); _LOGGER.warning("ImportError parser.py")
     crc16_modbus_func = None; REG_ADDR = {}; KEY_ONLINE_STATUS="online"; KEY_IS_UPS_MODE="ups"; KEY_PV_POWER="pv"; KEY_BATTERY_POWER="bat_p"; KEY_BATTERY_SOC="soc"; KEY_GRID_POWER="grid_p"; KEY_LOAD_POWER="load_p"; KEY_BATTERY_VOLTAGE="bat_v"; KEY_BATTERY_CURRENT="bat_c"; KEY_AC_OUT_VOLTAGE="ac_out_v"; KEY_GRID_VOLTAGE="grid_v"; KEY_AC_OUT_FREQ="ac_out_f"; KEY_AC_OUT_POWER="ac_out_p"; KEY_AC_OUT_VA="ac_out_va"; KEY_DEVICE_TEMP="temp"; KEY_PV1_VOLTAGE="pv1_v"; KEY_PV1_POWER="pv1_p"; KEY_PV2_VOLTAGE="pv2_v"; KEY_PV2_POWER="pv2_p"; KEY_BATTERY_STATUS="bat_stat"; KEY_GRID_STATUS="grid_stat"; KEY_AC_IN_VOLTAGE="ac_in_v"; KEY_AC_IN_FREQ="ac_in_f"; KEY_AC_IN_POWER="ac_in_p"; KEY_BATTERY_TYPE="bat_type"; KEY_MASTER_SLAVE_STATUS="ms_stat"; KEY_MQTT_DEVICE_SN="mqtt_sn"; KEY_BATTERY_CELL_INFO="cells"
-    REG_ADDR_CELL_START=250; REG_ADDR_CELL_COUNT=50; MAP_BATTERY_TYPE={}
+    REG_ADDR_CELL_START=250; REG_ADDR_CELL_COUNT=50; MAP_BATTERY_TYPE={}; POWER_GROUP_START=11; POWER_GROUP_COUNT=64
 except KeyError: _LOGGER = logging.getLogger(__name__); _LOGGER.warning("KeyError parser.py const")
 
 
@@ -48,7 +48,7 @@ def verify_crc(ph: str) -> Tuple[bool, Optional[str]]:
         if cc is None: return False, "Calc fail"
         cch = cc.to_bytes(2,'little').hex()
         ok = cch == rc
-        if not ok: _LOGGER.warning(f"CRC mismatch! Rcv: {rc}, Calc: {cch}")
+        if not ok: _LOGGER.warning("CRC mismatch! Rcv: %s, Calc: %s", rc, cch)
         else: _LOGGER.debug("CRC check successful.")
         return ok, None if ok else f"Mismatch {rc} vs {cch}"
     except Exception: return False, "Verify error"
@@ -70,13 +70,45 @@ def generate_modbus_read_command(sid: int, fc: int, addr: int, num: int) -> Opti
         full = adu + crc.to_bytes(2,'little')
         command_hex = full.hex()
         # <<< Tách log và return >>>
-        _LOGGER.debug(f"Generated Modbus command: {command_hex}")
+        _LOGGER.debug("Generated Modbus command: %s", command_hex)
         return command_hex
     except Exception as e:
         _LOGGER.exception(f"Error generating Modbus command: {e}")
         return None
 # --- HẾT PHẦN SỬA ---
 
+def generate_modbus_write_command(sid: int, addr: int, values: List[int]) -> Optional[str]:
+    """Generates a Modbus write command hex string with CRC: function 6 for one register, 16 for several."""
+    if not crc16_modbus_func:
+        _LOGGER.error("Cannot generate command: crcmod library missing.")
+        return None
+    if not values or len(values) > 123 or any(not 0 <= v <= 0xFFFF for v in values):
+        _LOGGER.error("Invalid Modbus write values: %s", values)
+        return None
+    if len(values) == 1: pdu = bytes([6]) + addr.to_bytes(2,'big') + values[0].to_bytes(2,'big')
+    else: pdu = bytes([16]) + addr.to_bytes(2,'big') + len(values).to_bytes(2,'big') + bytes([len(values)*2]) + struct.pack(f">{len(values)}H", *values)
+    adu = bytes([sid]) + pdu
+    crc = calculate_crc16_modbus(adu)
+    if crc is None:
+        _LOGGER.error("CRC calculation failed.")
+        return None
+    command_hex = (adu + crc.to_bytes(2,'little')).hex()
+    _LOGGER.debug("Generated Modbus write command: %s", command_hex)
+    return command_hex
+
+def extract_modbus_frame(ph: str) -> Optional[bytes]:
+    """RTU response frame (slave .. CRC) from a payload hex, with or without the <SN>2b2b2b2b prefix. None if malformed."""
+    sep = "2b2b2b2b"
+    if sep in ph:
+        parts = ph.split(sep)
+        if len(parts) != 2: return None
+        ph = parts[1]
+    if len(ph) < 10 or len(ph) % 2: return None
+    crc_ok, _ = verify_crc(ph)
+    if not crc_ok: return None
+    try: return bytes.fromhex(ph)
+    except ValueError: return None
+
 # --- Helper Functions --- (Giữ nguyên)
 def _read_register(db: bytes, ra: int, s: bool, f: float = 1.0, bc: int = 2) -> Optional[float]:
     offset_bytes = ra * 2
@@ -105,7 +137,7 @@ def _read_string(db: bytes, sa: int, nr: int) -> Optional[str]:
     return None
 
 def _parse_battery_cells(db: bytes) -> Optional[Dict[str, Any]]:
-    _LOGGER.debug(f"Parsing {len(db)} cell bytes..."); cd, nc, tv, mnv, mxv = {}, 0, 0.0, 999.0, 0.0; npc = len(db)//2
+    _LOGGER.debug("Parsing %d cell bytes...", len(db)); cd, nc, tv, mnv, mxv = {}, 0, 0.0, 999.0, 0.0; npc = len(db)//2
     for i in range(npc):
         v_mv = _read_register(db, i, False);
         if v_mv is not None:
@@ -119,12 +151,12 @@ def _parse_battery_cells(db: bytes) -> Optional[Dict[str, Any]]:
     if nc > 0:
         avg=round(tv/nc,3); diff=round(mxv-mnv,3) if nc > 1 else 0.0
         res={"num":nc,"avg":avg,"min":mnv if mnv!=999.0 else None,"max":mxv if mxv!=0.0 else None,"diff":diff,"cells":cd}
-        _LOGGER.debug(f"Parsed cells: {res}"); return res
+        _LOGGER.debug("Parsed cells: %s", res); return res
     else: _LOGGER.warning("No valid cells."); return None
 
 # --- Main Parsing Function ---
 def parse_mqtt_payload(ph: str) -> Optional[Dict[str, Any]]:
-    _LOGGER.debug(f"Parsing: {ph[:100]}...")
+    _LOGGER.debug("Parsing: %s...", ph[:100])
     parsed_data: Dict[str, Any] = {}
     db: Optional[bytes] = None
     is_cell_data = False
@@ -138,23 +170,26 @@ def parse_mqtt_payload(ph: str) -> Optional[Dict[str, Any]]:
     try:
         crc_ok, _ = verify_crc(resp_hex)
         bc = int(resp_hex[4:6],16); dh = resp_hex[6:-4]; db = bytes.fromhex(dh)
-        if len(db)!=bc: _LOGGER.warning(f"Len mismatch:{len(db)} vs {bc}.")
+        if len(db)!=bc: _LOGGER.warning("Len mismatch:%d vs %d.", len(db), bc)
         if len(db)==0 and bc>0: _LOGGER.error("No data."); return None
-        _LOGGER.debug(f"Parsing {len(db)} bytes...")
+        _LOGGER.debug("Parsing %d bytes...", len(db))
 
         expected_cell_bytes = REG_ADDR_CELL_COUNT * 2
         expected_main_bytes = 95 * 2
+        expected_power_bytes = POWER_GROUP_COUNT * 2
 
-        if bc==expected_cell_bytes and len(db)==expected_cell_bytes: is_cell=True; _LOGGER.info("Cell data.")
-        elif bc==expected_main_bytes and len(db)==expected_main_bytes: is_cell=False; _LOGGER.info("Main data (95 regs).")
-        else: _LOGGER.error(f"Unrec len ({len(db)}/{bc}) for 95/50 regs."); return None
+        base = 0 # Register address of db[0]
+        if bc==expected_cell_bytes and len(db)==expected_cell_bytes: is_cell=True; _LOGGER.debug("Cell data.")
+        elif bc==expected_main_bytes and len(db)==expected_main_bytes: is_cell=False; _LOGGER.debug("Main data (95 regs).")
+        elif bc==expected_power_bytes and len(db)==expected_power_bytes: is_cell=False; base=POWER_GROUP_START; _LOGGER.debug("Power data (%d regs).", POWER_GROUP_COUNT)
+        else: _LOGGER.error("Unrec len (%d/%d) for 95/64/50 regs.", len(db), bc); return None
 
         if is_cell:
             cell_res = _parse_battery_cells(db)
             if cell_res: parsed_data[KEY_BATTERY_CELL_INFO] = cell_res
         else:
             addr = REG_ADDR
-            def rr(k, s, f=1.0, bc=2): r=addr.get(k); return _read_register(db,r,s,f,bc) if r is not None else None
+            def rr(k, s, f=1.0, bc=2): r=addr.get(k); return _read_register(db,r-base,s,f,bc) if r is not None and r>=base else None
 
             bat_volt = rr("BATTERY_VOLTAGE",False,0.01);
             if bat_volt is not None: parsed_data[KEY_BATTERY_VOLTAGE] = bat_volt
@@ -197,16 +232,17 @@ def parse_mqtt_payload(ph: str) -> Optional[Dict[str, Any]]:
             if pd_soc is not None: parsed_data[KEY_BATTERY_SOC]=pd_soc
             ups=rr("UPS_MODE",False); pd_ups=(ups==0) if ups is not None else None
             if pd_ups is not None: parsed_data[KEY_IS_UPS_MODE]=pd_ups
-            bt=rr("BATTERY_TYPE",False); pd_bt=MAP_BATTERY_TYPE.get(int(bt),"Present") if bt is not None else None
-            if pd_bt is not None: parsed_data[KEY_BATTERY_TYPE]=pd_bt
-            pd_ms=rr("MASTER_SLAVE_STATUS",False)
-            if pd_ms is not None: parsed_data[KEY_MASTER_SLAVE_STATUS]=pd_ms
-            pd_sn=_read_string(db, addr["DEVICE_MODEL_START"], 5)
-            if pd_sn is not None: parsed_data[KEY_MQTT_DEVICE_SN]=pd_sn
+            if base == 0: # Static identity/config fields: only the (hourly) full block decodes them
+                bt=rr("BATTERY_TYPE",False); pd_bt=MAP_BATTERY_TYPE.get(int(bt),"Present") if bt is not None else None
+                if pd_bt is not None: parsed_data[KEY_BATTERY_TYPE]=pd_bt
+                pd_ms=rr("MASTER_SLAVE_STATUS",False)
+                if pd_ms is not None: parsed_data[KEY_MASTER_SLAVE_STATUS]=pd_ms
+                pd_sn=_read_string(db, addr["DEVICE_MODEL_START"], 5)
+                if pd_sn is not None: parsed_data[KEY_MQTT_DEVICE_SN]=pd_sn
 
-            _LOGGER.debug(f"Parsed main data final: {parsed_data}")
+            _LOGGER.debug("Parsed main data final: %s", parsed_data)
 
     except Exception as e: _LOGGER.exception(f"Parse error: {e}"); return None
 
-    if parsed_data: data_type="Cells" if is_cell else "Main (Std)"; _LOGGER.info(f"++++ PARSE OK ({data_type}) ++++"); return parsed_data
-    else: _LOGGER.warning(f"No data parsed: {resp_hex[:60]}..."); return None
+    if parsed_data: data_type="Cells" if is_cell else "Main (Std)" if base == 0 else "Power"; _LOGGER.debug("++++ PARSE OK (%s) ++++", data_type); return parsed_data
+    else: _LOGGER.warning("No data parsed: %s...", resp_hex[:60]); return None
@@ -0,0 +1,135 @@
+# /config/custom_components/lumentree/polling.py
+# Multi-rate register group polling: one request per tick, each group on its own refresh and staleness rule
+
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+
+try:
+    from .const import (
+        _LOGGER, SIGNAL_UPDATE_FORMAT, DEFAULT_POLLING_INTERVAL, REGISTER_GROUPS, GROUP_RETRY_INTERVAL, GROUP_MAX_MISSES,
+        REG_GROUP_POWER, REG_GROUP_IDENTITY, REG_GROUP_CELLS,
+        KEY_BATTERY_VOLTAGE, KEY_LOAD_POWER, KEY_BATTERY_TYPE, KEY_MASTER_SLAVE_STATUS, KEY_MQTT_DEVICE_SN,
+        KEY_BATTERY_CELL_INFO
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    SIGNAL_UPDATE_FORMAT = "lumentree_mqtt_update_{device_sn}"; DEFAULT_POLLING_INTERVAL = 5; REGISTER_GROUPS = {}; GROUP_RETRY_INTERVAL = 30; GROUP_MAX_MISSES = 5
+    REG_GROUP_POWER = "power"; REG_GROUP_IDENTITY = "identity"; REG_GROUP_CELLS = "cells"
+    KEY_BATTERY_VOLTAGE = "battery_voltage"; KEY_LOAD_POWER = "load_power"; KEY_BATTERY_TYPE = "battery_type"
+    KEY_MASTER_SLAVE_STATUS = "master_slave_status"; KEY_MQTT_DEVICE_SN = "mqtt_device_sn"; KEY_BATTERY_CELL_INFO = "battery_cell_info"
+
+# Keys that identify which group a parsed frame came from; the stale-able groups' keys are also what gets cleared
+GROUP_KEYS: Dict[str, Tuple[str, ...]] = {
+    REG_GROUP_POWER: (KEY_BATTERY_VOLTAGE, KEY_LOAD_POWER),
+    REG_GROUP_IDENTITY: (KEY_BATTERY_TYPE, KEY_MASTER_SLAVE_STATUS, KEY_MQTT_DEVICE_SN),
+    REG_GROUP_CELLS: (KEY_BATTERY_CELL_INFO,),
+}
+
+
+class _GroupState:
+    __slots__ = ("requested", "received", "requests", "responses", "misses", "stale")
+
+    def __init__(self) -> None:
+        self.requested: Optional[float] = None # Monotonic
+        self.received: Optional[float] = None
+        self.requests = 0
+        self.responses = 0
+        self.misses = 0 # Consecutive requests left unanswered while the device answered others
+        self.stale = False
+
+
+class LumentreeGroupPoller:
+    """Decides which register group each poll tick requests.
+
+    A group is due `interval` after its last response (or GROUP_RETRY_INTERVAL after an unanswered request,
+    doubled per consecutive miss; a slow group that misses GROUP_MAX_MISSES requests in a row is dropped).
+    Only requests the device ignored while still answering the fastest group count as misses, so an offline
+    device or broker backs nothing off.
+    Due slow groups take the tick, but the fastest group never skips two ticks in a row, so live values keep
+    their cadence while identity and cells are fetched in between. The full identity block also counts as a
+    power refresh. A group with a stale-after time that goes unanswered that long has its keys cleared.
+    The cell group is only polled when asked for (poll_cells): some BMSes never answer it.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: Any, device_sn: str, poll_cells: bool = False) -> None:
+        self.hass = hass
+        self._client = client # LumentreeMqttClient / LumentreeLanClient
+        self._device_sn = device_sn
+        self._signal = SIGNAL_UPDATE_FORMAT.format(device_sn=device_sn)
+        self._groups: Dict[str, _GroupState] = {name: _GroupState() for name in REGISTER_GROUPS if poll_cells or name != REG_GROUP_CELLS}
+        self._fastest = min(self._groups, key=lambda name: REGISTER_GROUPS[name][2]) if self._groups else None
+        self._last_group: Optional[str] = None
+        self._remove_listener: Optional[Callable[[], None]] = None
+
+    def start(self) -> Callable[[], None]:
+        """Listen for parsed frames; returns the remover (for entry.async_on_unload)."""
+        self._remove_listener = async_dispatcher_connect(self.hass, self._signal, self._handle_update)
+        return self.stop
+
+    @callback
+    def stop(self) -> None:
+        if self._remove_listener is not None: self._remove_listener(); self._remove_listener = None
+
+    @callback
+    def _handle_update(self, data: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        for name, keys in GROUP_KEYS.items():
+            state = self._groups.get(name)
+            if state is not None and any(data.get(key) is not None for key in keys):
+                state.received = now; state.responses += 1; state.misses = 0; state.stale = False # The full block also matches power
+
+    def _due_at(self, name: str) -> float:
+        state = self._groups[name]; interval = REGISTER_GROUPS[name][2]
+        if state.requested is None: return 0.0
+        if state.received is not None and state.received >= state.requested: return state.received + interval
+        if name == self._fastest: return state.requested + min(interval, GROUP_RETRY_INTERVAL) # Live values: the online timer judges silence
+        if state.misses >= GROUP_MAX_MISSES: return float("inf")
+        return state.requested + min(interval, GROUP_RETRY_INTERVAL) * 2 ** state.misses
+
+    def _next_group(self, now: float) -> Optional[str]:
+        slack = DEFAULT_POLLING_INTERVAL / 2 # Tick timing jitter
+        due = {name: now - self._due_at(name) for name in self._groups if now + slack >= self._due_at(name)}
+        if not due: return None
+        if self._fastest in due and self._last_group != self._fastest: return self._fastest
+        slow = [name for name in due if name != self._fastest]
+        if not slow: return self._fastest
+        return max(slow, key=lambda name: due[name] / REGISTER_GROUPS[name][2]) # Most overdue relative to its rate
+
+    def _expire_stale(self, now: float) -> None:
+        for name, state in self._groups.items():
+            stale_after = REGISTER_GROUPS[name][3]
+            if stale_after is None or state.stale or state.received is None or now - state.received < stale_after: continue
+            state.stale = True
+            _LOGGER.warning(f"{name} registers of {self._device_sn} stale ({int(now - state.received)}s), clearing")
+            async_dispatcher_send(self.hass, self._signal, {key: None for key in GROUP_KEYS.get(name, ())})
+
+    async def async_tick(self) -> None:
+        """Send this tick's single request."""
+        now = time.monotonic()
+        self._expire_stale(now)
+        name = self._next_group(now)
+        if name is None: return
+        start, count, _, _ = REGISTER_GROUPS[name]
+        state = self._groups[name]
+        fastest = self._groups[self._fastest]
+        if state.requested is not None and (state.received is None or state.received < state.requested) and (
+                name == self._fastest or (fastest.received is not None and fastest.received > state.requested)):
+            state.misses += 1
+            if name != self._fastest and state.misses >= GROUP_MAX_MISSES:
+                _LOGGER.warning(f"{name} registers of {self._device_sn} unanswered {state.misses} times in a row, last request")
+        state.requested = now; state.requests += 1
+        self._last_group = name
+        _LOGGER.debug("Poll %s group %s (%s+%s)", self._device_sn, name, start, count)
+        await self._client.async_request_block(start, count)
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {name: {
+            "age_s": round(now - state.received, 1) if state.received is not None else None,
+            "requests": state.requests, "responses": state.responses, "misses": state.misses, "stale": state.stale,
+        } for name, state in self._groups.items()}
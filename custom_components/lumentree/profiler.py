@@ -0,0 +1,92 @@
+# /config/custom_components/lumentree/profiler.py
+# On-demand cProfile of the MQTT -> parser -> dispatcher -> entity pipeline (lumentree.profile service)
+
+import cProfile
+import io
+import math
+import pstats
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .const import _LOGGER
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+
+
+class LumentreeProfileSession:
+    """One cProfile instance wrapped around the integration's hot calls only (not the whole loop).
+
+    Only calls made on the event loop (dispatch fan-out and entity writes, plus parsing for the LAN transport)
+    run under cProfile, so no lock is ever taken on the loop: on Python 3.12+ cProfile is process-wide
+    (sys.monitoring) and can't be enabled from two threads at once. Calls from paho threads (MQTT parsing)
+    are timed instead, in per-thread lists that need no lock either. dump() runs after the session was
+    detached from PROFILER, when the loop no longer touches the profile.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty session owned by the calling (event loop) thread."""
+        self._profile = cProfile.Profile()
+        self._loop_thread = threading.get_ident()
+        self._depth = 0 # Nested runcall: the outer call already profiles it
+        self._thread_times: Dict[int, List[float]] = {} # Thread ident -> durations (s) of calls made off the loop
+        self.calls = 0
+        self.skipped = 0
+
+    def runcall(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call func(*args) under the profiler (event loop) or a timer (other threads)."""
+        if threading.get_ident() != self._loop_thread:
+            times = self._thread_times.setdefault(threading.get_ident(), [])
+            started = time.perf_counter()
+            try: return func(*args)
+            finally: times.append(time.perf_counter() - started)
+        if self._depth: return func(*args)
+        try:
+            self._profile.enable()
+        except ValueError:
+            # Another profiler is active (e.g. HA's profiler integration)
+            self.skipped += 1
+            return func(*args)
+        self._depth += 1
+        try:
+            self.calls += 1
+            return func(*args)
+        finally:
+            self._depth -= 1
+            self._profile.disable()
+
+    @property
+    def thread_calls(self) -> int:
+        return sum(len(times) for times in list(self._thread_times.values()))
+
+    def dump(self, profile_path: str, summary_path: str, top: int) -> bool:
+        """Write the .prof and a top-N summary (executor); returns False when no loop call was profiled (no .prof)."""
+        stream = io.StringIO()
+        times = sorted(duration for durations in list(self._thread_times.values()) for duration in list(durations))
+        if times:
+            stream.write(
+                f"MQTT thread parse calls: {len(times)}, total {math.fsum(times) * 1000:.1f} ms, "
+                f"mean {math.fsum(times) / len(times) * 1000:.3f} ms, p95 {times[int(len(times) * 0.95)] * 1000:.3f} ms, "
+                f"max {times[-1] * 1000:.3f} ms\n\n"
+            )
+        if not self.calls:
+            stream.write("No event loop calls were profiled.\n")
+        else:
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.dump_stats(profile_path)
+            stream.write(f"Profiled event loop calls: {self.calls} (skipped: {self.skipped})\n")
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats("lumentree", top)
+        with open(summary_path, "w", encoding="utf-8") as summary_file: summary_file.write(stream.getvalue())
+        return bool(self.calls)
+
+
+class LumentreeProfiler:
+    """Process-wide switch; hot paths check `session is not None`, so idle cost is one attribute read."""
+
+    def __init__(self) -> None:
+        self.session: Optional[LumentreeProfileSession] = None
+
+
+PROFILER = LumentreeProfiler()
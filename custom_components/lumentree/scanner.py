@@ -0,0 +1,178 @@
+# /config/custom_components/lumentree/scanner.py
+# Register-space scanner: throttled adaptive-span sweeps of an address range, saved as a per-register time series
+
+import asyncio
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        DOMAIN, _LOGGER, REG_ADDR, REG_ADDR_CELL_START, REG_ADDR_CELL_COUNT,
+        SCAN_MAX_SPAN, SCAN_MIN_INTERVAL, SCAN_TIMEOUT, SCAN_RECONNECT_WAIT, EVENT_SCAN_FINISHED
+    )
+    from .parser import generate_modbus_read_command
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    DOMAIN = "lumentree"; REG_ADDR = {}; REG_ADDR_CELL_START = 250; REG_ADDR_CELL_COUNT = 50
+    SCAN_MAX_SPAN = 32; SCAN_MIN_INTERVAL = 2.0; SCAN_TIMEOUT = 5; SCAN_RECONNECT_WAIT = 60; EVENT_SCAN_FINISHED = "lumentree_scan_finished"
+    def generate_modbus_read_command(sid: int, fc: int, addr: int, count: int) -> Optional[str]: return None
+
+SLAVE_ID = 1
+READ_FUNCTION = 3
+
+
+def _register_names() -> Dict[int, str]:
+    """Known register -> REG_ADDR name (the model string spans 5 registers, cells the 50-register block)."""
+    names = {address: name for name, address in REG_ADDR.items()}
+    for offset in range(1, 5): names.setdefault(REG_ADDR.get("DEVICE_MODEL_START", 3) + offset, f"DEVICE_MODEL_{offset}")
+    for cell in range(REG_ADDR_CELL_COUNT): names[REG_ADDR_CELL_START + cell] = f"CELL_{cell + 1}"
+    return names
+
+
+def register_statistics(series: List[Optional[int]]) -> Dict[str, Any]:
+    """Change statistics for one register's samples (None = not read in that sweep)."""
+    present = [value for value in series if value is not None]
+    if not present: return {"samples": 0}
+    changes = sum(1 for previous, value in zip(present, present[1:]) if value != previous)
+    return {
+        "samples": len(present), "min": min(present), "max": max(present), "mean": round(sum(present) / len(present), 2),
+        "distinct": len(set(present)), "changes": changes, "first": present[0], "last": present[-1],
+    }
+
+
+class LumentreeRegisterScanner:
+    """Sweeps [start, end) of one device with the largest spans it accepts.
+
+    A span that is rejected (Modbus exception) or times out is halved down to a single register, which is
+    then recorded as unreadable; after each success the span doubles again up to SCAN_MAX_SPAN. The first
+    sweep's successful spans become the read plan for the following sweeps (failures there only leave gaps).
+    Reads are sequential and spaced by SCAN_MIN_INTERVAL, so at most one scan frame is ever in front of the
+    regular polls.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: Any, device_sn: str, start: int, end: int) -> None:
+        self.hass = hass
+        self._client = client # LumentreeMqttClient / LumentreeLanClient
+        self._device_sn = device_sn
+        self._start, self._end = start, end
+        self._last_read = 0.0
+        self._plan: List[Tuple[int, int]] = []
+        self._times: List[str] = []
+        self._series: Dict[int, List[Optional[int]]] = {}
+        self.stats: Dict[str, int] = {"reads": 0, "rejected": 0, "timeouts": 0}
+
+    async def _async_read_span(self, start: int, count: int) -> Tuple[Optional[List[int]], str]:
+        """(values, "ok") or (None, "rejected" | "timeout"); raises ConnectionError if the link stays down."""
+        wait = self._last_read + SCAN_MIN_INTERVAL - time.monotonic()
+        if wait > 0: await asyncio.sleep(wait)
+        deadline = time.monotonic() + SCAN_RECONNECT_WAIT
+        while not self._client.is_connected: # A lost response can reset the link (LAN); don't mistake that for a hole
+            if time.monotonic() > deadline: raise ConnectionError(f"not connected for {SCAN_RECONNECT_WAIT}s")
+            await asyncio.sleep(1)
+        self._last_read = time.monotonic(); self.stats["reads"] += 1
+        command_hex = generate_modbus_read_command(SLAVE_ID, READ_FUNCTION, start, count)
+        if not command_hex: return None, "rejected"
+        frame = await self._client.async_probe_frame( # Unanswered probes must not reset the LAN link under the polls
+            lambda f: f[1] == READ_FUNCTION | 0x80 or (f[1] == READ_FUNCTION and f[2] == count * 2), command_hex, SCAN_TIMEOUT
+        )
+        if frame is None:
+            self.stats["timeouts"] += 1; return None, "timeout"
+        if frame[1] & 0x80:
+            self.stats["rejected"] += 1; return None, "rejected"
+        return [int.from_bytes(frame[3 + 2 * i:5 + 2 * i], "big") for i in range(count)], "ok"
+
+    async def _async_cover(self, start: int, end: int, span: int, values: Dict[int, int], plan: List[Tuple[int, int]]) -> None:
+        """Read [start, end), halving the span on failure and doubling it back after each success."""
+        address = start
+        while address < end:
+            count = min(span, end - address)
+            regs, status = await self._async_read_span(address, count)
+            if regs is not None:
+                values.update(zip(range(address, address + count), regs)); plan.append((address, count))
+                address += count; span = min(SCAN_MAX_SPAN, span * 2)
+            elif count > 1:
+                span = count // 2
+            else:
+                _LOGGER.debug("Scan %s: register %s %s", self._device_sn, address, status)
+                address += 1
+
+    async def async_sweep(self) -> int:
+        """One pass over the range (the learned plan after the first); returns the number of registers read."""
+        values: Dict[int, int] = {}; plan: List[Tuple[int, int]] = []
+        if not self._times:
+            await self._async_cover(self._start, self._end, SCAN_MAX_SPAN, values, plan)
+            self._plan = plan
+        else:
+            for start, count in self._plan: await self._async_cover(start, start + count, count, values, plan)
+        sweep = len(self._times); self._times.append(dt_util.utcnow().isoformat())
+        for address, value in values.items():
+            self._series.setdefault(address, [None] * sweep).append(value)
+        for series in self._series.values():
+            if len(series) <= sweep: series.append(None)
+        return len(values)
+
+    def report(self) -> Dict[str, Any]:
+        names = _register_names()
+        read: Set[int] = set(self._series)
+        return {
+            "device_sn": self._device_sn, "range": [self._start, self._end], "times": self._times,
+            "plan": self._plan, "stats": self.stats,
+            "unreadable": [address for address in range(self._start, self._end) if address not in read],
+            "registers": {
+                str(address): {"name": names.get(address), "values": series, **register_statistics(series)}
+                for address, series in sorted(self._series.items())
+            },
+        }
+
+
+def _write_report(path: str, report: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as report_file: json.dump(report, report_file, separators=(",", ":"))
+
+
+def scan_report_path(hass: HomeAssistant, device_sn: str) -> str:
+    return hass.config.path(f"{DOMAIN}_scan_{device_sn}_{dt_util.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+
+async def async_scan_registers(
+    hass: HomeAssistant, client: Any, device_sn: str, start: int, end: int, samples: int, interval: float, path: str
+) -> Dict[str, Any]:
+    """Run `samples` sweeps `interval` seconds apart, rewriting the JSON report at `path` after each; returns a summary."""
+    scanner = LumentreeRegisterScanner(hass, client, device_sn, start, end)
+    _LOGGER.info(f"Scanning registers {start}..{end - 1} of {device_sn}: {samples} sweep(s), every {interval}s")
+    aborted: Optional[str] = None
+    for sweep in range(samples):
+        if sweep: await asyncio.sleep(interval)
+        started = time.monotonic()
+        try:
+            count = await scanner.async_sweep()
+        except ConnectionError as e:
+            aborted = str(e); _LOGGER.warning(f"Scan {device_sn} aborted in sweep {sweep + 1}: {e}")
+            break
+        await hass.async_add_executor_job(_write_report, path, scanner.report())
+        _LOGGER.info(f"Scan {device_sn} sweep {sweep + 1}/{samples}: {count} registers in {time.monotonic() - started:.1f}s")
+    report = scanner.report()
+    if aborted: await hass.async_add_executor_job(_write_report, path, {**report, "aborted": aborted})
+    registers = report["registers"]
+    return {
+        "path": path, "aborted": aborted, "read": len(registers), "unreadable": len(report["unreadable"]), **scanner.stats,
+        "changing_unknown": [int(address) for address, info in registers.items() if info["name"] is None and info.get("changes")],
+        "constant_unknown": [int(address) for address, info in registers.items() if info["name"] is None and not info.get("changes") and info.get("max")],
+    }
+
+
+def async_notify_scan_result(hass: HomeAssistant, device_sn: str, summary: Dict[str, Any]) -> None:
+    """Announce a finished scan: EVENT_SCAN_FINISHED on the bus (for automations) and a persistent notification."""
+    hass.bus.async_fire(EVENT_SCAN_FINISHED, {"device_sn": device_sn, **summary})
+    outcome = f"aborted ({summary['aborted']})" if summary.get("aborted") else "finished"
+    persistent_notification.async_create(
+        hass,
+        f"Register scan of {device_sn} {outcome}: {summary['read']} registers read, {summary['unreadable']} unreadable, "
+        f"{len(summary['changing_unknown'])} undocumented registers changing.\n\nReport: {summary['path']}",
+        title="Lumentree register scan", notification_id=f"{DOMAIN}_scan_{device_sn}",
+    )
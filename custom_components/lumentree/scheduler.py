@@ -0,0 +1,169 @@
+# /config/custom_components/lumentree/scheduler.py
+# Per-host HTTP scheduler: token-bucket rate limit, concurrency cap, in-flight coalescing and circuit breaker
+
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+from homeassistant.core import HomeAssistant
+
+try:
+    from .const import (
+        DOMAIN, DATA_SCHEDULERS, _LOGGER, SCHEDULER_RATE, SCHEDULER_BURST, SCHEDULER_MAX_CONCURRENT,
+        CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT,
+        CIRCUIT_STATE_CLOSED, CIRCUIT_STATE_OPEN, CIRCUIT_STATE_HALF_OPEN
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    DOMAIN = "lumentree"; DATA_SCHEDULERS = "schedulers"
+    SCHEDULER_RATE = 2.0; SCHEDULER_BURST = 6; SCHEDULER_MAX_CONCURRENT = 4
+    CIRCUIT_FAILURE_THRESHOLD = 5; CIRCUIT_RESET_TIMEOUT = 120
+    CIRCUIT_STATE_CLOSED = "closed"; CIRCUIT_STATE_OPEN = "open"; CIRCUIT_STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the host's circuit is open."""
+
+
+class LumentreeRequestScheduler:
+    """Gate for every request to one host, shared by all API clients (see get_host_scheduler)."""
+
+    def __init__(self, host: str, failure_types: Tuple[Type[BaseException], ...]) -> None:
+        """Initialize the scheduler; only failure_types count towards opening the circuit."""
+        self.host = host
+        self._failure_types = failure_types
+        self._semaphore = asyncio.Semaphore(SCHEDULER_MAX_CONCURRENT)
+        self._bucket_lock = asyncio.Lock()
+        self._tokens = float(SCHEDULER_BURST)
+        self._refilled = time.monotonic()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._state = CIRCUIT_STATE_CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._half_open_timer: Optional[asyncio.TimerHandle] = None
+        self._probe_in_flight = False
+        self._listeners: List[Callable[[], None]] = []
+        self._stats: Dict[str, int] = {"requests": 0, "coalesced": 0, "throttled": 0, "rejected": 0, "failures": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        """Circuit state: closed, open or half_open."""
+        if self._state == CIRCUIT_STATE_OPEN and self._opened_at is not None and time.monotonic() - self._opened_at >= CIRCUIT_RESET_TIMEOUT:
+            return CIRCUIT_STATE_HALF_OPEN
+        return self._state
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        """Counters and circuit details for diagnostic entities."""
+        return {
+            "host": self.host, "state": self.state, "consecutive_failures": self._failures,
+            "open_for_s": round(time.monotonic() - self._opened_at, 1) if self._opened_at is not None else None,
+            "in_flight": len(self._in_flight), **self._stats,
+        }
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener (in the event loop) on every circuit state change; returns a remover."""
+        self._listeners.append(listener)
+        def _remove() -> None:
+            if listener in self._listeners: self._listeners.remove(listener)
+        return _remove
+
+    def _set_state(self, state: str) -> None:
+        if state == self._state: return
+        if state == CIRCUIT_STATE_CLOSED: _LOGGER.info(f"HTTP circuit for {self.host} closed again.")
+        else: _LOGGER.warning(f"HTTP circuit for {self.host}: {self._state} -> {state}")
+        self._state = state
+        if self._half_open_timer is not None: self._half_open_timer.cancel(); self._half_open_timer = None
+        if state == CIRCUIT_STATE_OPEN:
+            self._opened_at = time.monotonic(); self._stats["opened"] += 1
+            # Half-open is only computed lazily in `state`: tell listeners when it is reached, not at the next request
+            self._half_open_timer = asyncio.get_running_loop().call_later(CIRCUIT_RESET_TIMEOUT, self._half_open_reached)
+        elif state == CIRCUIT_STATE_CLOSED: self._opened_at = None
+        self._notify_listeners()
+
+    def _half_open_reached(self) -> None:
+        self._half_open_timer = None
+        _LOGGER.info(f"HTTP circuit for {self.host} half open, next request probes the host.")
+        self._notify_listeners()
+
+    def _notify_listeners(self) -> None:
+        for listener in list(self._listeners):
+            try: listener()
+            except Exception: _LOGGER.exception("Circuit listener failed")
+
+    def _admit(self) -> bool:
+        """Whether a request may be sent now; in half-open only one probe is let through."""
+        state = self.state
+        if state == CIRCUIT_STATE_CLOSED: return True
+        if state == CIRCUIT_STATE_HALF_OPEN and not self._probe_in_flight:
+            self._set_state(CIRCUIT_STATE_HALF_OPEN); self._probe_in_flight = True
+            return True
+        return False
+
+    async def _acquire_token(self) -> None:
+        """Token bucket: wait (FIFO) until a request slot is available."""
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(float(SCHEDULER_BURST), self._tokens + (now - self._refilled) * SCHEDULER_RATE)
+                self._refilled = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self._stats["throttled"] += 1
+                await asyncio.sleep((1 - self._tokens) / SCHEDULER_RATE)
+
+    async def _execute(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if not self._admit():
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(f"Circuit open for {self.host}")
+        probe = self._state == CIRCUIT_STATE_HALF_OPEN
+        try:
+            async with self._semaphore:
+                await self._acquire_token()
+                self._stats["requests"] += 1
+                result = await factory()
+        except asyncio.CancelledError:
+            raise # Says nothing about the host: leave failures and the circuit as they were (finally frees the probe slot)
+        except self._failure_types:
+            self._stats["failures"] += 1; self._failures += 1
+            if probe or self._failures >= CIRCUIT_FAILURE_THRESHOLD: self._set_state(CIRCUIT_STATE_OPEN)
+            raise
+        except BaseException:
+            # Application-level errors (auth, API return codes) mean the host is reachable
+            self._failures = 0
+            if probe: self._set_state(CIRCUIT_STATE_CLOSED)
+            raise
+        finally:
+            if probe: self._probe_in_flight = False
+        self._failures = 0
+        if probe: self._set_state(CIRCUIT_STATE_CLOSED)
+        return result
+
+    async def async_call(self, key: Optional[Hashable], factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() under the scheduler; callers with the same non-None key share one in-flight request.
+
+        The shared request runs as its own task, so a caller that is cancelled only stops waiting for it.
+        """
+        if key is None:
+            return await self._execute(factory)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            task = asyncio.get_running_loop().create_task(self._execute(factory))
+            self._in_flight[key] = task
+            def _done(done: asyncio.Task) -> None:
+                if self._in_flight.get(key) is done: del self._in_flight[key]
+                if not done.cancelled(): done.exception() # Mark retrieved when every waiter has gone
+            task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+
+def get_host_scheduler(hass: HomeAssistant, host: str, failure_types: Tuple[Type[BaseException], ...]) -> LumentreeRequestScheduler:
+    """Scheduler shared by every entry for host (hass.data[DOMAIN][DATA_SCHEDULERS]), created on first use."""
+    schedulers: Dict[str, LumentreeRequestScheduler] = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SCHEDULERS, {})
+    scheduler = schedulers.get(host)
+    if scheduler is None: scheduler = schedulers[host] = LumentreeRequestScheduler(host, failure_types)
+    return scheduler
@@ -4,6 +4,7 @@
 from typing import Any, Dict, Optional, Callable, cast
 import logging
 import re
+import time
 
 from homeassistant.components.sensor import (
     SensorEntity, SensorEntityDescription, SensorDeviceClass, SensorStateClass
@@ -11,7 +12,7 @@ from homeassistant.components.sensor import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     UnitOfPower, UnitOfEnergy, PERCENTAGE, UnitOfTemperature, UnitOfElectricPotential,
-    UnitOfFrequency, UnitOfElectricCurrent, UnitOfApparentPower, EntityCategory,
+    UnitOfFrequency, UnitOfElectricCurrent, UnitOfApparentPower, UnitOfTime, EntityCategory,
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
@@ -26,7 +27,7 @@ from homeassistant.util import slugify
 try:
     from .const import (
         DOMAIN, _LOGGER, CONF_DEVICE_SN, CONF_DEVICE_NAME,
-        SIGNAL_UPDATE_FORMAT, # Removed initial signal
+        SIGNAL_UPDATE_FORMAT, SIGNAL_ENERGY_UPDATE_FORMAT, # Removed initial signal
         KEY_PV_POWER, KEY_BATTERY_POWER, KEY_BATTERY_SOC, KEY_GRID_POWER,
         KEY_LOAD_POWER, KEY_BATTERY_VOLTAGE, KEY_BATTERY_CURRENT, KEY_AC_OUT_VOLTAGE,
         KEY_GRID_VOLTAGE, KEY_AC_OUT_FREQ, KEY_AC_OUT_POWER, KEY_AC_OUT_VA,
@@ -37,16 +38,33 @@ try:
         KEY_BATTERY_CELL_INFO,
         KEY_DAILY_PV_KWH, KEY_DAILY_CHARGE_KWH, KEY_DAILY_DISCHARGE_KWH,
         KEY_DAILY_GRID_IN_KWH, KEY_DAILY_LOAD_KWH,
-        KEY_LAST_RAW_MQTT
+        KEY_LAST_RAW_MQTT,
+        KEY_LIVE_PV_KWH, KEY_LIVE_CHARGE_KWH, KEY_LIVE_DISCHARGE_KWH,
+        KEY_LIVE_GRID_IN_KWH, KEY_LIVE_LOAD_KWH, KEY_HTTP_CIRCUIT, KEY_MQTT_RECOVERY,
+        CIRCUIT_STATE_CLOSED, CIRCUIT_STATE_OPEN, CIRCUIT_STATE_HALF_OPEN, METRICS_STAGES,
+        SIGNAL_SYSTEM_UPDATE_FORMAT, KEY_SYSTEM_MEMBERS_ONLINE
     )
     from .coordinator_stats import LumentreeStatsCoordinator
+    from .integrator import LumentreeEnergyIntegrator
+    from .scheduler import LumentreeRequestScheduler
+    from .metrics import LumentreePipelineMetrics
+    from .system import LumentreeSystemAggregator
 except ImportError:
     DOMAIN = "lumentree"; _LOGGER = logging.getLogger(__name__)
     CONF_DEVICE_SN = "device_sn"; CONF_DEVICE_NAME = "device_name"; SIGNAL_UPDATE_FORMAT = "lumentree_mqtt_update_{device_sn}"
     KEY_PV_POWER="pv_power"; KEY_BATTERY_POWER="battery_power"; KEY_BATTERY_SOC="battery_soc"; KEY_GRID_POWER="grid_power"; KEY_LOAD_POWER="load_power"; KEY_BATTERY_VOLTAGE="battery_voltage"; KEY_BATTERY_CURRENT="battery_current"; KEY_AC_OUT_VOLTAGE="ac_output_voltage"; KEY_GRID_VOLTAGE="grid_voltage"; KEY_AC_OUT_FREQ="ac_output_frequency"; KEY_AC_OUT_POWER="ac_output_power"; KEY_AC_OUT_VA="ac_output_va"; KEY_DEVICE_TEMP="device_temperature"; KEY_PV1_VOLTAGE="pv1_voltage"; KEY_PV1_POWER="pv1_power"; KEY_PV2_VOLTAGE="pv2_voltage"; KEY_PV2_POWER="pv2_power"; KEY_LAST_RAW_MQTT="last_raw_mqtt_hex"
     KEY_BATTERY_STATUS="battery_status"; KEY_GRID_STATUS="grid_status"; KEY_AC_IN_VOLTAGE="ac_input_voltage"; KEY_AC_IN_FREQ="ac_input_frequency"; KEY_AC_IN_POWER="ac_input_power"; KEY_BATTERY_TYPE="battery_type"; KEY_MASTER_SLAVE_STATUS="master_slave_status"; KEY_MQTT_DEVICE_SN="mqtt_device_sn"; KEY_BATTERY_CELL_INFO="battery_cell_info"
     KEY_DAILY_PV_KWH="pv_today"; KEY_DAILY_CHARGE_KWH="charge_today"; KEY_DAILY_DISCHARGE_KWH="discharge_today"; KEY_DAILY_GRID_IN_KWH="grid_in_today"; KEY_DAILY_LOAD_KWH="load_today"
+    SIGNAL_ENERGY_UPDATE_FORMAT = "lumentree_energy_update_{device_sn}"
+    KEY_LIVE_PV_KWH="pv_today_live"; KEY_LIVE_CHARGE_KWH="charge_today_live"; KEY_LIVE_DISCHARGE_KWH="discharge_today_live"; KEY_LIVE_GRID_IN_KWH="grid_in_today_live"; KEY_LIVE_LOAD_KWH="load_today_live"
     class LumentreeStatsCoordinator: pass
+    KEY_HTTP_CIRCUIT="http_circuit"; KEY_MQTT_RECOVERY="mqtt_recovery_time"; CIRCUIT_STATE_CLOSED="closed"; CIRCUIT_STATE_OPEN="open"; CIRCUIT_STATE_HALF_OPEN="half_open"
+    class LumentreeEnergyIntegrator: pass
+    METRICS_STAGES = ("publish", "round_trip", "receive", "decode", "dispatch", "state_write")
+    class LumentreeRequestScheduler: pass
+    class LumentreePipelineMetrics: pass
+    SIGNAL_SYSTEM_UPDATE_FORMAT = "lumentree_system_update_{group}"; KEY_SYSTEM_MEMBERS_ONLINE = "members_online"
+    class LumentreeSystemAggregator: pass
     def slugify(text): return re.sub(r"[^a-z0-9_]+", "_", text.lower())
 
 
@@ -79,6 +97,7 @@ REALTIME_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(key=KEY_MQTT_DEVICE_SN, name="Device SN (MQTT)", icon="mdi:barcode-scan", entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False),
     SensorEntityDescription(key=KEY_BATTERY_CELL_INFO, name="Battery Cell Info", icon="mdi:battery-heart-variant", entity_category=EntityCategory.DIAGNOSTIC),
     SensorEntityDescription(key=KEY_LAST_RAW_MQTT, name="Last Raw MQTT Hex", icon="mdi:text-hexadecimal", entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False),
+    SensorEntityDescription(key=KEY_MQTT_RECOVERY, name="MQTT Recovery Time", native_unit_of_measurement=UnitOfTime.SECONDS, device_class=SensorDeviceClass.DURATION, state_class=SensorStateClass.MEASUREMENT, icon="mdi:timer-refresh-outline", entity_category=EntityCategory.DIAGNOSTIC, suggested_display_precision=1),
 )
 
 # --- Sensor Descriptions (HTTP Daily Stats) ---
@@ -90,6 +109,46 @@ STATS_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(key=KEY_DAILY_LOAD_KWH, name="Load Consumption Today", native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL_INCREASING, icon="mdi:home-lightning-bolt", suggested_display_precision=1),
 )
 
+# --- Sensor Descriptions (Live Energy - integrated from MQTT power, anchored to HTTP stats) ---
+LIVE_ENERGY_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(key=KEY_LIVE_PV_KWH, name="PV Generation Today (Live)", native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL, icon="mdi:solar-power", suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_LIVE_CHARGE_KWH, name="Battery Charge Today (Live)", native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL, icon="mdi:battery-plus-variant", suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_LIVE_DISCHARGE_KWH, name="Battery Discharge Today (Live)", native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL, icon="mdi:battery-minus-variant", suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_LIVE_GRID_IN_KWH, name="Grid Input Today (Live)", native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL, icon="mdi:transmission-tower-import", suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_LIVE_LOAD_KWH, name="Load Consumption Today (Live)", native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL, icon="mdi:home-lightning-bolt", suggested_display_precision=2),
+)
+
+# --- Sensor Description (HTTP scheduler circuit breaker, shared by all entries on the host) ---
+CIRCUIT_SENSOR_DESCRIPTION = SensorEntityDescription(
+    key=KEY_HTTP_CIRCUIT, name="Cloud API Circuit", icon="mdi:electric-switch", device_class=SensorDeviceClass.ENUM,
+    options=[CIRCUIT_STATE_CLOSED, CIRCUIT_STATE_OPEN, CIRCUIT_STATE_HALF_OPEN], entity_category=EntityCategory.DIAGNOSTIC,
+)
+
+# --- Sensor Descriptions (Parallel system totals - virtual device, created by one member entry) ---
+SYSTEM_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(key=KEY_PV_POWER, name="Total PV Power", native_unit_of_measurement=UnitOfPower.WATT, device_class=SensorDeviceClass.POWER, state_class=SensorStateClass.MEASUREMENT, icon="mdi:solar-power"),
+    SensorEntityDescription(key=KEY_LOAD_POWER, name="Total Load Power", native_unit_of_measurement=UnitOfPower.WATT, device_class=SensorDeviceClass.POWER, state_class=SensorStateClass.MEASUREMENT, icon="mdi:home-lightning-bolt"),
+    SensorEntityDescription(key=KEY_GRID_POWER, name="Total Grid Power", native_unit_of_measurement=UnitOfPower.WATT, device_class=SensorDeviceClass.POWER, state_class=SensorStateClass.MEASUREMENT, icon="mdi:transmission-tower"),
+    SensorEntityDescription(key=KEY_BATTERY_POWER, name="Total Battery Power", native_unit_of_measurement=UnitOfPower.WATT, device_class=SensorDeviceClass.POWER, state_class=SensorStateClass.MEASUREMENT, icon="mdi:battery-charging"), # + discharging, - charging
+    SensorEntityDescription(key=KEY_BATTERY_SOC, name="Battery SOC", native_unit_of_measurement=PERCENTAGE, device_class=SensorDeviceClass.BATTERY, state_class=SensorStateClass.MEASUREMENT, suggested_display_precision=0),
+    SensorEntityDescription(key=KEY_SYSTEM_MEMBERS_ONLINE, name="Inverters Online", icon="mdi:server-network", state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC),
+)
+
+# --- Sensor Descriptions (Pipeline metrics - only when enabled in options) ---
+METRICS_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(key="metrics_frames_per_second", name="MQTT Frames per Second", icon="mdi:speedometer", state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, suggested_display_precision=2),
+    SensorEntityDescription(key="metrics_parse_failures", name="MQTT Parse Failures", icon="mdi:alert-circle-outline", state_class=SensorStateClass.TOTAL_INCREASING, entity_category=EntityCategory.DIAGNOSTIC),
+    SensorEntityDescription(key="metrics_reconnects", name="MQTT Reconnects", icon="mdi:connection", state_class=SensorStateClass.TOTAL_INCREASING, entity_category=EntityCategory.DIAGNOSTIC),
+) + tuple(
+    SensorEntityDescription(key=f"metrics_{stage}_p95", name=f"Pipeline {stage.replace('_', ' ').title()} p95", icon="mdi:timer-outline", native_unit_of_measurement=UnitOfTime.MILLISECONDS, device_class=SensorDeviceClass.DURATION, state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, suggested_display_precision=2)
+    for stage in METRICS_STAGES
+)
+
+def _write_state(entity: SensorEntity, metrics: Optional[LumentreePipelineMetrics]) -> None:
+    """async_write_ha_state, timed as the state_write stage when metrics are enabled."""
+    if metrics is None: entity.async_write_ha_state(); return
+    started = time.monotonic(); entity.async_write_ha_state(); metrics.record("state_write", time.monotonic() - started)
+
 # --- async_setup_entry ---
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
@@ -101,7 +160,12 @@ async def async_setup_entry(
         device_sn = entry.data[CONF_DEVICE_SN]
         device_name = entry.data[CONF_DEVICE_NAME]
         device_api_info = entry_data.get('device_api_info', {})
-        # Không cần initial_data nữa
+        cache = entry_data.get("cache")
+        initial_data: Dict[str, Any] = dict(cache.values) if cache is not None else {} # Last-known values from warm-start cache
+        integrator: Optional[LumentreeEnergyIntegrator] = entry_data.get("integrator")
+        scheduler: Optional[LumentreeRequestScheduler] = getattr(entry_data.get("api_client"), "scheduler", None)
+        metrics: Optional[LumentreePipelineMetrics] = entry_data.get("metrics")
+        system: Optional[LumentreeSystemAggregator] = entry_data.get("system")
     except KeyError as e: _LOGGER.error(f"Missing key {e} in entry data."); return
 
     device_info = DeviceInfo(
@@ -115,19 +179,32 @@ async def async_setup_entry(
     entities_to_add: list[SensorEntity] = []
     for description in REALTIME_SENSOR_DESCRIPTIONS:
         if description.key == KEY_BATTERY_CELL_INFO:
-            # <<< Truyền dict rỗng cho initial_data >>>
-            entities_to_add.append(LumentreeBatteryCellSensor(hass, entry, device_info, description, {}))
+            entities_to_add.append(LumentreeBatteryCellSensor(hass, entry, device_info, description, initial_data))
         else:
-            # <<< Truyền dict rỗng cho initial_data >>>
-            entities_to_add.append(LumentreeMqttSensor(hass, entry, device_info, description, {}))
+            entities_to_add.append(LumentreeMqttSensor(hass, entry, device_info, description, initial_data))
     _LOGGER.info(f"Adding {len(REALTIME_SENSOR_DESCRIPTIONS)} real-time sensors for {device_sn}")
     if coordinator_stats:
         added_stats_keys = set()
         for description in STATS_SENSOR_DESCRIPTIONS: entities_to_add.append(LumentreeDailyStatsSensor(coordinator_stats, device_info, description)); added_stats_keys.add(description.key)
         _LOGGER.info(f"Adding {len(added_stats_keys)} daily stats sensors for {device_sn}")
     else: _LOGGER.warning(f"Stats Coordinator not available for {device_sn}.")
+    if integrator:
+        for description in LIVE_ENERGY_SENSOR_DESCRIPTIONS: entities_to_add.append(LumentreeLiveEnergySensor(hass, entry, device_info, description, integrator))
+        _LOGGER.info(f"Adding {len(LIVE_ENERGY_SENSOR_DESCRIPTIONS)} live energy sensors for {device_sn}")
+    if scheduler is not None and hasattr(scheduler, "add_listener"):
+        entities_to_add.append(LumentreeCircuitSensor(hass, entry, device_info, CIRCUIT_SENSOR_DESCRIPTION, scheduler))
+    if metrics is not None:
+        for description in METRICS_SENSOR_DESCRIPTIONS: entities_to_add.append(LumentreeMetricsSensor(hass, entry, device_info, description, metrics))
+        _LOGGER.info(f"Adding {len(METRICS_SENSOR_DESCRIPTIONS)} pipeline metrics sensors for {device_sn}")
     if entities_to_add: async_add_entities(entities_to_add)
     else: _LOGGER.warning(f"No sensors added for {device_sn}.")
+    if system is not None:
+        @callback
+        def _add_system_sensors() -> None:
+            system_device_info = DeviceInfo(identifiers={(DOMAIN, f"system_{system.slug}")}, name=f"Lumentree System {system.name}", manufacturer="YS Tech (YiShen)", model="Parallel system")
+            async_add_entities([LumentreeSystemSensor(hass, system_device_info, description, system) for description in SYSTEM_SENSOR_DESCRIPTIONS])
+            _LOGGER.info(f"Adding {len(SYSTEM_SENSOR_DESCRIPTIONS)} system sensors for '{system.name}' (via {device_sn})")
+        entry.async_on_unload(system.attach_entities(entry.entry_id, _add_system_sensors))
 
 
 # --- Class LumentreeMqttSensor ---
@@ -138,7 +215,9 @@ class LumentreeMqttSensor(SensorEntity):
         self._attr_unique_id = f"{self._device_sn}_{description.key}"; object_id = f"device_{self._device_sn}_{slugify(description.key)}"; self._attr_object_id = object_id
         self.entity_id = generate_entity_id("sensor.{}", self._attr_object_id, hass=hass)
         self._attr_device_info = device_info; self._remove_dispatcher: Optional[Callable[[], None]] = None
+        self._metrics: Optional[LumentreePipelineMetrics] = hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("metrics")
         self._attr_native_value = self._process_value(initial_data.get(description.key)) # Vẫn thử lấy giá trị ban đầu (dù thường là None)
+        self._attr_available = self._attr_native_value is not None # Unavailable until first data arrives
         _LOGGER.debug(f"Init MQTT sensor: uid={self.unique_id}, name={self.name}, initial_state={self._attr_native_value}")
 
     def _process_value(self, value: Any) -> Any: # Giữ nguyên
@@ -162,7 +241,7 @@ class LumentreeMqttSensor(SensorEntity):
         if key == KEY_BATTERY_CELL_INFO: return
         if key in data:
             new_value = self._process_value(data[key])
-            if self._attr_native_value != new_value: self._attr_native_value = new_value; self.async_write_ha_state(); _LOGGER.debug(f"Update MQTT sensor {self.entity_id}: {new_value}")
+            if self._attr_native_value != new_value or not self._attr_available: self._attr_native_value = new_value; self._attr_available = True; _write_state(self, self._metrics); _LOGGER.debug("Update MQTT sensor %s: %s", self.entity_id, new_value)
 
     async def async_added_to_hass(self) -> None: # Chỉ đăng ký listener thường
         signal = SIGNAL_UPDATE_FORMAT.format(device_sn=self._device_sn); self._remove_dispatcher = async_dispatcher_connect(self.hass, signal, self._handle_update); _LOGGER.debug(f"MQTT sensor {self.unique_id} registered.")
@@ -180,9 +259,11 @@ class LumentreeBatteryCellSensor(SensorEntity):
         self._attr_unique_id = f"{self._device_sn}_{description.key}"; object_id = f"device_{self._device_sn}_{slugify(description.key)}"; self._attr_object_id = object_id
         self.entity_id = generate_entity_id("sensor.{}", self._attr_object_id, hass=hass)
         self._attr_device_info = device_info; self._attr_extra_state_attributes: Dict[str, Any] = {}; self._remove_dispatcher: Optional[Callable[[], None]] = None
+        self._metrics: Optional[LumentreePipelineMetrics] = hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("metrics")
         initial_cell_info = initial_data.get(KEY_BATTERY_CELL_INFO)
         if isinstance(initial_cell_info, dict): self._attr_native_value = initial_cell_info.get("number_of_cells"); self._attr_extra_state_attributes = initial_cell_info
         else: self._attr_native_value = None
+        self._attr_available = isinstance(initial_cell_info, dict) # Unavailable until first cell data arrives
         _LOGGER.debug(f"Init Cell sensor: uid={self.unique_id}, name={self.name}, initial_state={self._attr_native_value}")
 
     @callback
@@ -192,11 +273,14 @@ class LumentreeBatteryCellSensor(SensorEntity):
             if isinstance(cell_info_dict, dict):
                 new_state = cell_info_dict.get("number_of_cells")
                 new_attrs = cell_info_dict
-                if self._attr_native_value != new_state or self._attr_extra_state_attributes != new_attrs:
+                if self._attr_native_value != new_state or self._attr_extra_state_attributes != new_attrs or not self._attr_available:
                     self._attr_native_value = new_state
                     self._attr_extra_state_attributes = new_attrs
-                    self.async_write_ha_state()
-                    _LOGGER.info(f"Update Cell sensor {self.entity_id}: State={new_state}")
+                    self._attr_available = True
+                    _write_state(self, self._metrics)
+                    _LOGGER.debug("Update Cell sensor %s: State=%s", self.entity_id, new_state)
+            elif cell_info_dict is None: # Cells group went stale
+                if self._attr_available: self._attr_available = False; _write_state(self, self._metrics)
             else:
                  _LOGGER.warning(f"Invalid cell info type {self.unique_id}: {type(cell_info_dict)}")
 
@@ -223,5 +307,92 @@ class LumentreeDailyStatsSensor(CoordinatorEntity[LumentreeStatsCoordinator], Se
     def _update_state_from_coordinator(self) -> None: key = self.entity_description.key; value = self.coordinator.data.get(key) if self.coordinator.data else None; self._attr_native_value = round(value, 2) if isinstance(value, (int, float)) else None
     @property
 
-    def available(self) -> bool: return self.coordinator.last_update_success
+    def available(self) -> bool: return self.coordinator.last_update_success and self.coordinator.data is not None
+
+
+# --- Class LumentreeLiveEnergySensor ---
+class LumentreeLiveEnergySensor(SensorEntity):
+    _attr_should_poll = False; _attr_has_entity_name = True
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_info: DeviceInfo, description: SensorEntityDescription, integrator: LumentreeEnergyIntegrator) -> None:
+        self.hass = hass; self.entity_description = description; self._device_sn = entry.data[CONF_DEVICE_SN]; self._integrator = integrator
+        self._attr_unique_id = f"{self._device_sn}_{description.key}"; object_id = f"device_{self._device_sn}_{slugify(description.key)}"; self._attr_object_id = object_id
+        self.entity_id = generate_entity_id("sensor.{}", self._attr_object_id, hass=hass)
+        self._attr_device_info = device_info; self._remove_dispatcher: Optional[Callable[[], None]] = None
+        self._attr_native_value = round(integrator.totals.get(description.key, 0.0), 3)
+        self._attr_last_reset = integrator.last_reset
+        _LOGGER.debug(f"Init Live energy sensor: uid={self.unique_id}, name={self.name}, initial_state={self._attr_native_value}")
+
+    @callback
+    def _handle_update(self, totals: Dict[str, float]) -> None:
+        value = totals.get(self.entity_description.key)
+        if value is None: return
+        new_value = round(value, 3); last_reset = self._integrator.last_reset
+        if self._attr_native_value != new_value or self._attr_last_reset != last_reset:
+            self._attr_native_value = new_value; self._attr_last_reset = last_reset; self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        signal = SIGNAL_ENERGY_UPDATE_FORMAT.format(device_sn=self._device_sn); self._remove_dispatcher = async_dispatcher_connect(self.hass, signal, self._handle_update); _LOGGER.debug(f"Live energy sensor {self.unique_id} registered.")
+
+    async def async_will_remove_from_hass(self) -> None:
+        if self._remove_dispatcher: self._remove_dispatcher(); self._remove_dispatcher = None
+        _LOGGER.debug(f"Live energy sensor {self.unique_id} unregistered.")
+
+
+# --- Class LumentreeSystemSensor ---
+class LumentreeSystemSensor(SensorEntity):
+    _attr_should_poll = False; _attr_has_entity_name = True
+    def __init__(self, hass: HomeAssistant, device_info: DeviceInfo, description: SensorEntityDescription, system: LumentreeSystemAggregator) -> None:
+        self.hass = hass; self.entity_description = description; self._system = system
+        self._attr_unique_id = f"system_{system.slug}_{description.key}"; self._attr_object_id = f"lumentree_system_{system.slug}_{slugify(description.key)}"
+        self.entity_id = generate_entity_id("sensor.{}", self._attr_object_id, hass=hass)
+        self._attr_device_info = device_info
+        self._attr_native_value = system.state.get(description.key)
+
+    @callback
+    def _handle_update(self, state: Dict[str, Any]) -> None:
+        value = state.get(self.entity_description.key)
+        if self._attr_native_value != value: self._attr_native_value = value; self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(async_dispatcher_connect(self.hass, SIGNAL_SYSTEM_UPDATE_FORMAT.format(group=self._system.slug), self._handle_update))
+        _LOGGER.debug(f"System sensor {self.unique_id} registered.")
+
+
+# --- Class LumentreeCircuitSensor ---
+class LumentreeCircuitSensor(SensorEntity):
+    _attr_should_poll = False; _attr_has_entity_name = True
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_info: DeviceInfo, description: SensorEntityDescription, scheduler: LumentreeRequestScheduler) -> None:
+        self.hass = hass; self.entity_description = description; self._device_sn = entry.data[CONF_DEVICE_SN]; self._scheduler = scheduler
+        self._attr_unique_id = f"{self._device_sn}_{description.key}"; object_id = f"device_{self._device_sn}_{slugify(description.key)}"; self._attr_object_id = object_id
+        self.entity_id = generate_entity_id("sensor.{}", self._attr_object_id, hass=hass)
+        self._attr_device_info = device_info
+
+    @property
+    def native_value(self) -> str: return self._scheduler.state
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]: return self._scheduler.diagnostics
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._scheduler.add_listener(self.async_write_ha_state)); _LOGGER.debug(f"Circuit sensor {self.unique_id} registered.")
+
+
+# --- Class LumentreeMetricsSensor ---
+class LumentreeMetricsSensor(SensorEntity):
+    _attr_should_poll = True; _attr_has_entity_name = True # Polled (SCAN_INTERVAL) so metrics don't add writes to the pipeline they measure
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, device_info: DeviceInfo, description: SensorEntityDescription, metrics: LumentreePipelineMetrics) -> None:
+        self.hass = hass; self.entity_description = description; self._device_sn = entry.data[CONF_DEVICE_SN]; self._metrics = metrics
+        self._attr_unique_id = f"{self._device_sn}_{description.key}"; object_id = f"device_{self._device_sn}_{slugify(description.key)}"; self._attr_object_id = object_id
+        self.entity_id = generate_entity_id("sensor.{}", self._attr_object_id, hass=hass)
+        self._attr_device_info = device_info
+        self._stage = description.key[len("metrics_"):-len("_p95")] if description.key.endswith("_p95") else None
+        self._update_from_metrics()
+
+    def _update_from_metrics(self) -> None:
+        key = self.entity_description.key
+        if self._stage is not None:
+            summary = self._metrics.summary(self._stage); self._attr_native_value = summary["p95"]; self._attr_extra_state_attributes = summary
+        elif key == "metrics_frames_per_second": self._attr_native_value = self._metrics.frames_per_second
+        else: self._attr_native_value = self._metrics.counters.get(key[len("metrics_"):], 0)
 
+    async def async_update(self) -> None: self._update_from_metrics()
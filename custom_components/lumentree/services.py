@@ -0,0 +1,207 @@
+# /config/custom_components/lumentree/services.py
+# Integration services (registered once per HA instance in async_setup)
+
+import asyncio
+import datetime
+import logging
+from typing import Any, Dict, List, Tuple
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        DOMAIN, _LOGGER, CONF_DEVICE_SN,
+        SERVICE_BACKFILL_ENERGY, ATTR_CONFIG_ENTRY_ID, ATTR_START_DATE, ATTR_END_DATE,
+        ATTR_INCLUDE_INTRADAY, BACKFILL_MAX_DAYS,
+        SERVICE_PROFILE, ATTR_DURATION, ATTR_TOP, PROFILE_MAX_DURATION, PROFILE_DEFAULT_DURATION, PROFILE_DEFAULT_TOP,
+        SERVICE_WRITE_REGISTER, ATTR_REGISTER, ATTR_VALUE, ATTR_VALUES, WRITE_MAX_REGISTERS, WRITE_READ_ONLY_RANGES,
+        SERVICE_SCAN_REGISTERS, ATTR_START, ATTR_END, ATTR_SAMPLES, ATTR_INTERVAL,
+        SCAN_MAX_REGISTERS, SCAN_MAX_SAMPLES, SCAN_DEFAULT_SAMPLES, SCAN_DEFAULT_INTERVAL,
+        SERVICE_QUERY_TIMESERIES, ATTR_FIELDS, ATTR_BUCKETS,
+        TIMESERIES_DEFAULT_DURATION, TIMESERIES_DEFAULT_BUCKETS, TIMESERIES_MAX_BUCKETS
+    )
+    from .backfill import async_backfill_energy
+    from .profiler import PROFILER, LumentreeProfileSession
+    from .scanner import async_scan_registers, async_notify_scan_result, scan_report_path
+    from .timeseries import TIMESERIES_FIELDS
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    DOMAIN = "lumentree"; CONF_DEVICE_SN = "device_sn"
+    SERVICE_BACKFILL_ENERGY = "backfill_energy"; ATTR_CONFIG_ENTRY_ID = "config_entry_id"; ATTR_START_DATE = "start_date"; ATTR_END_DATE = "end_date"
+    ATTR_INCLUDE_INTRADAY = "include_intraday"; BACKFILL_MAX_DAYS = 1098
+    SERVICE_PROFILE = "profile"; ATTR_DURATION = "duration"; ATTR_TOP = "top"; PROFILE_MAX_DURATION = 600; PROFILE_DEFAULT_DURATION = 30; PROFILE_DEFAULT_TOP = 30
+    async def async_backfill_energy(hass, api_client, device_sn, start_date, end_date, include_intraday=False): return {}
+    PROFILER = None; LumentreeProfileSession = None
+    SERVICE_WRITE_REGISTER = "write_register"; ATTR_REGISTER = "register"; ATTR_VALUE = "value"; ATTR_VALUES = "values"; WRITE_MAX_REGISTERS = 16; WRITE_READ_ONLY_RANGES = ((0, 95), (250, 300))
+    SERVICE_SCAN_REGISTERS = "scan_registers"; ATTR_START = "start"; ATTR_END = "end"; ATTR_SAMPLES = "samples"; ATTR_INTERVAL = "interval"
+    SCAN_MAX_REGISTERS = 2000; SCAN_MAX_SAMPLES = 120; SCAN_DEFAULT_SAMPLES = 3; SCAN_DEFAULT_INTERVAL = 60
+    async def async_scan_registers(hass, client, device_sn, start, end, samples, interval, path): return {}
+    def async_notify_scan_result(hass, device_sn, summary): pass
+    def scan_report_path(hass, device_sn): return hass.config.path(f"{DOMAIN}_scan_{device_sn}.json")
+    SERVICE_QUERY_TIMESERIES = "query_timeseries"; ATTR_FIELDS = "fields"; ATTR_BUCKETS = "buckets"
+    TIMESERIES_DEFAULT_DURATION = 3600; TIMESERIES_DEFAULT_BUCKETS = 60; TIMESERIES_MAX_BUCKETS = 1440; TIMESERIES_FIELDS = ()
+
+BACKFILL_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_START_DATE): cv.date,
+    vol.Optional(ATTR_END_DATE): cv.date,
+    vol.Optional(ATTR_INCLUDE_INTRADAY, default=False): cv.boolean,
+})
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_DURATION, default=PROFILE_DEFAULT_DURATION): vol.All(vol.Coerce(int), vol.Clamp(min=1, max=PROFILE_MAX_DURATION)),
+    vol.Optional(ATTR_TOP, default=PROFILE_DEFAULT_TOP): vol.All(vol.Coerce(int), vol.Range(min=1, max=500)),
+})
+
+_REGISTER_VALUE = vol.All(vol.Coerce(int), vol.Range(min=0, max=0xFFFF))
+WRITE_REGISTER_SCHEMA = vol.All(vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_REGISTER): _REGISTER_VALUE,
+    vol.Exclusive(ATTR_VALUE, "value"): _REGISTER_VALUE,
+    vol.Exclusive(ATTR_VALUES, "value"): vol.All(cv.ensure_list, vol.Length(min=1, max=WRITE_MAX_REGISTERS * 4), [_REGISTER_VALUE]),
+}), cv.has_at_least_one_key(ATTR_VALUE, ATTR_VALUES))
+
+SCAN_REGISTERS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_START): _REGISTER_VALUE,
+    vol.Required(ATTR_END): vol.All(vol.Coerce(int), vol.Range(min=1, max=0x10000)),
+    vol.Optional(ATTR_SAMPLES, default=SCAN_DEFAULT_SAMPLES): vol.All(vol.Coerce(int), vol.Range(min=1, max=SCAN_MAX_SAMPLES)),
+    vol.Optional(ATTR_INTERVAL, default=SCAN_DEFAULT_INTERVAL): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+})
+
+QUERY_TIMESERIES_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_FIELDS): vol.All(cv.ensure_list, vol.Length(min=1), [vol.In(TIMESERIES_FIELDS)]),
+    vol.Optional(ATTR_DURATION, default=TIMESERIES_DEFAULT_DURATION): vol.All(vol.Coerce(int), vol.Range(min=60, max=86400)),
+    vol.Optional(ATTR_BUCKETS, default=TIMESERIES_DEFAULT_BUCKETS): vol.All(vol.Coerce(int), vol.Range(min=1, max=TIMESERIES_MAX_BUCKETS)),
+})
+
+
+def _loaded_entries(hass: HomeAssistant, entry_id: Any = None) -> List[Tuple[ConfigEntry, Dict[str, Any]]]:
+    """Return (entry, entry_data) for the requested loaded entry, or all loaded entries."""
+    domain_data = hass.data.get(DOMAIN, {})
+    entries = []
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry_id and entry.entry_id != entry_id:
+            continue
+        entry_data = domain_data.get(entry.entry_id)
+        if isinstance(entry_data, dict) and entry_data.get("api_client") is not None:
+            entries.append((entry, entry_data))
+    if not entries:
+        raise ServiceValidationError(f"No loaded {DOMAIN} config entry{f' {entry_id}' if entry_id else ''}")
+    return entries
+
+
+async def _async_handle_backfill(call: ServiceCall) -> ServiceResponse:
+    hass = call.hass
+    start_date: datetime.date = call.data[ATTR_START_DATE]
+    yesterday = dt_util.now().date() - datetime.timedelta(days=1)
+    end_date: datetime.date = min(call.data.get(ATTR_END_DATE, yesterday), yesterday)
+    if start_date > end_date:
+        raise ServiceValidationError("start_date must be before today and not after end_date")
+    if (end_date - start_date).days >= BACKFILL_MAX_DAYS:
+        raise ServiceValidationError(f"Backfill range is limited to {BACKFILL_MAX_DAYS} days")
+    if "recorder" not in hass.config.components:
+        raise HomeAssistantError("Energy backfill requires the recorder")
+
+    results = []
+    for entry, entry_data in _loaded_entries(hass, call.data.get(ATTR_CONFIG_ENTRY_ID)):
+        results.append(await async_backfill_energy(
+            hass, entry_data["api_client"], entry.data[CONF_DEVICE_SN], start_date, end_date, call.data[ATTR_INCLUDE_INTRADAY]
+        ))
+    return {"results": results}
+
+
+async def _async_handle_profile(call: ServiceCall) -> ServiceResponse:
+    hass = call.hass
+    if PROFILER is None: raise HomeAssistantError("Profiler unavailable")
+    if PROFILER.session is not None: raise HomeAssistantError("A Lumentree profiling session is already running")
+    duration: int = call.data[ATTR_DURATION]
+    session = LumentreeProfileSession(); PROFILER.session = session
+    _LOGGER.info(f"Profiling Lumentree pipeline for {duration}s")
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        PROFILER.session = None
+    stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+    profile_path = hass.config.path(f"{DOMAIN}_profile_{stamp}.prof"); summary_path = hass.config.path(f"{DOMAIN}_profile_{stamp}.txt")
+    if not await hass.async_add_executor_job(session.dump, profile_path, summary_path, call.data[ATTR_TOP]): profile_path = None
+    _LOGGER.info(f"Lumentree profile written: {profile_path} ({session.calls} loop calls, {session.thread_calls} thread calls), summary {summary_path}")
+    return {"profile": profile_path, "summary": summary_path, "calls": session.calls, "thread_calls": session.thread_calls, "duration": duration}
+
+
+async def _async_handle_write_register(call: ServiceCall) -> ServiceResponse:
+    hass = call.hass
+    entry, entry_data = _loaded_entries(hass, call.data[ATTR_CONFIG_ENTRY_ID])[0]
+    write_queue = entry_data.get("write_queue")
+    if write_queue is None: raise HomeAssistantError("Register writes unavailable")
+    start: int = call.data[ATTR_REGISTER]
+    values: List[int] = call.data[ATTR_VALUES] if ATTR_VALUES in call.data else [call.data[ATTR_VALUE]]
+    if start + len(values) > 0x10000: raise ServiceValidationError("Register range exceeds 65535")
+    read_only = [f"{low}-{high - 1}" for low, high in WRITE_READ_ONLY_RANGES if start < high and low < start + len(values)]
+    if read_only: raise ServiceValidationError(f"Registers {', '.join(read_only)} are read-only (identity, live values, cells)")
+    results = await write_queue.async_write({start + offset: value for offset, value in enumerate(values)})
+    failed = [result for result in results if not result.get("confirmed")]
+    if failed: _LOGGER.warning(f"Register write on {entry.data[CONF_DEVICE_SN]} not confirmed: {failed}")
+    return {"confirmed": not failed, "results": results}
+
+
+async def _async_handle_scan_registers(call: ServiceCall) -> ServiceResponse:
+    hass = call.hass
+    entry, entry_data = _loaded_entries(hass, call.data[ATTR_CONFIG_ENTRY_ID])[0]
+    start: int = call.data[ATTR_START]; end: int = call.data[ATTR_END]
+    if not start < end <= start + SCAN_MAX_REGISTERS:
+        raise ServiceValidationError(f"end must be after start and cover at most {SCAN_MAX_REGISTERS} registers")
+    client = entry_data.get("mqtt_client")
+    if client is None or not client.is_connected: raise HomeAssistantError("Inverter is not connected")
+    if entry_data.get("register_scan"): raise HomeAssistantError("A register scan is already running for this inverter")
+    device_sn = entry.data[CONF_DEVICE_SN]; path = scan_report_path(hass, device_sn)
+    samples: int = call.data[ATTR_SAMPLES]; interval: int = call.data[ATTR_INTERVAL]
+
+    async def _async_scan() -> None:
+        try:
+            summary = await async_scan_registers(hass, client, device_sn, start, end, samples, interval, path)
+        except Exception:
+            _LOGGER.exception(f"Register scan of {device_sn} failed"); return
+        finally:
+            entry_data["register_scan"] = False
+        async_notify_scan_result(hass, device_sn, summary)
+
+    # Up to SCAN_MAX_SAMPLES sweeps can take hours: run in the background (cancelled on unload), report when done
+    entry_data["register_scan"] = True
+    entry.async_create_background_task(hass, _async_scan(), f"{DOMAIN}_scan_{device_sn}")
+    return {"started": True, "path": path, "sweeps": samples}
+
+
+async def _async_handle_query_timeseries(call: ServiceCall) -> ServiceResponse:
+    hass = call.hass
+    entry, entry_data = _loaded_entries(hass, call.data[ATTR_CONFIG_ENTRY_ID])[0]
+    timeseries = entry_data.get("timeseries")
+    if timeseries is None: raise HomeAssistantError("Time series unavailable")
+    end = dt_util.utcnow().timestamp()
+    return timeseries.query(call.data.get(ATTR_FIELDS) or TIMESERIES_FIELDS, end - call.data[ATTR_DURATION], end, call.data[ATTR_BUCKETS])
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register integration services."""
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL_ENERGY, _async_handle_backfill, schema=BACKFILL_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_handle_profile, schema=PROFILE_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_WRITE_REGISTER, _async_handle_write_register, schema=WRITE_REGISTER_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SCAN_REGISTERS, _async_handle_scan_registers, schema=SCAN_REGISTERS_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_QUERY_TIMESERIES, _async_handle_query_timeseries, schema=QUERY_TIMESERIES_SCHEMA, supports_response=SupportsResponse.ONLY
+    )
@@ -0,0 +1,172 @@
+# /config/custom_components/lumentree/system.py
+# Parallel-system aggregator: running PV/load/grid/battery totals and capacity-weighted SOC across a group of entries
+
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.util import slugify
+
+try:
+    from .const import (
+        DOMAIN, DATA_SYSTEMS, _LOGGER, SIGNAL_UPDATE_FORMAT, SIGNAL_SYSTEM_UPDATE_FORMAT,
+        KEY_ONLINE_STATUS, KEY_PV_POWER, KEY_LOAD_POWER, KEY_GRID_POWER, KEY_BATTERY_POWER, KEY_BATTERY_STATUS,
+        KEY_BATTERY_SOC, KEY_SYSTEM_MEMBERS_ONLINE
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__); DOMAIN = "lumentree"; DATA_SYSTEMS = "systems"
+    SIGNAL_UPDATE_FORMAT = "lumentree_mqtt_update_{device_sn}"; SIGNAL_SYSTEM_UPDATE_FORMAT = "lumentree_system_update_{group}"
+    KEY_ONLINE_STATUS = "online_status"; KEY_PV_POWER = "pv_power"; KEY_LOAD_POWER = "load_power"
+    KEY_GRID_POWER = "grid_power"; KEY_BATTERY_POWER = "battery_power"; KEY_BATTERY_STATUS = "battery_status"; KEY_BATTERY_SOC = "battery_soc"
+    KEY_SYSTEM_MEMBERS_ONLINE = "members_online"
+
+POWER_KEYS = (KEY_PV_POWER, KEY_LOAD_POWER, KEY_GRID_POWER, KEY_BATTERY_POWER)
+
+
+class _Member:
+    __slots__ = ("weight", "values", "soc")
+
+    def __init__(self, weight: float) -> None:
+        self.weight = weight # Battery capacity (kWh) or 1.0
+        self.values: Dict[str, Optional[float]] = {key: None for key in POWER_KEYS}
+        self.soc: Optional[float] = None
+
+    @property
+    def contributing(self) -> bool:
+        return self.soc is not None or any(value is not None for value in self.values.values())
+
+
+class LumentreeSystemAggregator:
+    """Totals for one parallel stack, updated in O(1) from each member's changed values.
+
+    Every member keeps its last contribution; a change adds the difference to the running total, so no
+    update ever walks the whole group. Battery power is signed here (positive = discharging, from the
+    member's battery status) so charging and discharging inverters cancel out. An offline member's
+    contributions are withdrawn until it reports again.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str) -> None:
+        self.hass = hass
+        self.name = name
+        self.slug = slugify(name)
+        self.signal = SIGNAL_SYSTEM_UPDATE_FORMAT.format(group=self.slug)
+        self._members: Dict[str, _Member] = {}
+        self._totals: Dict[str, float] = {key: 0.0 for key in POWER_KEYS}
+        self._reporting: Dict[str, int] = {key: 0 for key in POWER_KEYS} # Members with a value per key
+        self._soc_sum = 0.0 # Sum of weight * SOC
+        self._soc_weight = 0.0
+        self._online = 0
+        self._adders: Dict[str, Callable[[], None]] = {} # entry_id -> adds the system sensors on that entry's platform
+        self._owner: Optional[str] = None
+
+    def add_member(self, device_sn: str, weight: float) -> Callable[[], None]:
+        """Join the group; returns the remover (for entry.async_on_unload)."""
+        self._members[device_sn] = _Member(weight if weight and weight > 0 else 1.0)
+        @callback
+        def _handle_member_update(data: Dict[str, Any]) -> None:
+            self._handle_update(device_sn, data)
+        remove_listener = async_dispatcher_connect(self.hass, SIGNAL_UPDATE_FORMAT.format(device_sn=device_sn), _handle_member_update)
+        _LOGGER.info(f"{device_sn} joined parallel system '{self.name}' ({len(self._members)} members)")
+        @callback
+        def _remove() -> None:
+            remove_listener()
+            member = self._members.pop(device_sn, None)
+            if member is not None: self._withdraw(member); self._publish()
+            if not self._members and not self._adders: self._unregister()
+        return _remove
+
+    def attach_entities(self, entry_id: str, add_entities: Callable[[], None]) -> Callable[[], None]:
+        """Offer a member's sensor platform for the group entities; returns the remover (for entry.async_on_unload).
+
+        The first member to get here creates them. When that entry unloads (or never got this far, e.g. a
+        failed setup), the lowest remaining entry takes over, so the group always has exactly one owner.
+        """
+        self._adders[entry_id] = add_entities
+        if self._owner is None: self._set_owner(entry_id)
+        @callback
+        def _detach() -> None:
+            self._adders.pop(entry_id, None)
+            if self._owner == entry_id:
+                self._owner = None
+                if self._adders: self._set_owner(min(self._adders))
+            if not self._members and not self._adders: self._unregister()
+        return _detach
+
+    def _unregister(self) -> None:
+        """Leave the registry once the last member and platform are gone (it may already be cleared on the last unload)."""
+        systems = self.hass.data.get(DOMAIN, {}).get(DATA_SYSTEMS)
+        if systems is not None and systems.get(self.slug) is self: del systems[self.slug]
+
+    def _set_owner(self, entry_id: str) -> None:
+        self._owner = entry_id
+        _LOGGER.info(f"System sensors for '{self.name}' provided by entry {entry_id}")
+        self._adders[entry_id]()
+
+    def _set_power(self, member: _Member, key: str, value: Optional[float]) -> bool:
+        old = member.values[key]
+        if old == value: return False
+        self._totals[key] += (value or 0.0) - (old or 0.0)
+        self._reporting[key] += (value is not None) - (old is not None)
+        member.values[key] = value
+        return True
+
+    def _set_soc(self, member: _Member, soc: Optional[float]) -> bool:
+        old = member.soc
+        if old == soc: return False
+        self._soc_sum += member.weight * ((soc or 0.0) - (old or 0.0))
+        self._soc_weight += member.weight * ((soc is not None) - (old is not None))
+        member.soc = soc
+        return True
+
+    def _withdraw(self, member: _Member) -> None:
+        was_contributing = member.contributing
+        for key in POWER_KEYS: self._set_power(member, key, None)
+        self._set_soc(member, None)
+        if was_contributing: self._online -= 1
+
+    @callback
+    def _handle_update(self, device_sn: str, data: Dict[str, Any]) -> None:
+        member = self._members.get(device_sn)
+        if member is None: return
+        if data.get(KEY_ONLINE_STATUS) is False:
+            if member.contributing: self._withdraw(member); self._publish()
+            return
+        was_contributing, changed = member.contributing, False
+        for key in POWER_KEYS:
+            if key not in data: continue
+            value = data[key]
+            if key == KEY_BATTERY_POWER and value is not None and data.get(KEY_BATTERY_STATUS) == "Charging": value = -value
+            changed |= self._set_power(member, key, value)
+        if KEY_BATTERY_SOC in data: changed |= self._set_soc(member, data[KEY_BATTERY_SOC])
+        if member.contributing != was_contributing: self._online += 1 if member.contributing else -1
+        if changed: self._publish()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        state: Dict[str, Any] = {
+            key: round(self._totals[key], 1) if self._reporting[key] else None for key in POWER_KEYS
+        }
+        state[KEY_BATTERY_SOC] = round(self._soc_sum / self._soc_weight, 1) if self._soc_weight > 0 else None
+        state[KEY_SYSTEM_MEMBERS_ONLINE] = self._online
+        return state
+
+    def _publish(self) -> None:
+        async_dispatcher_send(self.hass, self.signal, self.state)
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {"name": self.name, "owner": self._owner, "members": {sn: {"weight": m.weight, "soc": m.soc, **m.values} for sn, m in self._members.items()}, **self.state}
+
+
+def get_system(hass: HomeAssistant, name: str) -> LumentreeSystemAggregator:
+    """Shared aggregator for the group (hass.data[DOMAIN][DATA_SYSTEMS]), created on first use.
+
+    Keyed by slug: names that slugify alike are one group, so the virtual device and its unique_ids never collide.
+    """
+    systems: Dict[str, LumentreeSystemAggregator] = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SYSTEMS, {})
+    slug = slugify(name)
+    system = systems.get(slug)
+    if system is None: system = systems[slug] = LumentreeSystemAggregator(hass, name)
+    elif system.name != name: _LOGGER.warning(f"System group '{name}' is the same group as '{system.name}' (both '{slug}')")
+    return system
@@ -0,0 +1,132 @@
+# /config/custom_components/lumentree/timeseries.py
+# In-memory time series: fixed-size ring of float32 columns per device, downsampled to min/max/mean buckets on query
+
+import math
+import time
+import logging
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util import dt as dt_util
+
+try:
+    from .const import (
+        _LOGGER, SIGNAL_UPDATE_FORMAT, TIMESERIES_CAPACITY, TIMESERIES_MIN_SPACING,
+        KEY_PV_POWER, KEY_PV1_POWER, KEY_PV2_POWER, KEY_LOAD_POWER, KEY_GRID_POWER, KEY_BATTERY_POWER, KEY_BATTERY_STATUS,
+        KEY_BATTERY_SOC, KEY_BATTERY_VOLTAGE, KEY_BATTERY_CURRENT, KEY_GRID_VOLTAGE, KEY_AC_OUT_POWER, KEY_DEVICE_TEMP
+    )
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    SIGNAL_UPDATE_FORMAT = "lumentree_mqtt_update_{device_sn}"; TIMESERIES_CAPACITY = 17280; TIMESERIES_MIN_SPACING = 4.0
+    KEY_PV_POWER = "pv_power"; KEY_PV1_POWER = "pv1_power"; KEY_PV2_POWER = "pv2_power"; KEY_LOAD_POWER = "load_power"
+    KEY_GRID_POWER = "grid_power"; KEY_BATTERY_POWER = "battery_power"; KEY_BATTERY_STATUS = "battery_status"
+    KEY_BATTERY_SOC = "battery_soc"; KEY_BATTERY_VOLTAGE = "battery_voltage"; KEY_BATTERY_CURRENT = "battery_current"
+    KEY_GRID_VOLTAGE = "grid_voltage"; KEY_AC_OUT_POWER = "ac_output_power"; KEY_DEVICE_TEMP = "device_temperature"
+
+# Recorded fields, one float32 column each
+TIMESERIES_FIELDS = (
+    KEY_PV_POWER, KEY_PV1_POWER, KEY_PV2_POWER, KEY_LOAD_POWER, KEY_GRID_POWER, KEY_BATTERY_POWER,
+    KEY_BATTERY_SOC, KEY_BATTERY_VOLTAGE, KEY_BATTERY_CURRENT, KEY_GRID_VOLTAGE, KEY_AC_OUT_POWER, KEY_DEVICE_TEMP,
+)
+
+_NAN = float("nan")
+
+
+class LumentreeTimeSeries:
+    """Last ~24 h of the live values of one device, without the recorder.
+
+    Each field is a preallocated `array('f')` (timestamps `array('d')`) used as a ring, so memory is fixed
+    at about 50 bytes per slot (~0.9 MB at the default capacity) and appending is O(1). Samples are taken
+    from the parsed-frame signal; fields missing from a frame are NaN, and frames closer than
+    TIMESERIES_MIN_SPACING to the previous sample are skipped so extra polling by other clients does not
+    shorten the span. Battery power is signed (positive = discharging).
+    """
+
+    def __init__(self, hass: HomeAssistant, device_sn: str, capacity: int = TIMESERIES_CAPACITY) -> None:
+        self.hass = hass
+        self._device_sn = device_sn
+        self._capacity = capacity
+        self._times = array("d", [0.0]) * capacity # Epoch seconds
+        self._columns: Dict[str, array] = {field: array("f", [_NAN]) * capacity for field in TIMESERIES_FIELDS}
+        self._head = 0 # Next slot to write
+        self._count = 0
+        self._remove_listener: Optional[Callable[[], None]] = None
+
+    def start(self) -> Callable[[], None]:
+        """Listen for parsed frames; returns the remover (for entry.async_on_unload)."""
+        self._remove_listener = async_dispatcher_connect(self.hass, SIGNAL_UPDATE_FORMAT.format(device_sn=self._device_sn), self._handle_update)
+        return self.stop
+
+    @callback
+    def stop(self) -> None:
+        if self._remove_listener is not None: self._remove_listener(); self._remove_listener = None
+
+    @callback
+    def _handle_update(self, data: Dict[str, Any]) -> None:
+        if not any(data.get(field) is not None for field in TIMESERIES_FIELDS): return # Identity/cell/status-only updates
+        self.append(time.time(), data)
+
+    def append(self, timestamp: float, data: Dict[str, Any]) -> bool:
+        """Store one sample; False if it was too close to the previous one."""
+        if self._count and timestamp - self._times[(self._head - 1) % self._capacity] < TIMESERIES_MIN_SPACING: return False
+        slot = self._head
+        self._times[slot] = timestamp
+        for field, column in self._columns.items():
+            value = data.get(field)
+            if value is not None and field == KEY_BATTERY_POWER and data.get(KEY_BATTERY_STATUS) == "Charging": value = -value
+            column[slot] = _NAN if value is None else value
+        self._head = (slot + 1) % self._capacity
+        if self._count < self._capacity: self._count += 1
+        return True
+
+    def _bisect(self, timestamp: float) -> int:
+        """Logical index (0 = oldest) of the first sample at or after `timestamp`."""
+        first = (self._head - self._count) % self._capacity
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[(first + mid) % self._capacity] < timestamp: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def _values(self, column: array, lo: int, hi: int) -> List[float]:
+        """Non-NaN values of logical samples [lo, hi), sliced in at most two contiguous pieces."""
+        if hi <= lo: return []
+        first = (self._head - self._count) % self._capacity
+        start, end = (first + lo) % self._capacity, (first + hi) % self._capacity
+        chunk = column[start:end] if start < end else column[start:] + column[:end]
+        return [value for value in chunk if value == value]
+
+    def query(self, fields: Sequence[str], start: float, end: float, buckets: int) -> Dict[str, Any]:
+        """Downsample [start, end) into `buckets` equal windows: per-field min/max/mean (None for empty windows)."""
+        width = (end - start) / buckets
+        bounds = [self._bisect(start + width * bucket) for bucket in range(buckets)] + [self._bisect(end)]
+        result: Dict[str, Any] = {}
+        for field in fields:
+            column = self._columns[field]
+            mins: List[Optional[float]] = []; maxs: List[Optional[float]] = []; means: List[Optional[float]] = []
+            for bucket in range(buckets):
+                values = self._values(column, bounds[bucket], bounds[bucket + 1])
+                if not values:
+                    mins.append(None); maxs.append(None); means.append(None); continue
+                mins.append(round(min(values), 2)); maxs.append(round(max(values), 2)); means.append(round(math.fsum(values) / len(values), 2))
+            result[field] = {"min": mins, "max": maxs, "mean": means}
+        return {
+            "device_sn": self._device_sn,
+            "start": dt_util.utc_from_timestamp(start).isoformat(), "end": dt_util.utc_from_timestamp(end).isoformat(),
+            "bucket_seconds": round(width, 3),
+            "times": [dt_util.utc_from_timestamp(start + width * bucket).isoformat() for bucket in range(buckets)],
+            "samples": [bounds[bucket + 1] - bounds[bucket] for bucket in range(buckets)],
+            "fields": result,
+        }
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        oldest = self._times[(self._head - self._count) % self._capacity] if self._count else None
+        return {
+            "capacity": self._capacity, "samples": self._count,
+            "span_s": round(time.time() - oldest, 1) if oldest is not None else None,
+            "bytes": self._times.itemsize * self._capacity + sum(column.itemsize * self._capacity for column in self._columns.values()),
+        }
@@ -0,0 +1,136 @@
+# /config/custom_components/lumentree/write_queue.py
+# Per-device Modbus write queue: coalescing, function-16 batching, rate limiting and read-back confirmation
+
+import asyncio
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+try:
+    from .const import (
+        _LOGGER, WRITE_BATCH_WINDOW, WRITE_MIN_INTERVAL, WRITE_MAX_REGISTERS, WRITE_TIMEOUT, WRITE_RETRIES
+    )
+    from .parser import generate_modbus_write_command
+except ImportError:
+    _LOGGER = logging.getLogger(__name__)
+    WRITE_BATCH_WINDOW = 0.2; WRITE_MIN_INTERVAL = 1.0; WRITE_MAX_REGISTERS = 16; WRITE_TIMEOUT = 5; WRITE_RETRIES = 1
+    def generate_modbus_write_command(sid: int, addr: int, values: List[int]) -> Optional[str]: return None
+
+SLAVE_ID = 1
+
+
+def _contiguous_runs(values: Dict[int, int]) -> List[Tuple[int, List[int]]]:
+    """{register: value} -> [(start, [values...])], adjacent registers merged up to WRITE_MAX_REGISTERS."""
+    runs: List[Tuple[int, List[int]]] = []
+    for register in sorted(values):
+        if runs and runs[-1][0] + len(runs[-1][1]) == register and len(runs[-1][1]) < WRITE_MAX_REGISTERS:
+            runs[-1][1].append(values[register])
+        else:
+            runs.append((register, [values[register]]))
+    return runs
+
+
+class LumentreeWriteQueue:
+    """Serialises register writes for one device.
+
+    Writes arriving within WRITE_BATCH_WINDOW are merged: the latest value per register wins and adjacent
+    registers share one function-16 frame. Frames are spaced by WRITE_MIN_INTERVAL, and every run is
+    confirmed by reading it back. Callers await only their own registers' results.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: Any, device_sn: str) -> None:
+        self.hass = hass
+        self._client = client # LumentreeMqttClient / LumentreeLanClient
+        self._device_sn = device_sn
+        self._pending: Dict[int, int] = {}
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self._last_sent = 0.0
+        self._stats: Dict[str, int] = {"requested": 0, "coalesced": 0, "frames": 0, "confirmed": 0, "failed": 0}
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {"pending": len(self._pending), "running": self._worker is not None and not self._worker.done(), **self._stats}
+
+    async def async_write(self, values: Dict[int, int]) -> List[Dict[str, Any]]:
+        """Queue {register: value} and wait for each register's confirmation result."""
+        futures = []
+        for register, value in values.items():
+            if register in self._pending: self._stats["coalesced"] += 1
+            self._pending[register] = value; self._stats["requested"] += 1
+            future = self.hass.loop.create_future()
+            self._waiters.setdefault(register, []).append(future); futures.append(future)
+        if self._worker is None or self._worker.done():
+            self._worker = self.hass.async_create_background_task(self._async_run(), f"lumentree_write_queue_{self._device_sn}")
+        return list(await asyncio.gather(*futures))
+
+    async def _async_run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(WRITE_BATCH_WINDOW)
+            batch, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, {}
+            try:
+                await self._async_flush(batch, waiters)
+            finally:
+                for futures in waiters.values(): # Only left over when cancelled (unload)
+                    for future in futures:
+                        if not future.done(): future.set_result({"confirmed": False, "error": "unloaded"})
+
+    async def _async_flush(self, batch: Dict[int, int], waiters: Dict[int, List[asyncio.Future]]) -> None:
+        for start, run in _contiguous_runs(batch):
+            try:
+                result = await self._async_write_run(start, run)
+            except Exception as e: # Never leave callers waiting
+                _LOGGER.exception(f"Write {start}+{len(run)} failed for {self._device_sn}")
+                result = {"confirmed": False, "read_back": None, "error": str(e)}
+            self._stats["confirmed" if result["confirmed"] else "failed"] += len(run)
+            for offset, value in enumerate(run):
+                register = start + offset; read_back = result.get("read_back")
+                outcome = {
+                    "register": register, "value": value, "confirmed": result["confirmed"],
+                    "read_back": read_back[offset] if read_back else None, "function": 6 if len(run) == 1 else 16,
+                }
+                if "error" in result: outcome["error"] = result["error"]
+                for future in waiters.pop(register, []):
+                    if not future.done(): future.set_result(outcome)
+
+    async def _async_throttle(self) -> None:
+        wait = self._last_sent + WRITE_MIN_INTERVAL - time.monotonic()
+        if wait > 0: await asyncio.sleep(wait)
+        self._last_sent = time.monotonic()
+
+    async def _async_write_run(self, start: int, run: List[int]) -> Dict[str, Any]:
+        """Send one function 6/16 frame and read the span back; retried WRITE_RETRIES times if unconfirmed."""
+        command_hex = generate_modbus_write_command(SLAVE_ID, start, run)
+        if not command_hex: return {"confirmed": False, "read_back": None, "error": "invalid command"}
+        function_code = 6 if len(run) == 1 else 16
+        read_back: Optional[List[int]] = None
+        for attempt in range(WRITE_RETRIES + 1):
+            await self._async_throttle()
+            self._stats["frames"] += 1
+            echo = await self._client.async_wait_frame(
+                lambda f: f[1] == function_code | 0x80 or (f[1] == function_code and int.from_bytes(f[2:4], "big") == start), command_hex, WRITE_TIMEOUT
+            )
+            if echo is not None and echo[1] & 0x80:
+                return {"confirmed": False, "read_back": None, "error": f"modbus exception {echo[2]}"}
+            await self._async_throttle()
+            read_back = await self._client.async_read_registers(start, len(run), WRITE_TIMEOUT)
+            if read_back == run:
+                _LOGGER.info(f"Write confirmed {self._device_sn}: registers {start}..{start + len(run) - 1} = {run}")
+                return {"confirmed": True, "read_back": read_back}
+            _LOGGER.warning(f"Write not confirmed {self._device_sn} (attempt {attempt + 1}): {start} wrote {run}, read {read_back}")
+        return {"confirmed": False, "read_back": read_back}
+
+    async def async_stop(self) -> None:
+        """Cancel the worker and fail anything still queued."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try: await self._worker
+            except asyncio.CancelledError: pass
+        self._pending = {}
+        for futures in self._waiters.values():
+            for future in futures:
+                if not future.done(): future.set_result({"confirmed": False, "error": "unloaded"})
+        self._waiters = {}
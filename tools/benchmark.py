@@ -0,0 +1,155 @@
+# tools/benchmark.py
+# Scale benchmark: N LumentreeMqttClient instances polling simulated inverters on a local fake broker
+#
+#   python tools/benchmark.py --devices 1 10 50 100 250 500 --duration 60 --output results.json
+#
+# Each device gets what async_setup_entry gives it on the MQTT side (client, connect, polling timer) plus a
+# dispatcher listener that writes one state per parsed key, standing in for the sensor entities.
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from harness import LoopLagMonitor, async_make_hass, fake_entry
+from simulator import async_start_simulation
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_track_time_interval
+
+from custom_components.lumentree.const import DEFAULT_POLLING_INTERVAL, SIGNAL_UPDATE_FORMAT
+from custom_components.lumentree.mqtt import LumentreeMqttClient
+from custom_components.lumentree.polling import LumentreeGroupPoller
+
+CONNECT_BATCH = 25 # Concurrent connects; paho connect() runs in the executor
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of the process so far (ru_maxrss: KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def _rss_mb() -> Optional[float]:
+    """Current RSS from /proc, falling back to peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"): return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+async def async_run(devices: int, duration: float, interval: float, simulator_options: Dict[str, Any]) -> Dict[str, Any]:
+    """One benchmark run with a fresh hass and broker."""
+    threads_before, rss_before = threading.active_count(), _rss_mb()
+    broker, inverters, port = await async_start_simulation(devices, **simulator_options)
+    counts = {"dispatches": 0, "state_writes": 0}
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_make_hass(config_dir)
+        clients: List[LumentreeMqttClient] = []; unsubs: List[Any] = []
+        for inverter in inverters:
+            device_sn = inverter.device_sn
+            clients.append(LumentreeMqttClient(hass, fake_entry(device_sn), device_sn, device_sn, broker="127.0.0.1", port=port))
+            @callback # Like the sensor entities: runs on the loop, not in the executor
+            def _write_states(data: Dict[str, Any], device_sn: str = device_sn) -> None:
+                counts["dispatches"] += 1
+                for key, value in data.items():
+                    if isinstance(value, dict): continue # Cell details are attributes, not states
+                    hass.states.async_set(f"sensor.{device_sn.lower()}_{key}", value)
+                    counts["state_writes"] += 1
+            unsubs.append(async_dispatcher_connect(hass, SIGNAL_UPDATE_FORMAT.format(device_sn=device_sn), _write_states))
+
+        connect_started = time.monotonic(); failed = 0
+        for index in range(0, len(clients), CONNECT_BATCH):
+            results = await asyncio.gather(*(client.connect() for client in clients[index:index + CONNECT_BATCH]), return_exceptions=True)
+            failed += sum(isinstance(result, Exception) for result in results)
+        connect_seconds = time.monotonic() - connect_started
+
+        for client, inverter in zip(clients, inverters):
+            poller = LumentreeGroupPoller(hass, client, inverter.device_sn); unsubs.append(poller.start())
+            async def _async_poll(now=None, client: LumentreeMqttClient = client, poller: LumentreeGroupPoller = poller) -> None:
+                if client.is_connected: await poller.async_tick()
+            unsubs.append(async_track_time_interval(hass, _async_poll, datetime.timedelta(seconds=interval)))
+
+        threads_running, rss_running = threading.active_count(), _rss_mb()
+        monitor = LoopLagMonitor(); monitor.start()
+        cpu_started, started = time.process_time(), time.monotonic()
+        await asyncio.sleep(duration)
+        elapsed, cpu_seconds = time.monotonic() - started, time.process_time() - cpu_started
+        loop_lag = await monitor.stop()
+        frames = sum(client.diagnostics["counters"]["frames"] for client in clients)
+        polls = sum(client.diagnostics["counters"]["polls"] for client in clients)
+        rss_end, rss_peak = _rss_mb(), _peak_rss_mb()
+
+        for unsub in unsubs: unsub()
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+        await hass.async_stop(force=True)
+    await broker.stop()
+
+    return {
+        "devices": devices, "duration_s": round(elapsed, 2), "poll_interval_s": interval,
+        "connect_seconds": round(connect_seconds, 2), "connect_failures": failed,
+        "loop_lag_ms": loop_lag,
+        "polls_per_second": round(polls / elapsed, 2), "frames_per_second": round(frames / elapsed, 2),
+        "dispatches_per_second": round(counts["dispatches"] / elapsed, 2), "state_writes_per_second": round(counts["state_writes"] / elapsed, 2),
+        "cpu_percent": round(100 * cpu_seconds / elapsed, 1),
+        "rss_mb": {"before": rss_before, "running": rss_running, "end": rss_end, "peak": rss_peak},
+        "rss_mb_per_device": round((rss_end - rss_before) / devices, 3) if rss_end is not None and rss_before is not None else None,
+        "threads": {"before": threads_before, "running": threads_running},
+        "threads_per_device": round((threads_running - threads_before) / devices, 2),
+        "simulator": {key: sum(inverter.stats[key] for inverter in inverters) for key in inverters[0].stats},
+    }
+
+
+async def async_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    simulator_options = {"latency": args.latency, "jitter": args.jitter, "loss": args.loss, "corrupt": args.corrupt, "prefix": args.prefix}
+    runs = []
+    for devices in args.devices:
+        result = await async_run(devices, args.duration, args.interval, simulator_options)
+        runs.append(result)
+        lag = result["loop_lag_ms"]
+        print(f"{devices:>4} devices: lag p99 {lag['p99']} ms, {result['frames_per_second']} frames/s, "
+              f"{result['state_writes_per_second']} writes/s, {result['threads_per_device']} threads/device", file=sys.stderr, flush=True)
+        await asyncio.sleep(1) # Let disconnected sockets and threads wind down between runs
+    return {
+        "started": datetime.datetime.now(datetime.timezone.utc).isoformat(), "python": platform.python_version(),
+        "platform": platform.platform(), "cpu_count": os.cpu_count(), "options": {**simulator_options, "duration": args.duration, "interval": args.interval},
+        "runs": runs,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Lumentree MQTT pipeline against N simulated inverters")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 50, 100], help="Device counts to run, 1-500")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per run")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLLING_INTERVAL, help="Poll interval per device (s)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Simulated latency jitter (s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="Simulated response loss probability")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Simulated corruption probability")
+    parser.add_argument("--prefix", action="store_true", help="Simulate the <SN>2b2b2b2b response prefix")
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if any(not 1 <= devices <= 500 for devices in args.devices): parser.error("--devices values must be within 1-500")
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(async_benchmark(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output: json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
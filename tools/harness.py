@@ -0,0 +1,64 @@
+# tools/harness.py
+# Shared helpers for the offline tools: repo import path, a minimal HomeAssistant, config-entry stand-ins and loop-lag sampling
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path: sys.path.insert(0, str(REPO_ROOT))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.lumentree.const import CONF_DEVICE_ID, CONF_DEVICE_NAME, CONF_DEVICE_SN, DOMAIN  # noqa: E402
+
+
+async def async_make_hass(config_dir: str) -> HomeAssistant:
+    """Bare HomeAssistant on the running loop: enough for the dispatcher, timers and executor jobs."""
+    hass = HomeAssistant(config_dir)
+    hass.data.setdefault(DOMAIN, {})
+    return hass
+
+
+def fake_entry(device_sn: str, options: Optional[Dict[str, Any]] = None) -> Any:
+    """Config entry stand-in with the attributes LumentreeMqttClient and the entities read."""
+    return SimpleNamespace(
+        entry_id=f"tool_{device_sn}", title=device_sn, options=options or {},
+        data={CONF_DEVICE_SN: device_sn, CONF_DEVICE_ID: device_sn, CONF_DEVICE_NAME: device_sn},
+    )
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99/max of second-valued samples, in milliseconds."""
+    if not samples: return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+    def pick(fraction: float) -> float: return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 3)}
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag as the overshoot of a short periodic sleep."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.monotonic() - started - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> Dict[str, Optional[float]]:
+        if self._task is not None:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+        return percentiles(self.samples)
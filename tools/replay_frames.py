@@ -0,0 +1,87 @@
+# tools/replay_frames.py
+# Replay a recorded frame log through LumentreeMqttClient._on_message -> parser -> dispatcher, report throughput and loop lag
+#
+#   python tools/replay_frames.py config/lumentree_frames/frames_<SN>.bin.1 config/lumentree_frames/frames_<SN>.bin --speed 0
+
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from harness import LoopLagMonitor, async_make_hass, fake_entry
+
+from paho.mqtt.client import MQTTMessage
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.lumentree.const import SIGNAL_UPDATE_FORMAT, MQTT_SUB_TOPIC_FORMAT
+from custom_components.lumentree.frame_log import iter_frame_log
+from custom_components.lumentree.mqtt import LumentreeMqttClient
+
+MAX_GAP = 60.0 # Seconds; longer pauses (HA restarts between sessions, clock steps) are replayed as this
+
+
+def _load(paths: List[str]) -> List[Tuple[float, str, bytes]]:
+    frames: List[Tuple[float, str, bytes]] = []
+    for path in paths: frames.extend(iter_frame_log(path))
+    return frames
+
+
+def _feed(client: LumentreeMqttClient, frames: List[Tuple[float, str, bytes]], speed: float) -> float:
+    """Deliver frames from a worker thread, like paho's network thread; returns the feed duration."""
+    started = time.monotonic(); previous_ts = frames[0][0]; offset = 0.0
+    for ts, topic, payload in frames:
+        if speed > 0:
+            offset += min(max(ts - previous_ts, 0.0), MAX_GAP); previous_ts = ts
+            delay = started + offset / speed - time.monotonic()
+            if delay > 0: time.sleep(delay)
+        message = MQTTMessage(topic=topic.encode("utf-8")); message.payload = payload
+        client._on_message(None, None, message)
+    return time.monotonic() - started
+
+
+async def async_replay(paths: List[str], speed: float, device_sn: str) -> Dict[str, Any]:
+    frames = _load(paths)
+    if not frames: raise SystemExit("No frames in log")
+    if not device_sn: device_sn = frames[0][1].rsplit("/", 1)[-1]
+    topic = MQTT_SUB_TOPIC_FORMAT.format(device_sn=device_sn)
+    device_frames = [frame for frame in frames if frame[1] == topic]
+    if not device_frames: raise SystemExit(f"No frames for {topic}")
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_make_hass(config_dir)
+        client = LumentreeMqttClient(hass, fake_entry(device_sn), device_sn, device_sn)
+        dispatched = {"count": 0}
+        @callback # Counted on the loop, like the entities
+        def _count(data: Dict[str, Any]) -> None: dispatched["count"] += 1
+        remove = async_dispatcher_connect(hass, SIGNAL_UPDATE_FORMAT.format(device_sn=device_sn), _count)
+        monitor = LoopLagMonitor(); monitor.start()
+        feed_seconds = await hass.loop.run_in_executor(None, _feed, client, device_frames, speed)
+        await asyncio.sleep(0) # Dispatches were queued (call_soon_threadsafe) before the feed's completion, so they have run
+        loop_lag = await monitor.stop()
+        remove(); client._cancel_offline_timer()
+        replayed = len(device_frames)
+        result = {
+            "device_sn": device_sn, "speed": speed, "frames_in_log": len(frames), "frames_replayed": replayed,
+            "dispatched": dispatched["count"], "feed_seconds": round(feed_seconds, 3),
+            "frames_per_second": round(replayed / feed_seconds, 1) if feed_seconds > 0 else None,
+            "loop_lag_ms": loop_lag, "client_counters": client.diagnostics["counters"], "threads": threading.active_count(),
+        }
+        await hass.async_stop(force=True)
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a Lumentree frame log through the MQTT client, parser and dispatcher")
+    parser.add_argument("logs", nargs="+", help="Frame log files, oldest first (frames_<SN>.bin.N ... frames_<SN>.bin)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor; 0 = as fast as possible")
+    parser.add_argument("--device-sn", default="", help="Device SN (default: from the first record's topic)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(async_replay(args.logs, args.speed, args.device_sn)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# tools/simulator.py
+# Offline load-test harness: a minimal in-process MQTT 3.1.1 broker and simulated Lumentree inverters
+#
+#   python tools/simulator.py --devices 200 --port 1886 --prefix --latency 0.05 --loss 0.01 --corrupt 0.005
+#   python tools/simulator.py --lan rtu --port 8899 # One inverter behind a LAN gateway (transport lan_rtu / lan_tcp)
+#
+# The inverters live inside the broker process (no socket per device): a publish to listenApp/<SN> with a
+# Modbus function-3 read is answered on reportApp/<SN> after the configured latency.
+
+import argparse
+import asyncio
+import math
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path: sys.path.insert(0, str(REPO_ROOT))
+
+try:
+    from custom_components.lumentree.const import REG_ADDR, MQTT_SUB_TOPIC_FORMAT, MQTT_PUB_TOPIC_FORMAT
+except ImportError: # const.py only needs the standard library, but keep the simulator standalone
+    REG_ADDR = {"DEVICE_MODEL_START": 3, "BATTERY_VOLTAGE": 11, "BATTERY_CURRENT": 12, "AC_OUT_VOLTAGE": 13, "GRID_VOLTAGE": 15, "AC_OUT_FREQ": 16, "AC_IN_FREQ": 17, "AC_OUT_POWER": 18, "PV1_VOLTAGE": 20, "PV1_POWER": 22, "DEVICE_TEMP": 24, "BATTERY_TYPE": 37, "BATTERY_SOC": 50, "AC_IN_POWER": 53, "AC_OUT_VA": 58, "GRID_POWER": 59, "BATTERY_POWER": 61, "LOAD_POWER": 67, "UPS_MODE": 68, "MASTER_SLAVE_STATUS": 70, "PV2_VOLTAGE": 72, "PV2_POWER": 74}
+    MQTT_SUB_TOPIC_FORMAT = "reportApp/{device_sn}"; MQTT_PUB_TOPIC_FORMAT = "listenApp/{device_sn}"
+
+RESPONSE_PREFIX = bytes.fromhex("2b2b2b2b")
+REGISTER_SPACE = 300 # Main block 0-94, cells 250-299
+
+
+def crc16_modbus(data: bytes) -> int:
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8): crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+# --- Minimal MQTT 3.1.1 broker ---
+
+def _encode_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length: return bytes(encoded)
+
+def _encode_string(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return struct.pack(">H", len(raw)) + raw
+
+def _topic_matches(topic_filter: str, topic: str) -> bool:
+    filter_parts, topic_parts = topic_filter.split("/"), topic.split("/")
+    for index, part in enumerate(filter_parts):
+        if part == "#": return True
+        if index >= len(topic_parts) or (part != "+" and part != topic_parts[index]): return False
+    return len(filter_parts) == len(topic_parts)
+
+
+class FakeBroker:
+    """QoS 0/1 publish/subscribe, CONNECT/PING/DISCONNECT; no auth, retain or sessions."""
+
+    def __init__(self) -> None:
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._subscriptions: Dict[asyncio.StreamWriter, Set[str]] = {}
+        self._handlers: Dict[str, Callable[[str, bytes], None]] = {} # In-process subscribers by exact topic
+        self.stats = {"connections": 0, "published_in": 0, "delivered": 0, "bytes_out": 0}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Listen and return the bound port."""
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._subscriptions): writer.close()
+            await self._server.wait_closed()
+
+    def add_handler(self, topic: str, handler: Callable[[str, bytes], None]) -> None:
+        """Route publishes on topic to an in-process handler (the simulated devices)."""
+        self._handlers[topic] = handler
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """Deliver a QoS 0 publish to matching socket subscribers."""
+        packet = None
+        for writer, filters in self._subscriptions.items():
+            if writer.is_closing() or not any(_topic_matches(f, topic) for f in filters): continue
+            if packet is None:
+                body = _encode_string(topic) + payload
+                packet = b"\x30" + _encode_length(len(body)) + body
+            writer.write(packet); self.stats["delivered"] += 1; self.stats["bytes_out"] += len(packet)
+
+    async def _read_packet(self, reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        header = (await reader.readexactly(1))[0]
+        multiplier, length = 1, 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier; multiplier *= 128
+            if not byte & 0x80: break
+        return header, await reader.readexactly(length)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self._subscriptions[writer] = set()
+        try:
+            while True:
+                header, body = await self._read_packet(reader)
+                packet_type, flags = header >> 4, header & 0x0F
+                if packet_type == 1: writer.write(b"\x20\x02\x00\x00") # CONNECT -> CONNACK accepted
+                elif packet_type == 3: self._on_publish(writer, flags, body)
+                elif packet_type == 8: # SUBSCRIBE
+                    packet_id, offset, granted = body[:2], 2, bytearray()
+                    while offset < len(body):
+                        topic_len = struct.unpack(">H", body[offset:offset + 2])[0]
+                        self._subscriptions[writer].add(body[offset + 2:offset + 2 + topic_len].decode("utf-8"))
+                        offset += 2 + topic_len + 1; granted.append(0)
+                    writer.write(b"\x90" + _encode_length(2 + len(granted)) + packet_id + bytes(granted))
+                elif packet_type == 10: writer.write(b"\xb0\x02" + body[:2]) # UNSUBSCRIBE -> UNSUBACK (filters kept; harmless here)
+                elif packet_type == 12: writer.write(b"\xd0\x00") # PINGREQ -> PINGRESP
+                elif packet_type == 14: break # DISCONNECT
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._subscriptions.pop(writer, None)
+            writer.close()
+
+    def _on_publish(self, writer: asyncio.StreamWriter, flags: int, body: bytes) -> None:
+        qos = (flags >> 1) & 0x03
+        topic_len = struct.unpack(">H", body[:2])[0]
+        topic = body[2:2 + topic_len].decode("utf-8"); offset = 2 + topic_len
+        if qos:
+            packet_id = body[offset:offset + 2]; offset += 2
+            if qos == 1: writer.write(b"\x40\x02" + packet_id) # PUBACK
+        payload = body[offset:]
+        self.stats["published_in"] += 1
+        handler = self._handlers.get(topic)
+        if handler is not None: handler(topic, payload)
+        self.publish(topic, payload)
+
+
+# --- Simulated inverter ---
+
+class SimulatedInverter:
+    """Answers function-3 reads from a synthetic 300-register image that drifts with time."""
+
+    def __init__(self, broker: Optional[FakeBroker], device_sn: str, latency: float = 0.05, jitter: float = 0.02,
+                 loss: float = 0.0, corrupt: float = 0.0, prefix: bool = False, cells: int = 16, seed: Optional[int] = None) -> None:
+        self.device_sn = device_sn
+        self._broker = broker
+        self._latency, self._jitter, self._loss, self._corrupt, self._prefix, self._cells = latency, jitter, loss, corrupt, prefix, cells
+        self._random = random.Random(seed if seed is not None else device_sn)
+        self._phase = self._random.uniform(0, 2 * math.pi)
+        self._report_topic = MQTT_SUB_TOPIC_FORMAT.format(device_sn=device_sn)
+        self._written: Dict[int, int] = {} # Registers set by function 6/16 writes, overlaid on the synthetic image
+        self.stats = {"requests": 0, "responses": 0, "lost": 0, "corrupted": 0, "invalid": 0, "writes": 0}
+        if broker is not None: broker.add_handler(MQTT_PUB_TOPIC_FORMAT.format(device_sn=device_sn), self._on_request)
+
+    def _registers(self) -> List[int]:
+        """Synthetic register image (raw 16-bit values, scaled like the real device)."""
+        regs = [0] * REGISTER_SPACE; rnd = self._random
+        wave = 0.5 + 0.5 * math.sin(time.time() / 600 + self._phase) # Slow "sun" cycle
+        pv1 = int(3000 * wave + rnd.uniform(-50, 50)); pv2 = int(1500 * wave + rnd.uniform(-30, 30))
+        load = int(800 + rnd.uniform(-150, 150))
+        battery = max(-2500, min(2500, load - max(0, pv1) - max(0, pv2))) # Negative = charging
+        grid = max(0, load - max(0, pv1) - max(0, pv2) - battery) # Import only what the battery cannot cover
+        def s16(value: int) -> int: return value & 0xFFFF
+        model = self.device_sn[-10:].ljust(10, "\x00").encode("ascii", "replace")
+        for i in range(5): regs[REG_ADDR["DEVICE_MODEL_START"] + i] = (model[2 * i] << 8) | model[2 * i + 1]
+        regs[REG_ADDR["BATTERY_VOLTAGE"]] = int(5230 + rnd.uniform(-20, 20))
+        regs[REG_ADDR["BATTERY_CURRENT"]] = s16(int(battery / 52.3 * 100))
+        regs[REG_ADDR["AC_OUT_VOLTAGE"]] = int(2300 + rnd.uniform(-10, 10)); regs[REG_ADDR["GRID_VOLTAGE"]] = int(2310 + rnd.uniform(-30, 30))
+        regs[REG_ADDR["AC_OUT_FREQ"]] = 5000; regs[REG_ADDR["AC_IN_FREQ"]] = int(5000 + rnd.uniform(-5, 5))
+        regs[REG_ADDR["AC_OUT_POWER"]] = load; regs[REG_ADDR["AC_OUT_VA"]] = int(load * 1.05)
+        regs[REG_ADDR["PV1_VOLTAGE"]] = int(350 * wave); regs[REG_ADDR["PV1_POWER"]] = max(0, pv1)
+        regs[REG_ADDR["PV2_VOLTAGE"]] = int(340 * wave); regs[REG_ADDR["PV2_POWER"]] = max(0, pv2)
+        regs[REG_ADDR["DEVICE_TEMP"]] = int(1000 + 350 + rnd.uniform(-10, 10))
+        regs[REG_ADDR["BATTERY_TYPE"]] = 1; regs[REG_ADDR["BATTERY_SOC"]] = int(60 + 30 * wave)
+        regs[REG_ADDR["AC_IN_POWER"]] = min(grid * 100, 0xFFFF); regs[REG_ADDR["GRID_POWER"]] = s16(grid)
+        regs[REG_ADDR["BATTERY_POWER"]] = s16(battery); regs[REG_ADDR["LOAD_POWER"]] = load
+        regs[REG_ADDR["UPS_MODE"]] = 0; regs[REG_ADDR["MASTER_SLAVE_STATUS"]] = 0
+        for cell in range(self._cells): regs[250 + cell] = int(3300 + rnd.uniform(-20, 20))
+        for register, value in self._written.items(): regs[register] = value
+        return [value & 0xFFFF for value in regs]
+
+    def response_for(self, payload: bytes) -> Optional[bytes]:
+        """RTU response frame for an RTU read (3/4) or write (6/16) request, or None when invalid or (simulated) lost."""
+        self.stats["requests"] += 1
+        if len(payload) < 8 or crc16_modbus(payload[:-2]) != int.from_bytes(payload[-2:], "little") or payload[1] not in (3, 4, 6, 16):
+            self.stats["invalid"] += 1; return None
+        if self._random.random() < self._loss: self.stats["lost"] += 1; return None
+        slave, function = payload[0], payload[1]
+        start, count = struct.unpack(">HH", payload[2:6])
+        if function == 6:
+            self._written[start] = count; self.stats["writes"] += 1
+            adu = payload[:6] # Echo of address and value
+        elif function == 16:
+            if len(payload) != 9 + count * 2 or start + count > REGISTER_SPACE:
+                adu = bytes([slave, function | 0x80, 2]) # Illegal data address
+            else:
+                for offset, value in enumerate(struct.unpack(f">{count}H", payload[7:7 + count * 2])): self._written[start + offset] = value
+                self.stats["writes"] += 1
+                adu = payload[:6] # Echo of address and count
+        else:
+            regs = self._registers()[start:start + count]
+            regs += [0] * (count - len(regs))
+            adu = bytes([slave, function, count * 2]) + struct.pack(f">{count}H", *regs)
+        frame = adu + crc16_modbus(adu).to_bytes(2, "little")
+        if self._random.random() < self._corrupt:
+            position = self._random.randrange(3, len(frame)); frame = frame[:position] + bytes([frame[position] ^ 0xFF]) + frame[position + 1:]
+            self.stats["corrupted"] += 1
+        return frame
+
+    def delay(self) -> float:
+        return max(0.0, self._latency + self._random.uniform(-self._jitter, self._jitter))
+
+    def _on_request(self, topic: str, payload: bytes) -> None:
+        frame = self.response_for(payload)
+        if frame is None: return
+        if self._prefix: frame = self.device_sn.encode("ascii") + RESPONSE_PREFIX + frame
+        asyncio.get_running_loop().call_later(self.delay(), self._respond, frame)
+
+    def _respond(self, frame: bytes) -> None:
+        self.stats["responses"] += 1
+        self._broker.publish(self._report_topic, frame)
+
+
+# --- LAN gateway stand-in (RTU-over-TCP or Modbus-TCP) ---
+
+class FakeLanGateway:
+    """TCP server in front of one SimulatedInverter, answering pipelined requests in order like a serial gateway."""
+
+    def __init__(self, inverter: SimulatedInverter, framing: str = "rtu") -> None:
+        self.inverter = inverter
+        self.framing = framing # "rtu" (raw frames with CRC) or "tcp" (MBAP header, no CRC)
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close(); await self._server.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+        """Returns (MBAP transaction header or b"", RTU request frame)."""
+        if self.framing == "tcp":
+            header = await reader.readexactly(7)
+            pdu = await reader.readexactly(int.from_bytes(header[4:6], "big") - 1)
+            adu = header[6:7] + pdu
+            return header[:4], adu + crc16_modbus(adu).to_bytes(2, "little")
+        request = await reader.readexactly(8)
+        if request[1] == 16: request += await reader.readexactly(request[6] + 1) # Byte count already read: data + CRC
+        return b"", request
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        async def _respond() -> None:
+            while True:
+                transaction, request = await queue.get()
+                await asyncio.sleep(self.inverter.delay()) # Serial bus: one request at a time
+                frame = self.inverter.response_for(request)
+                if frame is None: continue
+                if self.framing == "tcp":
+                    pdu = frame[1:-2]
+                    frame = transaction + (len(pdu) + 1).to_bytes(2, "big") + frame[:1] + pdu
+                self.inverter.stats["responses"] += 1
+                writer.write(frame)
+        responder = asyncio.get_running_loop().create_task(_respond())
+        try:
+            while True: queue.put_nowait(await self._read_request(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            responder.cancel(); writer.close()
+
+
+def device_sns(count: int, prefix: str = "SIM") -> List[str]:
+    return [f"{prefix}{index:05d}" for index in range(1, count + 1)]
+
+
+async def async_start_simulation(devices: int, port: int = 0, **inverter_options) -> Tuple[FakeBroker, List[SimulatedInverter], int]:
+    """Start a broker and `devices` inverters; returns (broker, inverters, bound port)."""
+    broker = FakeBroker()
+    bound_port = await broker.start(port=port)
+    inverters = [SimulatedInverter(broker, sn, **inverter_options) for sn in device_sns(devices)]
+    return broker, inverters, bound_port
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    if args.lan:
+        inverter = SimulatedInverter(None, device_sns(1)[0], latency=args.latency, jitter=args.jitter, loss=args.loss, corrupt=args.corrupt)
+        gateway = FakeLanGateway(inverter, args.lan)
+        port = await gateway.start(port=args.port)
+        print(f"Fake {args.lan} gateway on 127.0.0.1:{port} for {inverter.device_sn}", flush=True)
+        try:
+            while True: await asyncio.sleep(args.report); print(inverter.stats, flush=True)
+        finally:
+            await gateway.stop()
+    broker, inverters, port = await async_start_simulation(
+        args.devices, args.port, latency=args.latency, jitter=args.jitter, loss=args.loss, corrupt=args.corrupt, prefix=args.prefix
+    )
+    print(f"Fake broker on 127.0.0.1:{port} with {len(inverters)} inverters ({inverters[0].device_sn} .. {inverters[-1].device_sn})", flush=True)
+    try:
+        while True:
+            await asyncio.sleep(args.report)
+            totals = {key: sum(inv.stats[key] for inv in inverters) for key in inverters[0].stats}
+            print({**broker.stats, **totals}, flush=True)
+    finally:
+        await broker.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake MQTT broker with simulated Lumentree inverters")
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--port", type=int, default=1886)
+    parser.add_argument("--latency", type=float, default=0.05, help="Response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Latency jitter (s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probability a request gets no response")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Probability a response has a corrupted byte")
+    parser.add_argument("--prefix", action="store_true", help="Prefix responses with <SN>2b2b2b2b like some firmwares")
+    parser.add_argument("--lan", choices=("rtu", "tcp"), default="", help="Serve one inverter as a LAN gateway instead of the broker")
+    parser.add_argument("--report", type=float, default=10.0, help="Stats print interval (s)")
+    try: asyncio.run(_async_main(parser.parse_args()))
+    except KeyboardInterrupt: pass
+
+
+if __name__ == "__main__":
+    main()